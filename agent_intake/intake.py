@@ -9,8 +9,9 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage, AIMessage
 from shared_lib.state import CaseState
 from shared_lib.config import AgentConfig
-# Lazy Cleanup Integration
-from maintenance.cleanup_policy import run_cleanup
+from shared_lib.keyword_matcher import KeywordMatcher
+# Privacy cleanup runs on the Ghost Protocol's background sweeper
+from shared_lib.ghost_protocol import maybe_trigger_cleanup
 
 CURRENT_DIR = Path(__file__).parent
 INSTRUCTIONS_PATH = CURRENT_DIR / "instructions.md"
@@ -31,6 +32,22 @@ def get_llm():
         _llm = AgentConfig.get_llm("intake")
     return _llm
 
+# Strong completion signals (explicit)
+STRONG_SIGNALS = [
+    "i'm done", "i am done", "that's everything", "that is everything",
+    "that's all", "that is all", "nothing else", "no more information",
+    "finished", "complete", "completed", "that covers it", "that covers everything"
+]
+
+# Moderate signals (may need context)
+MODERATE_SIGNALS = ['done', 'finish', 'finishing', 'all the facts', 'everything i know', 'all i have']
+
+# Compiled once; word-boundary aware so "done" doesn't fire on "abandoned".
+# Inflected forms are listed explicitly ("completed", "finishing") since a
+# stem no longer matches inside a longer word.
+_STRONG_MATCHER = KeywordMatcher(STRONG_SIGNALS)
+_MODERATE_MATCHER = KeywordMatcher(MODERATE_SIGNALS)
+
 def detect_completion_signal(messages) -> bool:
     """Check if the user has signaled completion in their last message."""
     if not messages:
@@ -51,21 +68,12 @@ def detect_completion_signal(messages) -> bool:
     if not last_user_msg:
         return False
     
-    # Strong completion signals (explicit)
-    strong_signals = [
-        "i'm done", "i am done", "that's everything", "that is everything",
-        "that's all", "that is all", "nothing else", "no more information",
-        "finished", "complete", "that covers it", "that covers everything"
-    ]
-    
     # Check for strong signals first
-    if any(signal in last_user_msg for signal in strong_signals):
+    if _STRONG_MATCHER.search(last_user_msg):
         print(f"--- STRONG completion signal detected ---")
         return True
     
-    # Moderate signals (may need context)
-    moderate_signals = ['done', 'finish', 'all the facts', 'everything i know', 'all i have']
-    has_moderate = any(signal in last_user_msg for signal in moderate_signals)
+    has_moderate = _MODERATE_MATCHER.search(last_user_msg)
     
     # Count user messages in conversation (heuristic: after 3+ exchanges, moderate signals trigger)
     user_msg_count = sum(1 for m in messages if hasattr(m, 'type') and m.type == 'human')
@@ -121,9 +129,9 @@ def parse_system_context(messages) -> dict:
     return context
 
 def intake_node(state: CaseState) -> dict:
-    # Trigger Lazy Cleanup (Best effort, non-blocking if possible, but here synchronous)
+    # Wake the background cleanup sweeper (rate-limited, never deletes inline)
     try:
-        run_cleanup()
+        maybe_trigger_cleanup()
     except Exception as e:
         print(f"Cleanup warning: {e}")
 
@@ -0,0 +1,80 @@
+"""
+BENCHMARK - clean_text_for_pdf
+Compares the current pipeline (ASCII fast path + guarded replaces) against
+the legacy unconditional str.replace + latin-1 round trip, and a
+str.translate table for reference, on 50 KB research sections.
+
+Run with: python benchmarks/bench_clean_text.py [--repeat N]
+Prints JSON results to stdout.
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib.pdf_utils import clean_text_for_pdf
+
+SECTION_BYTES = 50 * 1024
+
+_LEGACY_REPLACEMENTS = {
+    '‘': "'", '’': "'", '“': '"', '”': '"',
+    '–': '-', '—': '--', '…': '...', '•': '-'
+}
+
+
+def legacy_clean_text_for_pdf(text: str) -> str:
+    """Pre-optimization implementation, kept for comparison."""
+    if not text:
+        return ""
+    for char, replacement in _LEGACY_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+_TRANSLATION = str.maketrans(_LEGACY_REPLACEMENTS)
+
+
+def translate_clean_text_for_pdf(text: str) -> str:
+    """Single-pass str.translate variant (slower in CPython on non-ASCII text)."""
+    if not text:
+        return ""
+    return text.translate(_TRANSLATION).encode('latin-1', 'replace').decode('latin-1')
+
+
+def make_section(sample: str) -> str:
+    return (sample * (SECTION_BYTES // len(sample.encode("utf-8")) + 1))[:SECTION_BYTES]
+
+
+CORPORA = {
+    "ascii": make_section("Title VII prohibits retaliation against employees who file EEOC charges. "),
+    "smart_punctuation": make_section("The court held “but-for” causation applies — see Gross… "),
+    "latin1_accents": make_section("El empleado fue despedido sin compensación por su participación. "),
+    "cjk": make_section("雇主不得因员工投诉而报复。 "),
+}
+
+
+def run(repeat: int) -> dict:
+    results = {"section_bytes": SECTION_BYTES, "repeat": repeat, "corpora": {}}
+    for name, text in CORPORA.items():
+        legacy = min(timeit.repeat(lambda: legacy_clean_text_for_pdf(text), number=1, repeat=repeat))
+        current = min(timeit.repeat(lambda: clean_text_for_pdf(text), number=1, repeat=repeat))
+        translate = min(timeit.repeat(lambda: translate_clean_text_for_pdf(text), number=1, repeat=repeat))
+        results["corpora"][name] = {
+            "legacy_ms": round(legacy * 1000, 4),
+            "translate_ms": round(translate * 1000, 4),
+            "current_ms": round(current * 1000, 4),
+            "speedup": round(legacy / current, 2) if current else None,
+            "identical_output": legacy_clean_text_for_pdf(text) == clean_text_for_pdf(text),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
@@ -0,0 +1,111 @@
+"""
+BENCHMARK - debate prompt tokens
+Runs scripted 7-round debates (no LLM calls) and compares the estimated
+tokens agents are prompted with when every earlier round is passed verbatim
+against a compacted history (HistoryCompactor) under a few context caps:
+total prompt tokens per debate and the context size of the final round.
+
+Run with: python benchmarks/bench_debate.py [--turns N] [--output results.json]
+Prints JSON results to stdout (and optionally writes them to a file).
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib.debate import MAX_DEBATE_TURNS, MaxTurnsPolicy, history_tokens, run_debate
+
+THESIS = "The termination was retaliation for the plaintiff's protected EEOC complaint."
+FACTS = [
+    "the supervisor learned of the complaint on {day}",
+    "the performance review dated {day} rated the plaintiff as exceeding expectations",
+    "two comparators with worse attendance kept their jobs after {day}",
+    "the stated reason for termination changed between the letter and the {day} deposition",
+    "HR opened no investigation before the decision on {day}",
+    "the manager's email of {day} referred to the plaintiff as a liability",
+]
+DAYS = ["March 3", "March 10", "April 2", "April 19", "May 7", "June 1", "June 30"]
+OBJECTIONS = [
+    "Temporal proximity alone rarely establishes causation in this circuit.",
+    "The employer will point to documented attendance problems that predate the complaint.",
+    "The comparators held different roles and reported to a different manager.",
+    "The email is ambiguous and may be read as referring to a pending audit.",
+    "Shifting explanations are probative but the jury may accept the final one.",
+]
+
+
+def scripted_agents(seed: int = 3):
+    """Strategist and critic producing argument-length text for each round."""
+    rng = random.Random(seed)
+
+    async def strategist(history):
+        turn = history[-1]["turn_number"] + 1 if history else 1
+        sentences = [THESIS]
+        for fact in rng.sample(FACTS, 4):
+            day = rng.choice(DAYS)
+            sentences.append(f"In round {turn} we stress that {fact.format(day=day)}, which supports pretext.")
+        sentences.append(f"Round {turn} therefore asks the court to deny summary judgment on the retaliation claim.")
+        return " ".join(sentences)
+
+    async def critic(argument, history):
+        turn = history[-1]["turn_number"] + 1 if history else 1
+        points = " ".join(rng.sample(OBJECTIONS, 3))
+        return f"Round {turn} critique. {points} Risk: {0.2 + 0.6 * rng.random():.2f}"
+
+    return strategist, critic
+
+
+def measure(turns: int, max_context_tokens: int) -> dict:
+    strategist, critic = scripted_agents()
+    seen = []
+
+    async def recording_critic(argument, history):
+        seen.append(history_tokens(history))
+        return await critic(argument, history)
+
+    result = run_debate(strategist, recording_critic, policy=MaxTurnsPolicy(turns),
+                        speculate=False, max_context_tokens=max_context_tokens)
+    prompt = sum(r["usage"]["prompt_tokens"] for r in result["rounds"])
+    completion = sum(r["usage"]["completion_tokens"] for r in result["rounds"])
+    return {
+        "max_context_tokens": max_context_tokens or None,
+        "rounds": len(result["rounds"]),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+        "context_tokens_per_round": seen,
+    }
+
+
+def run(turns: int, caps: list) -> dict:
+    full = measure(turns, 0)
+    compacted = [measure(turns, cap) for cap in caps]
+    for entry in compacted:
+        entry["total_tokens_saved_pct"] = round(100 * (1 - entry["total_tokens"] / full["total_tokens"]), 1)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "turns": turns,
+        "full_history": full,
+        "compacted": compacted,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=MAX_DEBATE_TURNS)
+    parser.add_argument("--caps", type=int, nargs="+", default=[400, 800, 1600])
+    parser.add_argument("--output", type=Path, help="Also write JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.turns, args.caps)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
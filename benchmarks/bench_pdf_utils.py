@@ -0,0 +1,120 @@
+"""
+BENCHMARK - pdf_utils case brief rendering
+Measures render time, peak memory (tracemalloc), page count and output size
+for small / medium / huge synthetic cases, with PDF stream compression on
+and off. Runs fully offline (no storage, network or LLM calls).
+
+Run with: python benchmarks/bench_pdf_utils.py [--repeat N] [--output results.json]
+Prints JSON results to stdout (and optionally writes them to a file) so
+numbers can be tracked for regressions.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fpdf import FPDF_VERSION
+from shared_lib.pdf_utils import _build_case_brief, _pdf_to_bytes
+
+PARAGRAPH = (
+    "The employee reported unpaid overtime to HR on three occasions and was "
+    "terminated two weeks later. Title VII and FLSA anti-retaliation provisions "
+    "apply; the temporal proximity supports an inference of causation. "
+)
+
+
+def make_case(research_entries: int, strategy_paragraphs: int, fact_chars: int) -> dict:
+    """Build a deterministic synthetic case of the requested size."""
+    return {
+        "case_id": f"bench-{research_entries}-{strategy_paragraphs}",
+        "facts": {
+            "client_name": "Jane Doe",
+            "employer": "Acme Logistics",
+            "jurisdiction": "California, USA",
+            "case_type": "retaliation",
+            "incident_summary": (PARAGRAPH * (fact_chars // len(PARAGRAPH) + 1))[:fact_chars],
+            "status": "COMPLETE",
+        },
+        "strategy": "\n\n".join(f"{i + 1}. {PARAGRAPH}" for i in range(strategy_paragraphs)),
+        "research": {f"source_{i}": PARAGRAPH * 8 for i in range(research_entries)},
+    }
+
+
+SCENARIOS = {
+    "small": make_case(research_entries=2, strategy_paragraphs=3, fact_chars=300),
+    "medium": make_case(research_entries=20, strategy_paragraphs=30, fact_chars=2_000),
+    "huge": make_case(research_entries=100, strategy_paragraphs=150, fact_chars=20_000),
+}
+
+
+def render_once(case: dict, compress: bool) -> dict:
+    """Render one brief, returning timing, pages and size."""
+    start = time.perf_counter()
+    pdf = _build_case_brief(case["case_id"], case["facts"], case["strategy"], case["research"])
+    pdf.set_compression(compress)
+    data = _pdf_to_bytes(pdf)
+    return {
+        "seconds": time.perf_counter() - start,
+        "pages": pdf.page_no(),
+        "output_bytes": len(data),
+    }
+
+
+def peak_memory(case: dict, compress: bool) -> int:
+    """Peak traced allocation for one render (separate pass: tracing skews timing)."""
+    tracemalloc.start()
+    try:
+        render_once(case, compress)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(repeat: int) -> dict:
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "fpdf_version": FPDF_VERSION,
+        "repeat": repeat,
+        "scenarios": {},
+    }
+    for name, case in SCENARIOS.items():
+        scenario = {
+            "input_chars": len(json.dumps(case)),
+        }
+        for compress in (True, False):
+            runs = [render_once(case, compress) for _ in range(repeat)]
+            times = [r["seconds"] for r in runs]
+            scenario["compressed" if compress else "uncompressed"] = {
+                "render_ms_median": round(statistics.median(times) * 1000, 3),
+                "render_ms_min": round(min(times) * 1000, 3),
+                "peak_memory_kb": round(peak_memory(case, compress) / 1024, 1),
+                "pages": runs[-1]["pages"],
+                "output_bytes": runs[-1]["output_bytes"],
+            }
+        scenario["compression_ratio"] = round(
+            scenario["uncompressed"]["output_bytes"] / scenario["compressed"]["output_bytes"], 2
+        )
+        results["scenarios"][name] = scenario
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Also write JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
@@ -0,0 +1,233 @@
+"""
+BENCHMARK - precedent ranking
+Builds a synthetic corpus (100k precedents by default) and compares the
+vectorized BM25 index against the original per-keyword substring loop:
+index build time, memory footprint and per-query latency. Also measures the
+memory-mapped corpus file: write/open time, size and random record access,
+faceted queries (bitset intersection, then scoring the candidates only) and
+semantic search over hashing embeddings: brute-force vs IVF latency and
+recall, and the citation graph (PageRank precompute, per-query re-rank).
+
+Run with: python benchmarks/bench_precedents.py [--size N] [--queries N] [--output results.json]
+Prints JSON results to stdout (and optionally writes them to a file).
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib.embeddings import EmbeddingIndex, write_embeddings
+from shared_lib.precedent_corpus import PrecedentCorpus, write_corpus
+from shared_lib.precedents import (
+    GRAPH_SEEDS, PRECEDENTS, CitationGraph, PrecedentIndex, facet_filters, preferred_categories,
+)
+
+CATEGORIES = sorted({p["category"] for p in PRECEDENTS})
+VOCABULARY = sorted({kw for p in PRECEDENTS for kw in p["keywords"]}) + [
+    f"doctrine{i}" for i in range(5000)
+]
+JURISDICTIONS = ["federal"] * 10 + ["California", "Texas", "New York", "Illinois", "Florida"] * 2
+FILLER = "employee employer court held claim evidence complaint policy manager".split()
+
+
+def make_corpus(size: int, seed: int = 42) -> list:
+    """Deterministic synthetic precedents shaped like the built-in records."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        keywords = rng.sample(VOCABULARY, 5)
+        summary = " ".join(rng.choices(FILLER + keywords, k=rng.randint(20, 40)))
+        cited = rng.sample(range(i), min(i, 5))
+        corpus.append({
+            "name": f"Plaintiff{i} v. Employer{i}",
+            "citation": f"{rng.randint(1, 999)} F.3d {rng.randint(1, 1500)} ({rng.randint(1965, 2024)})",
+            "year": rng.randint(1965, 2024),
+            "category": rng.choice(CATEGORIES),
+            "jurisdiction": rng.choice(JURISDICTIONS),
+            "summary": summary,
+            "keywords": keywords,
+            "cites": [f"Plaintiff{j} v. Employer{j}" for j in cited],
+        })
+    return corpus
+
+
+def make_queries(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.sample(VOCABULARY, 4) + rng.sample(FILLER, 3))
+        for _ in range(count)
+    ]
+
+
+def legacy_search(corpus: list, text: str, k: int) -> list:
+    """The original find_relevant_precedents scoring loop."""
+    scored = []
+    for p in corpus:
+        score = 0
+        for kw in p["keywords"]:
+            if kw in text:
+                score += 1
+        if score > 0:
+            scored.append((score, p))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [p for _, p in scored[:k]]
+
+
+def time_queries(fn, queries: list) -> dict:
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "query_ms_median": round(statistics.median(times), 3),
+        "query_ms_p95": round(times[int(len(times) * 0.95) - 1], 3),
+    }
+
+
+def bench_corpus_file(corpus: list) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.jlpc"
+        start = time.perf_counter()
+        write_corpus(corpus, path)
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mapped = PrecedentCorpus(path)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(1)
+        picks = [rng.randrange(len(corpus)) for _ in range(1000)]
+        start = time.perf_counter()
+        for i in picks:
+            mapped[i]
+        access_us = (time.perf_counter() - start) / len(picks) * 1e6
+
+        result = {
+            "write_seconds": round(write_seconds, 3),
+            "open_ms": round(open_ms, 3),
+            "file_mb": round(path.stat().st_size / 2**20, 2),
+            "record_access_us": round(access_us, 2),
+        }
+        mapped.close()
+        return result
+
+
+def bench_facets(index: PrecedentIndex, queries: list) -> dict:
+    facts = {"jurisdiction": "California, USA", "case_type": CATEGORIES[0]}
+    filters = {**facet_filters(facts, index), "category": preferred_categories(facts, index), "years": (2000, 2024)}
+
+    def query(q):
+        return index.top_k(q, 3, index.facets.mask(**filters))
+
+    start = time.perf_counter()
+    for _ in range(100):
+        index.facets.mask(**filters)
+    mask_ms = (time.perf_counter() - start) * 10
+    return {
+        "filters": filters,
+        "candidates": int(index.facets.mask(**filters).sum()),
+        "bitset_intersection_ms": round(mask_ms, 3),
+        **time_queries(query, queries),
+    }
+
+
+def bench_semantic(corpus: list, queries: list, n_lists: int = 256, n_probe: int = 8) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.npy"
+        start = time.perf_counter()
+        write_embeddings(corpus, path, digest="bench")
+        embed_seconds = time.perf_counter() - start
+
+        brute = EmbeddingIndex.load(path)
+        start = time.perf_counter()
+        ivf = EmbeddingIndex.load(path, n_lists=n_lists, n_probe=n_probe)
+        ivf_build_seconds = time.perf_counter() - start
+
+        vectors = brute.embed(queries)
+        recall = []
+        for vector in vectors:
+            truth = set(brute.search(vector, 10)[0].tolist())
+            recall.append(len(truth & set(ivf.search(vector, 10)[0].tolist())) / 10)
+        by_query = dict(zip(queries, vectors))
+        result = {
+            "embed_seconds": round(embed_seconds, 3),
+            "matrix_mb": round(path.stat().st_size / 2**20, 2),
+            "brute_force": time_queries(lambda q: brute.search(by_query[q], 3), queries),
+            "ivf": {
+                "lists": n_lists,
+                "probes": n_probe,
+                "build_seconds": round(ivf_build_seconds, 3),
+                "recall_at_10": round(statistics.mean(recall), 3),
+                **time_queries(lambda q: ivf.search(by_query[q], 3), queries),
+            },
+        }
+        del brute, ivf  # Release the mappings before the directory is removed
+        return result
+
+
+def bench_graph(index: PrecedentIndex, queries: list) -> dict:
+    start = time.perf_counter()
+    graph = CitationGraph(index.records)
+    build_seconds = time.perf_counter() - start
+    seeds = {q: index.top_k(q, GRAPH_SEEDS) for q in queries}
+    return {
+        "edges": graph.edge_count,
+        "build_seconds": round(build_seconds, 3),
+        "pagerank_entries": int(len(graph.ppr_ids)),
+        "two_hop_expand": time_queries(lambda q: graph.expand([i for i, _ in seeds[q]], hops=2), queries),
+        "rerank": time_queries(lambda q: index.graph_rerank(seeds[q], 3, graph_weight=0.2), queries),
+    }
+
+
+def run(size: int, query_count: int) -> dict:
+    corpus = make_corpus(size)
+    queries = make_queries(query_count)
+
+    start = time.perf_counter()
+    index = PrecedentIndex(corpus)
+    build_seconds = time.perf_counter() - start
+
+    index_bytes = index.doc_ids.nbytes + index.weights.nbytes + index.indptr.nbytes
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "corpus_size": size,
+        "queries": query_count,
+        "bm25": {
+            "build_seconds": round(build_seconds, 3),
+            "vocabulary": len(index.vocabulary),
+            "postings": int(len(index.doc_ids)),
+            "postings_kb": round(index_bytes / 1024, 1),
+            **time_queries(lambda q: index.top_k(q, 3), queries),
+        },
+        "faceted": bench_facets(index, queries),
+        "citation_graph": bench_graph(index, queries),
+        "legacy_loop": time_queries(lambda q: legacy_search(corpus, q, 3), queries),
+        "corpus_file": bench_corpus_file(corpus),
+        "semantic": bench_semantic(corpus, queries),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--output", type=Path, help="Also write JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.size, args.queries)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
@@ -75,3 +75,86 @@ class AgentConfig:
             temperature=temperature,
             api_key=os.environ.get("OPENAI_API_KEY")
         )
+
+
+class RetentionConfig:
+    """
+    Single retention policy shared by the Ghost Protocol (files) and the
+    session database (Cosmos documents / in-memory fallback).
+    """
+
+    # How long user data lives after its last write (60 minutes by default)
+    RETENTION_SECONDS = int(os.environ.get("JURISLINK_RETENTION_SECONDS", "3600"))
+
+    # Default TTL stamped on session documents (Cosmos `ttl` semantics:
+    # positive seconds since last write, or -1 to never expire)
+    SESSION_TTL_SECONDS = RETENTION_SECONDS
+
+    # How often the Ghost Protocol rescans storage to catch files written
+    # outside the API (the expiry index covers everything written through it)
+    RECONCILE_INTERVAL_SECONDS = int(os.environ.get("JURISLINK_RECONCILE_INTERVAL_SECONDS", "900"))
+
+    # Background Ghost Protocol sweeper: regular interval, and the minimum
+    # spacing between early sweeps requested from the request path
+    GHOST_SWEEP_INTERVAL_SECONDS = int(os.environ.get("JURISLINK_GHOST_SWEEP_INTERVAL_SECONDS", "60"))
+    GHOST_TRIGGER_MIN_SECONDS = int(os.environ.get("JURISLINK_GHOST_TRIGGER_MIN_SECONDS", "15"))
+
+    # Parallel deletion of expired items: worker threads and the most time a
+    # single sweep may spend deleting (leftovers roll over to the next sweep)
+    INCINERATION_WORKERS = int(os.environ.get("JURISLINK_INCINERATION_WORKERS", "4"))
+    INCINERATION_BUDGET_SECONDS = float(os.environ.get("JURISLINK_INCINERATION_BUDGET_SECONDS", "10"))
+
+
+class PrecedentConfig:
+    """Precedent matching settings (shared_lib/precedents.py)."""
+
+    # Optional corpus file (see shared_lib/precedent_corpus.py); the built-in
+    # landmark cases are used when unset
+    CORPUS_PATH = os.environ.get("JURISLINK_PRECEDENT_CORPUS") or None
+
+    # Optional semantic search (see shared_lib/embeddings.py): precomputed
+    # embeddings for the corpus, and the share of the hybrid score given to
+    # cosine similarity (0 = keyword ranking only, 1 = semantic only)
+    EMBEDDINGS_PATH = os.environ.get("JURISLINK_PRECEDENT_EMBEDDINGS") or None
+    SEMANTIC_WEIGHT = float(os.environ.get("JURISLINK_SEMANTIC_WEIGHT", "0.5"))
+
+    # IVF partitioning of the embeddings (0 = brute-force search) and how
+    # many partitions each query scans
+    IVF_LISTS = int(os.environ.get("JURISLINK_IVF_LISTS", "0"))
+    IVF_PROBES = int(os.environ.get("JURISLINK_IVF_PROBES", "8"))
+
+    # Share of the final ranking given to citation-graph PageRank around the
+    # best matches (0 = ignore the citation graph)
+    GRAPH_WEIGHT = float(os.environ.get("JURISLINK_GRAPH_WEIGHT", "0.2"))
+
+    # Query embeddings kept per normalized case-facts hash
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("JURISLINK_QUERY_EMBEDDING_CACHE_SIZE", "256"))
+
+    # Memoized precedent lookups (ranked list + strategy markdown) per
+    # normalized case facts and corpus version
+    MEMO_SIZE = int(os.environ.get("JURISLINK_PRECEDENT_MEMO_SIZE", "512"))
+
+
+class DebateConfig:
+    """Adversarial debate settings (shared_lib/debate.py)."""
+
+    # Independent strategist/critic branches per debate (1 = single trajectory)
+    BRANCHES = int(os.environ.get("JURISLINK_DEBATE_BRANCHES", "3"))
+
+    # Debate rounds one tenant may have in flight at once, across all of its
+    # branches and concurrent debates (each round is a strategist + critic call)
+    TENANT_CONCURRENCY = int(os.environ.get("JURISLINK_DEBATE_TENANT_CONCURRENCY", "4"))
+
+    # Termination budgets (0 = unlimited): the debate stops before a round
+    # that would push it past the wall-clock, estimated token or cost limit
+    WALL_CLOCK_BUDGET_SECONDS = float(os.environ.get("JURISLINK_DEBATE_WALL_CLOCK_SECONDS", "120"))
+    TOKEN_BUDGET = int(os.environ.get("JURISLINK_DEBATE_TOKEN_BUDGET", "0"))
+    COST_BUDGET_USD = float(os.environ.get("JURISLINK_DEBATE_COST_BUDGET_USD", "0"))
+
+    # Prices used by the cost budget (USD per 1k prompt / completion tokens)
+    PROMPT_COST_PER_1K = float(os.environ.get("JURISLINK_DEBATE_PROMPT_COST_PER_1K", "0.0025"))
+    COMPLETION_COST_PER_1K = float(os.environ.get("JURISLINK_DEBATE_COMPLETION_COST_PER_1K", "0.01"))
+
+    # Cap on the debate history agents are prompted with (estimated tokens);
+    # past it, earlier rounds are compacted into a digest (0 = full history)
+    CONTEXT_TOKENS = int(os.environ.get("JURISLINK_DEBATE_CONTEXT_TOKENS", "2000"))
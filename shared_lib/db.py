@@ -1,18 +1,39 @@
 """
 Database Module for JurisLink - Azure Cosmos DB
 Handles user session persistence with complete isolation between users.
+
+Sessions expire natively: every document is stamped with a Cosmos `ttl`
+(container default plus optional per-item override) so the database deletes
+them server-side. Cosmos ignores per-item `ttl` unless the container has a
+default TTL, so `get_container` also turns TTL on for a container created
+before it was set. The in-memory fallback honours the same semantics with
+lazy expiry on read plus the Ghost Protocol's background sweep.
+
+Every Cosmos call goes through `_execute`, which records request charge
+(RU), latency, payload size and throttle retries in `shared_lib.metrics`
+per operation, and paces calls through a client-side RU token bucket so
+bursts are smoothed instead of failing with 429s. Per-user RU is kept in a
+bounded table that expires with the user's data (RetentionConfig).
 """
 import os
 import json
+import time
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from shared_lib.config import RetentionConfig
+from shared_lib.ghost_protocol import register_store
+from shared_lib.metrics import metrics
 
 # Configuration
 COSMOS_CONNECTION = os.environ.get("COSMOS_DB_CONNECTION_STRING")
 DATABASE_NAME = "jurislink"
 CONTAINER_NAME = "sessions"
+PROVISIONED_RU_PER_SECOND = 400  # Minimum RU/s
+MAX_THROTTLE_RETRIES = 3  # Client-side retries after the SDK gives up on a 429
 
 # Cached client
 _client = None
@@ -33,11 +54,13 @@ def get_container():
     try:
         _client = CosmosClient.from_connection_string(COSMOS_CONNECTION)
         database = _client.create_database_if_not_exists(DATABASE_NAME)
-        _container = database.create_container_if_not_exists(
+        container = database.create_container_if_not_exists(
             id=CONTAINER_NAME,
             partition_key=PartitionKey(path="/user_id"),
-            offer_throughput=400  # Minimum RU/s
+            offer_throughput=PROVISIONED_RU_PER_SECOND,
+            default_ttl=RetentionConfig.SESSION_TTL_SECONDS  # Enables per-item `ttl`
         )
+        _container = _ensure_default_ttl(database, container)
         logging.info(f"Connected to Cosmos DB: {DATABASE_NAME}/{CONTAINER_NAME}")
         return _container
     except Exception as e:
@@ -45,14 +68,298 @@ def get_container():
         return None
 
 
+def _ensure_default_ttl(database, container):
+    """
+    Turn on TTL for an existing container that has none.
+
+    `default_ttl` in create_container_if_not_exists only applies when the
+    container is created; without a container default Cosmos ignores the
+    per-item `ttl` and nothing expires server-side.
+    """
+    properties = container.read()
+    if properties.get("defaultTtl") is not None:
+        return container
+    try:
+        container = database.replace_container(
+            container,
+            partition_key=PartitionKey(path="/user_id"),
+            indexing_policy=properties.get("indexingPolicy"),
+            default_ttl=RetentionConfig.SESSION_TTL_SECONDS,
+        )
+        logging.warning(
+            f"Enabled TTL on existing container {CONTAINER_NAME} "
+            f"(default {RetentionConfig.SESSION_TTL_SECONDS}s); sessions now expire server-side"
+        )
+    except Exception as e:
+        logging.error(
+            f"TTL is OFF for container {CONTAINER_NAME} and could not be enabled ({e}). "
+            f"Session documents will NOT expire; set a default TTL on the container manually."
+        )
+    return container
+
+
+# =============================================================================
+# RU BUDGET & INSTRUMENTATION
+# =============================================================================
+
+class RequestChargeLimiter:
+    """
+    Client-side token bucket denominated in request units (RU).
+
+    Callers reserve an estimated charge before each request; if the bucket
+    is in deficit they sleep until it refills, which spreads bursts over
+    time instead of letting Cosmos reject them. Once the actual charge is
+    known the reservation is settled, and a 429 drains the bucket for the
+    server-advised retry-after window.
+    """
+
+    def __init__(
+        self,
+        ru_per_second: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = float(ru_per_second)
+        self.capacity = float(burst if burst is not None else ru_per_second)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float) -> float:
+        """Reserve `cost` RU, sleeping if the bucket is in deficit. Returns seconds waited."""
+        with self._lock:
+            self._refill()
+            self._tokens -= cost
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def settle(self, reserved: float, actual: float) -> None:
+        """Correct a reservation once the real request charge is known."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + reserved - actual)
+
+    def throttled(self, retry_after_seconds: float) -> None:
+        """Drain the bucket so no caller proceeds before the retry-after window."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -retry_after_seconds * self.rate)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+_limiter = RequestChargeLimiter(PROVISIONED_RU_PER_SECOND)
+
+# Running per-operation RU estimates used for reservations (seeded with
+# typical charges for ~1KB documents; refined by an EMA of observed charges)
+_charge_estimates: Dict[str, float] = {
+    "get_user_sessions": 3.0,
+    "get_session": 1.0,
+    "save_session": 10.0,
+    "delete_session": 10.0,
+}
+
+# Per-user RU usage: user_id -> {calls, request_charge, last_seen}, least
+# recently active first. Entries expire RETENTION_SECONDS after the user's
+# last call (Ghost Protocol sweep) and the table never exceeds
+# USER_CHARGE_MAX_USERS, so user ids never outlive their data.
+USER_CHARGE_MAX_USERS = 10000
+_user_charges: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+_user_charges_lock = threading.Lock()
+
+
+def _record_user_charge(user_id: str, charge: float) -> None:
+    with _user_charges_lock:
+        entry = _user_charges.pop(user_id, None) or {"calls": 0, "request_charge": 0.0}
+        entry["calls"] += 1
+        entry["request_charge"] += charge
+        entry["last_seen"] = time.time()
+        _user_charges[user_id] = entry
+        while len(_user_charges) > USER_CHARGE_MAX_USERS:
+            _user_charges.popitem(last=False)
+
+
+def get_user_request_charge(user_id: str) -> Dict[str, float]:
+    """Calls and total RU charged for `user_id` within the retention window."""
+    with _user_charges_lock:
+        entry = _user_charges.get(user_id)
+        return {"calls": entry["calls"], "request_charge": entry["request_charge"]} if entry \
+            else {"calls": 0, "request_charge": 0.0}
+
+
+def expire_user_charges(now: Optional[float] = None, dry_run: bool = False) -> int:
+    """Remove (or with `dry_run`, only count) per-user RU entries idle past retention."""
+    cutoff = (time.time() if now is None else now) - RetentionConfig.RETENTION_SECONDS
+    with _user_charges_lock:
+        expired = [user for user, entry in _user_charges.items() if entry["last_seen"] <= cutoff]
+        if not dry_run:
+            for user in expired:
+                del _user_charges[user]
+    return len(expired)
+
+
+class _ResponseRecorder:
+    """Cosmos `response_hook` that sums RU charge and throttle retries across pages."""
+
+    def __init__(self):
+        self.request_charge = 0.0
+        self.retries = 0
+        self.calls = 0
+
+    def __call__(self, headers, _result=None):
+        self.calls += 1
+        try:
+            self.request_charge += float(headers.get("x-ms-request-charge", 0) or 0)
+            self.retries += int(headers.get("x-ms-throttle-retry-count", 0) or 0)
+        except (TypeError, ValueError):
+            pass
+
+
+def _payload_size(payload: Any) -> int:
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _execute(operation: str, user_id: str, call: Callable[..., Any], payload: Any = None) -> Any:
+    """
+    Run a Cosmos call with RU pacing, 429 handling and instrumentation.
+
+    `call` receives a `response_hook` keyword to pass through to the SDK.
+    Exceptions (other than retried throttling) propagate to the caller after
+    being counted, so each public function keeps its own error handling.
+    """
+    estimate = _charge_estimates.get(operation, 5.0)
+    attempts = 0
+    charge = 0.0
+    retries = 0
+    result = None
+    start = time.perf_counter()
+    try:
+        while True:
+            waited = _limiter.acquire(estimate)
+            if waited:
+                metrics.observe("db_limiter_wait_ms", waited * 1000, operation=operation)
+            recorder = _ResponseRecorder()
+            try:
+                result = call(response_hook=recorder)
+            except exceptions.CosmosHttpResponseError as e:
+                _limiter.settle(estimate, recorder.request_charge)
+                charge += recorder.request_charge
+                retries += recorder.retries
+                if e.status_code != 429 or attempts >= MAX_THROTTLE_RETRIES:
+                    raise
+                attempts += 1
+                retries += 1
+                metrics.inc("db_throttled_total", operation=operation)
+                headers = getattr(e, "headers", None) or {}
+                retry_after_ms = float(headers.get("x-ms-retry-after-ms", 0) or 0)
+                _limiter.throttled(max(retry_after_ms / 1000.0, estimate / _limiter.rate))
+                continue
+            if not recorder.calls and _container is not None:
+                # Hook not invoked (older SDK paths): fall back to the last response
+                last = getattr(getattr(_container, "client_connection", None), "last_response_headers", None)
+                if last:
+                    recorder(last)
+            _limiter.settle(estimate, recorder.request_charge)
+            charge += recorder.request_charge
+            retries += recorder.retries
+            if recorder.request_charge:
+                _charge_estimates[operation] = 0.8 * estimate + 0.2 * recorder.request_charge
+            return result
+    except Exception:
+        metrics.inc("db_errors_total", operation=operation)
+        raise
+    finally:
+        latency_ms = (time.perf_counter() - start) * 1000
+        size = _payload_size(payload if payload is not None else result)
+        metrics.inc("db_calls_total", operation=operation)
+        metrics.inc("db_request_charge_total", charge, operation=operation)
+        _record_user_charge(user_id, charge)
+        metrics.inc("db_retries_total", retries, operation=operation)
+        metrics.observe("db_latency_ms", latency_ms, operation=operation)
+        metrics.observe("db_request_charge", charge, operation=operation)
+        metrics.observe("db_payload_bytes", size, operation=operation)
+
+
+def get_db_metrics() -> dict:
+    """Export db instrumentation (RU, latency, payload, retries) as plain dicts."""
+    snapshot = metrics.snapshot(prefix="db_")
+    snapshot["ru_available"] = _limiter.available
+    snapshot["charge_estimates"] = dict(_charge_estimates)
+    with _user_charges_lock:
+        snapshot["users_tracked"] = len(_user_charges)
+    return snapshot
+
+
 # In-memory fallback for development
 _memory_store: Dict[str, Dict[str, Any]] = {}
+_memory_expiry: Dict[str, float] = {}  # key -> absolute expiry (epoch seconds)
 
 
 def _get_memory_key(user_id: str, session_id: str) -> str:
     return f"{user_id}:{session_id}"
 
 
+def _resolve_ttl(data: Dict) -> int:
+    """
+    Resolve the TTL for a session document.
+
+    A per-item `ttl` in the payload overrides the container default.
+    Valid values follow Cosmos semantics: a positive number of seconds,
+    or -1 for "never expire". Anything else falls back to the default.
+    """
+    ttl = data.get("ttl")
+    if ttl is None:
+        return RetentionConfig.SESSION_TTL_SECONDS
+    if isinstance(ttl, bool) or not isinstance(ttl, int) or (ttl <= 0 and ttl != -1):
+        logging.warning(f"Invalid session ttl {ttl!r}; using default")
+        return RetentionConfig.SESSION_TTL_SECONDS
+    return ttl
+
+
+def _is_expired(key: str, now: float) -> bool:
+    """Lazily expire a single in-memory entry. Returns True if it was dropped."""
+    expires_at = _memory_expiry.get(key)
+    if expires_at is None or expires_at > now:
+        return False
+    _memory_store.pop(key, None)
+    _memory_expiry.pop(key, None)
+    return True
+
+
+def expire_sessions(now: Optional[float] = None, dry_run: bool = False) -> int:
+    """
+    Remove (or with `dry_run`, only count) expired in-memory sessions.
+
+    Retention-engine callback, run by the Ghost Protocol's background sweeper
+    (the only sweep of the fallback; reads also expire entries lazily).
+    """
+    now = time.time() if now is None else now
+    expired = [k for k, expires_at in list(_memory_expiry.items()) if expires_at <= now]
+    if not dry_run:
+        for key in expired:
+            _memory_store.pop(key, None)
+            _memory_expiry.pop(key, None)
+    return len(expired)
+
+
 def get_user_sessions(user_id: str) -> List[Dict]:
     """
     Get all session summaries for a user.
@@ -61,10 +368,11 @@ def get_user_sessions(user_id: str) -> List[Dict]:
     container = get_container()
     
     if container is None:
-        # In-memory fallback
+        # In-memory fallback (expired entries are skipped here and swept in the background)
+        now = time.time()
         sessions = []
-        for key, data in _memory_store.items():
-            if key.startswith(f"{user_id}:"):
+        for key, data in list(_memory_store.items()):
+            if key.startswith(f"{user_id}:") and not _is_expired(key, now):
                 sessions.append({
                     "id": data.get("session_id"),
                     "title": data.get("title", "New Consultation"),
@@ -76,11 +384,12 @@ def get_user_sessions(user_id: str) -> List[Dict]:
     
     try:
         query = "SELECT c.session_id, c.title, c.date, c.timestamp, c.isRenamed FROM c WHERE c.user_id = @user_id"
-        items = list(container.query_items(
+        items = _execute("get_user_sessions", user_id, lambda **kw: list(container.query_items(
             query=query,
             parameters=[{"name": "@user_id", "value": user_id}],
-            enable_cross_partition_query=False
-        ))
+            enable_cross_partition_query=False,
+            **kw
+        )))
         
         # Transform to expected format
         sessions = [{
@@ -103,10 +412,14 @@ def get_session(user_id: str, session_id: str) -> Optional[Dict]:
     
     if container is None:
         key = _get_memory_key(user_id, session_id)
+        if _is_expired(key, time.time()):
+            return None
         return _memory_store.get(key)
     
     try:
-        item = container.read_item(item=session_id, partition_key=user_id)
+        item = _execute("get_session", user_id, lambda **kw: container.read_item(
+            item=session_id, partition_key=user_id, **kw
+        ))
         return item
     except exceptions.CosmosResourceNotFoundError:
         return None
@@ -132,16 +445,21 @@ def save_session(user_id: str, session_id: str, data: Dict) -> bool:
         "facts": data.get("facts", {}),
         "strategy": data.get("strategy"),
         "backendState": data.get("backendState"),
-        "updatedAt": datetime.now(timezone.utc).isoformat()
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+        "ttl": _resolve_ttl(data)  # Seconds since last write; -1 = never expire
     }
     
     if container is None:
         key = _get_memory_key(user_id, session_id)
         _memory_store[key] = doc
+        if doc["ttl"] == -1:
+            _memory_expiry.pop(key, None)
+        else:
+            _memory_expiry[key] = time.time() + doc["ttl"]
         return True
     
     try:
-        container.upsert_item(doc)
+        _execute("save_session", user_id, lambda **kw: container.upsert_item(doc, **kw), payload=doc)
         return True
     except Exception as e:
         logging.error(f"Failed to save session {session_id}: {e}")
@@ -156,10 +474,13 @@ def delete_session(user_id: str, session_id: str) -> bool:
         key = _get_memory_key(user_id, session_id)
         if key in _memory_store:
             del _memory_store[key]
+        _memory_expiry.pop(key, None)
         return True
     
     try:
-        container.delete_item(item=session_id, partition_key=user_id)
+        _execute("delete_session", user_id, lambda **kw: container.delete_item(
+            item=session_id, partition_key=user_id, **kw
+        ))
         return True
     except exceptions.CosmosResourceNotFoundError:
         return True  # Already deleted
@@ -176,3 +497,15 @@ def rename_session(user_id: str, session_id: str, new_title: str) -> bool:
         session["isRenamed"] = True
         return save_session(user_id, session_id, session)
     return False
+
+
+# Expire the in-memory fallback with the Ghost Protocol's sweeper. Cosmos
+# documents carry their own `ttl` and are expired server-side.
+register_store("sessions", lambda now, dry_run: {
+    "expired": expire_sessions(now, dry_run),
+    "backend": "memory" if _container is None else "cosmos",
+})
+register_store("db_user_charges", lambda now, dry_run: {
+    "expired": expire_user_charges(now, dry_run),
+    "users": len(_user_charges),
+})
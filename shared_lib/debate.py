@@ -8,13 +8,42 @@ A "debate round" consists of:
   1. Strategist presents/refines their argument
   2. Critic rebuts and assigns a risk score (0.0 - 1.0)
 
-The debate terminates when:
+The debate terminates when its termination policy says so. The default
+policy stops when:
   - 7 rounds are completed (hard cap), OR
-  - KS stability is detected (risk scores have converged after turn 3)
+  - KS stability is detected (risk scores have converged after turn 3), OR
+  - the next round would overrun the wall-clock, token or cost budget
+Policies compose with `|` (any) and `&` (all); the result records which
+policy ended the debate.
+
+With a context cap, agents see a compacted history (HistoryCompactor): the
+last round verbatim plus one digest round summarizing the earlier claims,
+rebuttals and risk trajectory, so prompts stop growing with every round.
+
+`run_debate_async` drives the rounds on asyncio: the strategist's argument
+is streamed, the critic starts speculatively once the argument looks
+complete (and is cancelled and restarted if the argument then changes),
+and each finished round is persisted/emitted in the background while the
+next round is already running.
+
+`run_debate_branches_async` runs several independent debates (branches)
+concurrently under a per-tenant limit on in-flight rounds, prunes branches
+that keep diverging or can no longer win, and returns the lowest-risk
+converged branch.
 """
+import asyncio
 import logging
 import math
-from typing import List, Optional, TypedDict
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypedDict, Union
+
+from shared_lib.config import DebateConfig
+from shared_lib.metrics import metrics
 
 
 # =============================================================================
@@ -27,6 +56,17 @@ class DebateRound(TypedDict, total=False):
     strategist_argument: str
     critic_rebuttal: str
     risk_score: float  # 0.0 (no risk) to 1.0 (case will fail)
+    timing: Dict[str, float]  # Per-round timings set by run_debate_async (see _run_round)
+    usage: Dict[str, int]  # Estimated prompt_tokens / completion_tokens (see _run_round)
+    digest: "DebateDigest"  # Only on the summary round of a compacted history
+
+
+class DebateDigest(TypedDict):
+    """Compact record of the rounds before the last one (see HistoryCompactor)."""
+    turns: List[int]
+    claims: List[str]
+    rebuttals: List[str]
+    risk_trajectory: List[float]
 
 
 class DebateResult(TypedDict):
@@ -37,6 +77,7 @@ class DebateResult(TypedDict):
     final_risk_score: float
     final_strategy: str
     final_critique: str
+    terminated_by: Optional[str]  # Name of the termination policy that ended the debate
 
 
 # =============================================================================
@@ -58,7 +99,8 @@ def check_convergence(debate_history: List[DebateRound]) -> bool:
     AND at least MIN_TURNS_BEFORE_KS rounds have been completed.
 
     This is a simplified version of the full KS test that works well
-    for the small sample sizes in our debate protocol (3-7 rounds).
+    for the small sample sizes in our debate protocol (3-7 rounds); see
+    KSTestPolicy for the two-sample test over windows of scores.
 
     Args:
         debate_history: List of completed DebateRound entries.
@@ -107,6 +149,58 @@ def compute_ks_statistic(scores: List[float]) -> float:
     return min(max_deviation, 1.0)
 
 
+KS_EXACT_MAX_CELLS = 10_000  # Exact two-sample p-values up to n * m cells
+
+
+def _ks_exact_p_value(n: int, m: int, gap: int) -> float:
+    """P(D >= gap / (n*m)) under H0: lattice paths leaving the band |i*m - j*n| < gap."""
+    paths = [1 if j * n < gap else 0 for j in range(m + 1)]
+    for j in range(1, m + 1):
+        paths[j] = paths[j - 1] if paths[j] else 0
+    for i in range(1, n + 1):
+        paths[0] = paths[0] if i * m < gap else 0
+        for j in range(1, m + 1):
+            paths[j] = paths[j] + paths[j - 1] if abs(i * m - j * n) < gap else 0
+    return max(0.0, min(1.0, 1.0 - paths[m] / math.comb(n + m, n)))
+
+
+def _ks_asymptotic_p_value(n: int, m: int, statistic: float) -> float:
+    """Kolmogorov distribution tail with the Stephens small-sample correction."""
+    en = math.sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * statistic
+    if lam < 1e-3:
+        return 1.0
+    total = sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return max(0.0, min(1.0, 2 * total))
+
+
+def ks_two_sample(a: Sequence[float], b: Sequence[float]) -> Tuple[float, float]:
+    """
+    Two-sample Kolmogorov-Smirnov test.
+
+    Args:
+        a, b: The two samples (e.g. consecutive windows of risk scores).
+
+    Returns:
+        (statistic, p_value): the largest gap between the two empirical
+        CDFs, and the two-sided p-value (exact for small samples without
+        ties, asymptotic otherwise). A high p-value means the samples are
+        indistinguishable.
+    """
+    n, m = len(a), len(b)
+    if not n or not m:
+        return 0.0, 1.0
+    a, b = sorted(a), sorted(b)
+    # Integer CDF gap (|F_a - F_b| * n * m) keeps the exact test free of rounding
+    gap = max(abs(bisect_right(a, v) * m - bisect_right(b, v) * n) for v in set(a) | set(b))
+    statistic = gap / (n * m)
+    if gap == 0:
+        return 0.0, 1.0
+    if n * m <= KS_EXACT_MAX_CELLS:
+        return statistic, _ks_exact_p_value(n, m, gap)
+    return statistic, _ks_asymptotic_p_value(n, m, statistic)
+
+
 def extract_risk_score(critic_output: str) -> float:
     """
     Extract a risk score from the critic's textual output.
@@ -120,8 +214,6 @@ def extract_risk_score(critic_output: str) -> float:
     Returns:
         Extracted risk score between 0.0 and 1.0.
     """
-    import re
-
     # Try "Risk: X.X" or "Risk Score: X.X"
     match = re.search(r"[Rr]isk\s*(?:[Ss]core)?[\s:]*(\d+\.?\d*)", critic_output)
     if match:
@@ -141,7 +233,8 @@ def extract_risk_score(critic_output: str) -> float:
 
 def create_debate_result(
     debate_history: List[DebateRound],
-    converged: bool
+    converged: bool,
+    terminated_by: Optional[str] = None,
 ) -> DebateResult:
     """
     Create a structured DebateResult from the debate history.
@@ -149,6 +242,7 @@ def create_debate_result(
     Args:
         debate_history: List of completed debate rounds.
         converged: Whether the debate terminated via KS convergence.
+        terminated_by: Name of the termination policy that ended it.
 
     Returns:
         A DebateResult with final scores and arguments.
@@ -162,4 +256,855 @@ def create_debate_result(
         "final_risk_score": final_round.get("risk_score", 0.5),
         "final_strategy": final_round.get("strategist_argument", ""),
         "final_critique": final_round.get("critic_rebuttal", ""),
+        "terminated_by": terminated_by,
     }
+
+
+# =============================================================================
+# TERMINATION POLICIES
+# =============================================================================
+
+CHARS_PER_TOKEN = 4  # Token estimate for English prose (no tokenizer dependency)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class DebateProgress:
+    """What termination policies see: the rounds so far and what they cost."""
+
+    def __init__(self, history: List[DebateRound], started: Optional[float] = None):
+        self.history = history
+        self.started = time.perf_counter() if started is None else started
+
+    @property
+    def turns(self) -> int:
+        return len(self.history)
+
+    @property
+    def risk_scores(self) -> List[float]:
+        return [r.get("risk_score", 0.5) for r in self.history]
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def round_tokens(self, debate_round: DebateRound) -> int:
+        usage = debate_round.get("usage", {})
+        return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.round_tokens(r) for r in self.history)
+
+    def round_cost(self, debate_round: DebateRound) -> float:
+        usage = debate_round.get("usage", {})
+        return (usage.get("prompt_tokens", 0) * DebateConfig.PROMPT_COST_PER_1K
+                + usage.get("completion_tokens", 0) * DebateConfig.COMPLETION_COST_PER_1K) / 1000
+
+    @property
+    def cost(self) -> float:
+        return sum(self.round_cost(r) for r in self.history)
+
+
+class TerminationPolicy(ABC):
+    """
+    Decides after each round whether the debate stops.
+
+    Subclasses implement `triggered`. `converged` marks policies whose stop
+    means the scores settled (as opposed to running out of turns or budget).
+    Combine policies with `|` (stop when any triggers) and `&` (all).
+    """
+
+    name = "policy"
+    converged = False
+
+    @abstractmethod
+    def triggered(self, progress: DebateProgress) -> bool:
+        """Whether this policy alone would stop the debate now."""
+
+    def evaluate(self, progress: DebateProgress) -> Optional["TerminationPolicy"]:
+        """The policy that ends the debate now, or None to keep going."""
+        return self if self.triggered(progress) else None
+
+    def __or__(self, other: "TerminationPolicy") -> "TerminationPolicy":
+        return AnyPolicy(self, other)
+
+    def __and__(self, other: "TerminationPolicy") -> "TerminationPolicy":
+        return AllPolicies(self, other)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class AnyPolicy(TerminationPolicy):
+    """Stops when any member triggers (the first one, in order, is reported)."""
+
+    def __init__(self, *policies: TerminationPolicy):
+        self.policies: List[TerminationPolicy] = []
+        for policy in policies:
+            self.policies.extend(policy.policies if isinstance(policy, AnyPolicy) else [policy])
+        self.name = " | ".join(p.name for p in self.policies)
+
+    def evaluate(self, progress: DebateProgress) -> Optional[TerminationPolicy]:
+        for policy in self.policies:
+            stop = policy.evaluate(progress)
+            if stop is not None:
+                return stop
+        return None
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        return self.evaluate(progress) is not None
+
+
+class AllPolicies(TerminationPolicy):
+    """Stops only when every member triggers; counts as converged if any member does."""
+
+    def __init__(self, *policies: TerminationPolicy):
+        self.policies = list(policies)
+        self.name = " & ".join(p.name for p in self.policies)
+        self.converged = any(p.converged for p in self.policies)
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        return all(p.evaluate(progress) is not None for p in self.policies)
+
+
+class MaxTurnsPolicy(TerminationPolicy):
+    """Hard cap on the number of rounds."""
+
+    name = "max_turns"
+
+    def __init__(self, max_turns: int = MAX_DEBATE_TURNS):
+        self.max_turns = max_turns
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        return progress.turns >= self.max_turns
+
+
+class KSDriftPolicy(TerminationPolicy):
+    """The last two risk scores differ by less than `threshold` (check_convergence)."""
+
+    name = "ks_drift"
+    converged = True
+
+    def __init__(self, threshold: float = KS_THRESHOLD, min_turns: int = MIN_TURNS_BEFORE_KS):
+        self.threshold = threshold
+        self.min_turns = min_turns
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        scores = progress.risk_scores
+        if len(scores) < max(self.min_turns, 2):
+            return False
+        drift = abs(scores[-1] - scores[-2])
+        if drift < self.threshold:
+            logging.info(
+                f"[Debate] KS convergence detected at turn {len(scores)}: "
+                f"drift={drift:.4f} < threshold={self.threshold}"
+            )
+            return True
+        return False
+
+
+class KSTestPolicy(TerminationPolicy):
+    """
+    Two-sample KS test (ks_two_sample) of the latest `window` risk scores
+    against the `window` before them: stops once the two windows are
+    indistinguishable (p-value above `alpha`). With 3-score windows the
+    smallest possible p-value is 0.1, reached only when the windows do not
+    overlap at all, so the default alpha stops unless the scores still trend.
+    """
+
+    name = "ks_test"
+    converged = True
+
+    def __init__(self, window: int = 3, alpha: float = 0.1):
+        self.window = window
+        self.alpha = alpha
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        scores = progress.risk_scores
+        if len(scores) < 2 * self.window:
+            return False
+        statistic, p_value = ks_two_sample(scores[-2 * self.window:-self.window], scores[-self.window:])
+        return p_value > self.alpha
+
+
+class WallClockBudget(TerminationPolicy):
+    """Stops when another round like the last one would overrun `seconds`."""
+
+    name = "wall_clock"
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        if not progress.history:
+            return progress.elapsed_seconds >= self.seconds
+        last = progress.history[-1].get("timing", {}).get("round_ms", 0.0) / 1000
+        return progress.elapsed_seconds + last > self.seconds
+
+
+class TokenBudget(TerminationPolicy):
+    """Stops when another round like the last one would exceed `max_tokens`."""
+
+    name = "token_budget"
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        last = progress.round_tokens(progress.history[-1]) if progress.history else 0
+        return progress.tokens + last > self.max_tokens
+
+
+class CostBudget(TerminationPolicy):
+    """Stops when another round like the last one would exceed `max_usd`
+    (priced with DebateConfig.PROMPT_COST_PER_1K / COMPLETION_COST_PER_1K)."""
+
+    name = "cost_budget"
+
+    def __init__(self, max_usd: float):
+        self.max_usd = max_usd
+
+    def triggered(self, progress: DebateProgress) -> bool:
+        last = progress.round_cost(progress.history[-1]) if progress.history else 0.0
+        return progress.cost + last > self.max_usd
+
+
+def default_termination_policy(max_turns: int = MAX_DEBATE_TURNS) -> TerminationPolicy:
+    """KS drift, the turn cap, and whichever DebateConfig budgets are set."""
+    policy = KSDriftPolicy() | MaxTurnsPolicy(max_turns)
+    if DebateConfig.WALL_CLOCK_BUDGET_SECONDS > 0:
+        policy |= WallClockBudget(DebateConfig.WALL_CLOCK_BUDGET_SECONDS)
+    if DebateConfig.TOKEN_BUDGET > 0:
+        policy |= TokenBudget(DebateConfig.TOKEN_BUDGET)
+    if DebateConfig.COST_BUDGET_USD > 0:
+        policy |= CostBudget(DebateConfig.COST_BUDGET_USD)
+    return policy
+
+
+# =============================================================================
+# HISTORY COMPACTION
+# =============================================================================
+
+CLAIMS_PER_ROUND = 3     # New strategist sentences kept per summarized round
+REBUTTALS_PER_ROUND = 2  # Critic sentences kept per summarized round
+POINT_MAX_CHARS = 240    # Longer claims / rebuttals are cut at a word boundary
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_RISK_SENTENCE_RE = re.compile(r"[Rr]isk\s*(?:[Ss]core)?[\s:]*\d|\d+\.?\d*\s*/\s*10")
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+
+
+def _key_sentences(text: str, limit: int, seen: set) -> List[str]:
+    """The first `limit` sentences of `text` not seen before (risk-score sentences skipped)."""
+    points = []
+    for sentence in _SENTENCE_RE.split(text.strip()):
+        key = " ".join(sentence.lower().split())
+        if not key or key in seen or _RISK_SENTENCE_RE.search(sentence):
+            continue
+        seen.add(key)
+        points.append(_shorten(sentence.strip(), POINT_MAX_CHARS))
+        if len(points) == limit:
+            break
+    return points
+
+
+def history_tokens(history: List[DebateRound]) -> int:
+    """Estimated tokens of the debate text an agent is prompted with."""
+    return sum(estimate_tokens(r.get("strategist_argument", "")) + estimate_tokens(r.get("critic_rebuttal", ""))
+               for r in history)
+
+
+class HistoryCompactor:
+    """
+    Incrementally compacted debate history for agent prompts.
+
+    `add` is called once per finished round; the round before it is then
+    folded into the digest (its new claims, its rebuttal points and its risk
+    score), so no round is summarized twice. `history()` returns what the
+    agents see: a digest round (when there are earlier rounds) followed by
+    the last round verbatim, together at most `max_context_tokens`
+    (history_tokens; defaults to DebateConfig.CONTEXT_TOKENS, 0 = no cap).
+    The oldest digest points are dropped first; the last round is only
+    shortened if it alone exceeds the cap. `context(history)` is what the
+    debate engine prompts with: the full history while it fits under the
+    cap, the compacted one after that.
+    """
+
+    def __init__(self, max_context_tokens: Optional[int] = None):
+        if max_context_tokens is None:
+            max_context_tokens = DebateConfig.CONTEXT_TOKENS
+        self.max_context_tokens = max_context_tokens
+        self.digest: DebateDigest = {"turns": [], "claims": [], "rebuttals": [], "risk_trajectory": []}
+        self._last: Optional[DebateRound] = None
+        self._seen_claims: set = set()
+        self._seen_rebuttals: set = set()
+        self._rendered: Optional[List[DebateRound]] = None
+        self._verbatim_tokens = 0
+
+    def add(self, debate_round: DebateRound) -> None:
+        if self._last is not None:
+            self._fold(self._last)
+        self._last = debate_round
+        self._rendered = None
+        self._verbatim_tokens += history_tokens([debate_round])
+
+    def _fold(self, debate_round: DebateRound) -> None:
+        turn = debate_round.get("turn_number", len(self.digest["turns"]) + 1)
+        self.digest["turns"].append(turn)
+        self.digest["risk_trajectory"].append(debate_round.get("risk_score", 0.5))
+        for claim in _key_sentences(debate_round.get("strategist_argument", ""), CLAIMS_PER_ROUND,
+                                    self._seen_claims):
+            self.digest["claims"].append(f"[T{turn}] {claim}")
+        for point in _key_sentences(debate_round.get("critic_rebuttal", ""), REBUTTALS_PER_ROUND,
+                                    self._seen_rebuttals):
+            self.digest["rebuttals"].append(f"[T{turn}] {point}")
+
+    def _last_round(self, budget: float) -> DebateRound:
+        last = self._last
+        if history_tokens([last]) <= budget:
+            return last
+        half = max(budget // 2, 1) * CHARS_PER_TOKEN
+        return {
+            **last,
+            "strategist_argument": _shorten(last.get("strategist_argument", ""), half - 3),
+            "critic_rebuttal": _shorten(last.get("critic_rebuttal", ""), half - 3),
+        }
+
+    def _digest_round(self, budget: float) -> DebateRound:
+        trajectory = " -> ".join(
+            f"T{t} {r:.2f}" for t, r in zip(self.digest["turns"], self.digest["risk_trajectory"])
+        )
+        trajectory_line = f"Risk trajectory: {trajectory}"
+        remaining = budget - estimate_tokens(trajectory_line) - 2
+        # Newest points first, alternating claims and rebuttals, until the budget runs out
+        claims, rebuttals = [], []
+        queues = [(self.digest["claims"], claims), (self.digest["rebuttals"], rebuttals)]
+        positions = [len(self.digest["claims"]) - 1, len(self.digest["rebuttals"]) - 1]
+        while remaining > 0 and any(p >= 0 for p in positions):
+            for q, (source, kept) in enumerate(queues):
+                if positions[q] < 0:
+                    continue
+                cost = estimate_tokens(source[positions[q]]) + 1
+                if cost > remaining:
+                    positions[q] = -1
+                    continue
+                kept.insert(0, source[positions[q]])
+                remaining -= cost
+                positions[q] -= 1
+        return {
+            "turn_number": self.digest["turns"][-1],
+            "strategist_argument": "\n".join(claims),
+            "critic_rebuttal": "\n".join(rebuttals + [trajectory_line]),
+            "risk_score": self.digest["risk_trajectory"][-1],
+            "digest": {key: list(value) for key, value in self.digest.items()},
+        }
+
+    def history(self) -> List[DebateRound]:
+        """The compacted history: [digest round,] last round."""
+        if self._last is None:
+            return []
+        if self._rendered is None:
+            cap = self.max_context_tokens if self.max_context_tokens > 0 else math.inf
+            last = self._last_round(cap)
+            rendered = [last]
+            budget = cap - history_tokens([last])
+            if self.digest["turns"] and budget > 0:
+                rendered.insert(0, self._digest_round(budget))
+            self._rendered = rendered
+        return list(self._rendered)
+
+    def context(self, history: List[DebateRound]) -> List[DebateRound]:
+        """`history` verbatim while it fits under the cap, else history()."""
+        if self.max_context_tokens <= 0 or self._verbatim_tokens > self.max_context_tokens:
+            return self.history()
+        return history
+
+
+# =============================================================================
+# ASYNC DEBATE ENGINE
+# =============================================================================
+
+# Speculative critic start: once the streamed argument is at least this long
+# (and this share of the previous round's argument) and ends a sentence
+SPECULATION_MIN_CHARS = 400
+SPECULATION_MIN_FRACTION = 0.8
+# Text the strategist may still append after the critic started before the
+# speculative critique counts as stale (share of the final argument). Any
+# appended text invalidates it by default: the tail is usually the
+# argument's conclusion. A nonzero tolerance is opt-in per debate.
+SPECULATION_TOLERANCE = 0.0
+
+# strategist(history) -> streamed argument chunks (an awaitable str also works)
+Strategist = Callable[[List[DebateRound]], Union[AsyncIterator[str], Awaitable[str]]]
+# critic(argument, history) -> rebuttal text containing the risk score
+Critic = Callable[[str, List[DebateRound]], Awaitable[str]]
+# on_round(round) -> persistence / SSE emission of a finished round
+RoundSink = Callable[[DebateRound], Awaitable[None]]
+
+
+async def _stream(source) -> AsyncIterator[str]:
+    if hasattr(source, "__aiter__"):
+        async for chunk in source:
+            yield chunk
+    else:
+        yield await source
+
+
+def _complete_enough(argument: str, previous_length: int, min_chars: int) -> bool:
+    """Whether a partial argument is worth critiquing before the stream ends."""
+    if len(argument) < max(min_chars, SPECULATION_MIN_FRACTION * previous_length):
+        return False
+    return argument.rstrip().endswith((".", "!", "?"))
+
+
+def _argument_changed(speculated: str, final: str, tolerance: float = SPECULATION_TOLERANCE) -> bool:
+    """Whether the final argument invalidates a critique of `speculated` (trailing whitespace never does)."""
+    if not final.startswith(speculated):
+        return True
+    tail = final[len(speculated):]
+    return bool(tail.strip()) and len(tail) > tolerance * len(final)
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logging.warning(f"[Debate] Cancelled speculative critic failed: {e}")
+
+
+async def _run_round(turn: int, history: List[DebateRound], strategist: Strategist, critic: Critic,
+                     speculate: bool, min_chars: int,
+                     tolerance: float = SPECULATION_TOLERANCE) -> DebateRound:
+    """
+    One strategist/critic round with a speculative critic start.
+
+    Timing keys (ms): strategist_ms (stream start to end), critic_ms (critic
+    start to rebuttal, counting only the critic run that was used),
+    critic_wait_ms (from the end of the argument to the rebuttal) and round_ms;
+    speculative / speculation_cancelled are 1.0 or 0.0.
+
+    Usage (estimate_tokens): both agents are prompted with the history and
+    the critic also with the argument (again if a speculative run was
+    cancelled); completions are the argument and the rebuttal.
+    """
+    start = time.perf_counter()
+    # `history` is what the agents see (possibly compacted, see HistoryCompactor)
+    previous_length = len(history[-1].get("strategist_argument", "")) if history else 0
+    snapshot = list(history)
+    parts: List[str] = []
+    length = 0
+    speculation: Optional[asyncio.Task] = None
+    speculated = ""
+    critic_start = 0.0
+
+    try:
+        async for chunk in _stream(strategist(snapshot)):
+            parts.append(chunk)
+            length += len(chunk)
+            if speculate and speculation is None and length >= min_chars:
+                partial = "".join(parts)
+                if _complete_enough(partial, previous_length, min_chars):
+                    speculated = partial
+                    critic_start = time.perf_counter()
+                    speculation = asyncio.create_task(critic(partial, snapshot))
+
+        argument = "".join(parts)
+        argued = time.perf_counter()
+        cancelled = False
+        if speculation is not None and _argument_changed(speculated, argument, tolerance):
+            await _cancel(speculation)
+            speculation, cancelled = None, True
+
+        if speculation is not None:
+            rebuttal = await speculation
+            outcome = "hit"
+        else:
+            critic_start = time.perf_counter()
+            rebuttal = await critic(argument, snapshot)
+            outcome = "cancelled" if cancelled else "none"
+    finally:
+        # A failed or cancelled stream must not leave the speculative critic call running
+        if speculation is not None and not speculation.done():
+            await _cancel(speculation)
+    done = time.perf_counter()
+    metrics.inc("debate_speculation_total", outcome=outcome)
+
+    timing = {
+        "strategist_ms": (argued - start) * 1000,
+        "critic_ms": (done - critic_start) * 1000,
+        "critic_wait_ms": (done - argued) * 1000,
+        "round_ms": (done - start) * 1000,
+        "speculative": 1.0 if outcome == "hit" else 0.0,
+        "speculation_cancelled": 1.0 if cancelled else 0.0,
+    }
+    metrics.observe("debate_round_ms", timing["round_ms"])
+    context = history_tokens(snapshot)
+    usage = {
+        "prompt_tokens": 2 * context + estimate_tokens(argument) + (estimate_tokens(speculated) if cancelled else 0),
+        "completion_tokens": estimate_tokens(argument) + estimate_tokens(rebuttal),
+    }
+    return {
+        "turn_number": turn,
+        "strategist_argument": argument,
+        "critic_rebuttal": rebuttal,
+        "risk_score": extract_risk_score(rebuttal),
+        "timing": timing,
+        "usage": usage,
+    }
+
+
+def _compactor(max_context_tokens: Optional[int]) -> Optional[HistoryCompactor]:
+    limit = DebateConfig.CONTEXT_TOKENS if max_context_tokens is None else max_context_tokens
+    return HistoryCompactor(limit) if limit > 0 else None
+
+
+async def _emit(previous: Optional[asyncio.Task], on_round: RoundSink, debate_round: DebateRound) -> None:
+    """Emit one round after the previous emission, so sinks see rounds in order."""
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+    try:
+        await on_round(debate_round)
+    except Exception as e:
+        logging.error(f"[Debate] Round {debate_round.get('turn_number')} emission failed: {e}")
+
+
+async def run_debate_async(
+    strategist: Strategist,
+    critic: Critic,
+    on_round: Optional[RoundSink] = None,
+    max_turns: int = MAX_DEBATE_TURNS,
+    speculate: bool = True,
+    speculation_min_chars: int = SPECULATION_MIN_CHARS,
+    policy: Optional[TerminationPolicy] = None,
+    max_context_tokens: Optional[int] = None,
+    speculation_tolerance: float = SPECULATION_TOLERANCE,
+) -> DebateResult:
+    """
+    Run the adversarial debate on asyncio.
+
+    Each round streams the strategist's argument; once it is complete
+    enough the critic starts on it speculatively, and is cancelled and
+    rerun on the final argument if the strategist adds to or changes it
+    afterwards. Finished rounds go to `on_round` in the background (in
+    order) while the next round runs; all emissions finish before this
+    returns. After every round `policy` decides whether to stop; `max_turns`
+    always applies on top of it.
+
+    Args:
+        strategist: strategist(history) -> async iterator of argument chunks.
+        critic: critic(argument, history) -> rebuttal text with a risk score.
+        on_round: Optional async sink for persistence / SSE.
+        max_turns: Hard cap on rounds.
+        speculate: Set False to always wait for the full argument.
+        speculation_min_chars: Minimum argument length for a speculative start.
+        policy: Termination policy (defaults to default_termination_policy()).
+        max_context_tokens: Cap on the history the agents see; once every
+            round verbatim would exceed it they get HistoryCompactor.history()
+            instead (defaults to DebateConfig.CONTEXT_TOKENS, 0 = no cap).
+        speculation_tolerance: Share of the final argument that may arrive
+            after a speculative critic start without rerunning the critic
+            (default 0: any new text reruns it).
+
+    Returns:
+        The DebateResult, with `terminated_by` naming the policy that ended
+        it; every round carries its `timing` and `usage`.
+    """
+    policy = (policy or default_termination_policy(max_turns)) | MaxTurnsPolicy(max_turns)
+    compactor = _compactor(max_context_tokens)
+    progress = DebateProgress([])
+    history = progress.history
+    emission: Optional[asyncio.Task] = None
+    stop: Optional[TerminationPolicy] = None
+    try:
+        while stop is None:
+            context = compactor.context(history) if compactor else history
+            debate_round = await _run_round(len(history) + 1, context, strategist, critic,
+                                            speculate, speculation_min_chars, speculation_tolerance)
+            history.append(debate_round)
+            if compactor:
+                compactor.add(debate_round)
+            if on_round is not None:
+                emission = asyncio.create_task(_emit(emission, on_round, debate_round))
+            stop = policy.evaluate(progress)
+    finally:
+        if emission is not None:
+            await asyncio.gather(emission, return_exceptions=True)
+    metrics.inc("debate_terminated_total", policy=stop.name)
+    return create_debate_result(history, stop.converged, stop.name)
+
+
+def run_debate(strategist: Strategist, critic: Critic, **kwargs) -> DebateResult:
+    """Blocking wrapper around run_debate_async for synchronous graph nodes."""
+    return asyncio.run(run_debate_async(strategist, critic, **kwargs))
+
+
+# =============================================================================
+# PARALLEL BRANCHES
+# =============================================================================
+
+# A branch whose last MIN_TURNS_BEFORE_KS risk scores still deviate this much
+# (compute_ks_statistic) is diverging and gets pruned
+BRANCH_DIVERGENCE_THRESHOLD = 0.3
+# Rounds a branch may run past the turn at which another branch converged
+BRANCH_GRACE_TURNS = 1
+
+_tenant_limiters: Dict[str, "TenantLimiter"] = {}
+_tenant_limiters_lock = threading.Lock()
+
+
+class BranchSummary(TypedDict):
+    """How one branch of a multi-branch debate ended."""
+    branch: int
+    turns: int
+    final_risk_score: float
+    ks_statistic: float
+    outcome: str  # converged | exhausted | diverging | dominated | straggler | failed
+
+
+class BranchedDebateResult(DebateResult, total=False):
+    """DebateResult of the selected branch, plus how every branch ended."""
+    branch: int
+    branches: List[BranchSummary]
+
+
+class _Branch:
+    def __init__(self, index: int, strategist: Strategist, critic: Critic):
+        self.index = index
+        self.strategist = strategist
+        self.critic = critic
+        self.progress = DebateProgress([])
+        self.history: List[DebateRound] = self.progress.history
+        self.outcome: Optional[str] = None
+        self.stopped_by: Optional[str] = None
+        self.compactor: Optional[HistoryCompactor] = None
+
+    @property
+    def context(self) -> List[DebateRound]:
+        return self.compactor.context(self.history) if self.compactor else self.history
+
+    @property
+    def scores(self) -> List[float]:
+        return [r.get("risk_score", 0.5) for r in self.history]
+
+    @property
+    def risk(self) -> float:
+        return self.history[-1].get("risk_score", 0.5) if self.history else 1.0
+
+    def summary(self) -> BranchSummary:
+        return {
+            "branch": self.index,
+            "turns": len(self.history),
+            "final_risk_score": self.risk,
+            "ks_statistic": compute_ks_statistic(self.scores),
+            "outcome": self.outcome,
+        }
+
+
+class TenantLimiter:
+    """
+    Process-wide async semaphore: at most `limit` holders across every
+    thread and event loop (run_debate_branches starts a new loop per call).
+
+    A lock guards the holder count and a FIFO of waiting futures; release
+    hands the slot straight to the oldest waiter on its own loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: deque = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = waiter not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(waiter)
+            if handed_over:
+                self.release()  # Pass on the slot released to us
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return  # The slot moves to the waiter; the count is unchanged
+                except RuntimeError:
+                    continue  # Its loop is closed
+            self._active -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def tenant_slots(tenant: str, limit: int) -> TenantLimiter:
+    """
+    The limiter bounding one tenant's in-flight debate rounds in this
+    process. `limit` only applies when the tenant is first seen.
+    """
+    with _tenant_limiters_lock:
+        if tenant not in _tenant_limiters:
+            _tenant_limiters[tenant] = TenantLimiter(limit)
+        return _tenant_limiters[tenant]
+
+
+def _per_branch(agent, count: int, role: str) -> list:
+    if callable(agent):
+        return [agent] * count
+    agents = list(agent)
+    if len(agents) != count:
+        raise ValueError(f"Expected {count} {role} callables (one per branch), got {len(agents)}")
+    return agents
+
+
+def _branch_verdict(branch: _Branch, branches: List[_Branch], policy: TerminationPolicy) -> Optional[str]:
+    """Why `branch` stops after its latest round (None = keep debating)."""
+    stop = policy.evaluate(branch.progress)
+    if stop is not None and stop.converged:
+        branch.stopped_by = stop.name
+        return "converged"
+    turns = len(branch.history)
+    converged = [b for b in branches if b.outcome == "converged"]
+    if converged:
+        if turns >= MIN_TURNS_BEFORE_KS and branch.risk >= min(b.risk for b in converged):
+            return "dominated"
+        if turns >= min(len(b.history) for b in converged) + BRANCH_GRACE_TURNS:
+            return "straggler"
+    if turns >= MIN_TURNS_BEFORE_KS:
+        drift = compute_ks_statistic(branch.scores[-MIN_TURNS_BEFORE_KS:])
+        # Never prune the last branch still in the running
+        alive = any(b is not branch and b.outcome in (None, "converged") for b in branches)
+        if drift > BRANCH_DIVERGENCE_THRESHOLD and alive:
+            return "diverging"
+    if stop is not None:
+        branch.stopped_by = stop.name
+        return "exhausted"
+    return None
+
+
+async def run_debate_branches_async(
+    strategist: Union[Strategist, Sequence[Strategist]],
+    critic: Union[Critic, Sequence[Critic]],
+    branches: Optional[int] = None,
+    tenant: str = "default",
+    max_concurrency: Optional[int] = None,
+    max_turns: int = MAX_DEBATE_TURNS,
+    speculate: bool = True,
+    speculation_min_chars: int = SPECULATION_MIN_CHARS,
+    policy: Optional[TerminationPolicy] = None,
+    max_context_tokens: Optional[int] = None,
+    speculation_tolerance: float = SPECULATION_TOLERANCE,
+) -> BranchedDebateResult:
+    """
+    Run independent debate branches concurrently and keep the best one.
+
+    Every round of every branch holds one of the tenant's slots (see
+    tenant_slots) while it runs, so with `branches` <= the tenant's limit the
+    debate takes about as long as a single branch. After each round a branch
+    stops when it converges (check_convergence), when it is diverging (its
+    recent risk scores still swing by more than BRANCH_DIVERGENCE_THRESHOLD),
+    when another branch has converged at a lower or equal risk, or when it
+    runs BRANCH_GRACE_TURNS rounds past another branch's convergence.
+    Convergence and budgets come from `policy`, evaluated per branch.
+
+    Args:
+        strategist: One strategist for every branch, or one per branch.
+        critic: One critic for every branch, or one per branch.
+        branches: Number of branches (defaults to DebateConfig.BRANCHES, or
+            the number of strategists/critics given).
+        tenant: Key of the concurrency limit shared by this tenant's debates.
+        max_concurrency: Limit for a tenant seen for the first time
+            (defaults to DebateConfig.TENANT_CONCURRENCY).
+        max_turns, speculate, speculation_min_chars, policy, max_context_tokens,
+        speculation_tolerance: As for run_debate_async (each branch compacts
+            its own history).
+
+    Returns:
+        The lowest-risk converged branch's DebateResult (else the lowest-risk
+        branch that ran out of turns or budget, else the lowest-risk branch), with
+        `branch` set to its index and `branches` summarizing every branch.
+    """
+    if branches is None:
+        sized = next((a for a in (strategist, critic) if not callable(a)), None)
+        branches = len(sized) if sized is not None else DebateConfig.BRANCHES
+    strategists = _per_branch(strategist, branches, "strategist")
+    critics = _per_branch(critic, branches, "critic")
+    slots = tenant_slots(tenant, max_concurrency or DebateConfig.TENANT_CONCURRENCY)
+    policy = (policy or default_termination_policy(max_turns)) | MaxTurnsPolicy(max_turns)
+    state = [_Branch(i, strategists[i], critics[i]) for i in range(branches)]
+    for branch in state:
+        branch.compactor = _compactor(max_context_tokens)
+
+    async def run(branch: _Branch) -> None:
+        try:
+            while branch.outcome is None:
+                async with slots:
+                    debate_round = await _run_round(len(branch.history) + 1, branch.context, branch.strategist,
+                                                    branch.critic, speculate, speculation_min_chars,
+                                                    speculation_tolerance)
+                branch.history.append(debate_round)
+                if branch.compactor:
+                    branch.compactor.add(debate_round)
+                branch.outcome = _branch_verdict(branch, state, policy)
+        except Exception as e:
+            branch.outcome = "failed"
+            logging.error(f"[Debate] Branch {branch.index} failed: {e}")
+            raise
+        finally:
+            metrics.inc("debate_branch_total", outcome=branch.outcome or "failed")
+
+    errors = await asyncio.gather(*(run(b) for b in state), return_exceptions=True)
+    finished = [b for b in state if b.outcome != "failed"]
+    if not finished:
+        raise next(e for e in errors if isinstance(e, BaseException))
+
+    pool = ([b for b in finished if b.outcome == "converged"]
+            or [b for b in finished if b.outcome == "exhausted"]
+            or finished)
+    best = min(pool, key=lambda b: (b.risk, b.index))
+    result: BranchedDebateResult = create_debate_result(best.history, best.outcome == "converged",
+                                                        best.stopped_by or best.outcome)
+    result["branch"] = best.index
+    result["branches"] = [b.summary() for b in state]
+    return result
+
+
+def run_debate_branches(strategist, critic, **kwargs) -> BranchedDebateResult:
+    """Blocking wrapper around run_debate_branches_async."""
+    return asyncio.run(run_debate_branches_async(strategist, critic, **kwargs))
@@ -0,0 +1,284 @@
+"""
+EMBEDDINGS - JurisLink
+Dense vectors for semantic precedent search, computed and searched on CPU.
+
+Precedent vectors are computed offline (one per record, from its name and
+summary), L2-normalized and saved as a float32 `.npy` matrix next to a small
+JSON sidecar naming the embedding model and the corpus version they were
+computed from. At runtime the matrix is memory-mapped, so worker processes
+share one copy through the page cache.
+
+Search is a brute-force matmul top-k. For large corpora an optional IVF
+partitioning (spherical k-means over the vectors) limits each query to the
+rows of the few closest clusters.
+
+Models:
+    "hashing-v1"     Deterministic feature-hashing of words and word pairs.
+                     No dependencies; used by tests and as a lexical fallback.
+    anything else    A sentence-transformers model name (optional dependency).
+
+Usage:
+    from shared_lib.embeddings import write_embeddings, EmbeddingIndex
+    write_embeddings(records, "precedents.npy")
+    index = EmbeddingIndex.load("precedents.npy")
+    ids, scores = index.search(index.embed(["fired after an EEOC charge"])[0], k=3)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+HASHING_MODEL = "hashing-v1"
+EMBEDDING_DIM = 256
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_PER_LIST = 64  # k-means trains on at most this many rows per list
+ASSIGN_CHUNK_ROWS = 16384
+FEATURE_CACHE_SIZE = 65536  # Most frequent words and word pairs
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_models = {}
+_models_lock = threading.Lock()
+
+
+class EmbeddingFormatError(ValueError):
+    """Raised when an embedding file is unreadable or does not match its corpus."""
+
+
+def embedding_text(record: dict) -> str:
+    """The text a precedent is embedded from."""
+    return f"{record.get('name', '')}. {record.get('summary', '')}"
+
+
+# =============================================================================
+# EMBEDDING MODELS
+# =============================================================================
+
+@lru_cache(maxsize=FEATURE_CACHE_SIZE)
+def _feature(token: str) -> Tuple[int, float]:
+    """Bucket and sign of a token (stable across processes, unlike hash())."""
+    h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % EMBEDDING_DIM, 1.0 if h >> 63 else -1.0
+
+
+def hash_embed(texts: Sequence[str]) -> np.ndarray:
+    """Feature-hashed bag of words and word pairs, L2-normalized (float32, EMBEDDING_DIM wide)."""
+    rows, buckets, signs = [], [], []
+    for row, text in enumerate(texts):
+        words = _WORD_RE.findall(text.lower())
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            bucket, sign = _feature(token)
+            rows.append(row)
+            buckets.append(bucket)
+            signs.append(sign)
+    flat = np.asarray(rows, dtype=np.int64) * EMBEDDING_DIM + np.asarray(buckets, dtype=np.int64)
+    vectors = np.bincount(flat, weights=signs, minlength=len(texts) * EMBEDDING_DIM)
+    return normalize(vectors.reshape(len(texts), EMBEDDING_DIM).astype(np.float32))
+
+
+def get_embedder(model: str) -> Callable[[Sequence[str]], np.ndarray]:
+    """Embedding function for `model`: texts -> L2-normalized float32 matrix."""
+    if model == HASHING_MODEL:
+        return hash_embed
+    with _models_lock:
+        if model not in _models:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError(
+                    f"Embedding model {model!r} needs sentence-transformers (pip install sentence-transformers)"
+                ) from e
+            encoder = SentenceTransformer(model, device="cpu")
+            _models[model] = lambda texts: normalize(
+                np.asarray(encoder.encode(list(texts)), dtype=np.float32)
+            )
+        return _models[model]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# =============================================================================
+# FILES
+# =============================================================================
+
+def meta_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.name}.json")
+
+
+def write_embeddings(records: Sequence[dict], path, model: str = HASHING_MODEL,
+                     digest: Optional[str] = None, batch_size: int = 4096) -> Path:
+    """
+    Embed every record and save the matrix to `path` (.npy) plus its sidecar.
+
+    Args:
+        records: The corpus, in index order.
+        model: Embedding model name (see module docstring).
+        digest: Corpus version to record; defaults to the records' digest.
+    """
+    from shared_lib.precedent_corpus import corpus_digest
+
+    embed = get_embedder(model)
+    path = Path(path)
+    count = len(records)
+    if digest is None:
+        digest = getattr(records, "digest", None) or corpus_digest(records)
+
+    tmp = path.with_name(f".{path.name}.tmp.npy")
+    matrix = None
+    for start in range(0, count, batch_size):
+        batch = embed([embedding_text(records[i]) for i in range(start, min(start + batch_size, count))])
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32,
+                                               shape=(count, batch.shape[1]))
+        matrix[start:start + len(batch)] = batch
+    if matrix is None:
+        np.save(tmp, np.zeros((0, EMBEDDING_DIM), dtype=np.float32))
+        dim = EMBEDDING_DIM
+    else:
+        dim = matrix.shape[1]
+        matrix.flush()
+        del matrix
+    os.replace(tmp, path)
+    meta_path(path).write_text(json.dumps({"model": model, "dim": dim, "count": count, "digest": digest}))
+    return path
+
+
+class EmbeddingIndex:
+    """
+    Top-k cosine search over an L2-normalized float32 matrix.
+
+    With `n_lists` > 0, rows are partitioned into that many IVF lists (CSR:
+    the rows of list `l` are `list_ids[list_indptr[l]:list_indptr[l + 1]]`)
+    and unrestricted searches only scan the `n_probe` closest lists.
+    """
+
+    def __init__(self, vectors: np.ndarray, model: str = HASHING_MODEL, digest: Optional[str] = None,
+                 n_lists: int = 0, n_probe: int = 8, seed: int = 0):
+        self.vectors = vectors
+        self.model = model
+        self.digest = digest
+        self.n_probe = n_probe
+        self.centroids = None
+        self.list_indptr = self.list_ids = None
+        if n_lists and len(vectors) > n_lists:
+            self._build_ivf(n_lists, seed)
+
+    @classmethod
+    def load(cls, path, digest: Optional[str] = None, count: Optional[int] = None, **kwargs) -> "EmbeddingIndex":
+        """
+        Memory-map an embedding file written by write_embeddings.
+
+        Raises EmbeddingFormatError if the file is unreadable or was computed
+        for a different corpus (`digest` / `count` given and not matching).
+        """
+        path = Path(path)
+        try:
+            meta = json.loads(meta_path(path).read_text())
+            vectors = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            raise EmbeddingFormatError(f"{path}: unreadable embedding file ({e})") from e
+        if vectors.dtype != np.float32 or vectors.ndim != 2 or len(vectors) != meta["count"]:
+            raise EmbeddingFormatError(
+                f"{path}: expected float32[{meta['count']}, dim], got {vectors.dtype}{list(vectors.shape)}"
+            )
+        if count is not None and len(vectors) != count:
+            raise EmbeddingFormatError(f"{path}: {len(vectors)} vectors for a corpus of {count}")
+        if digest is not None and meta.get("digest") != digest:
+            raise EmbeddingFormatError(f"{path}: computed for a different corpus version")
+        return cls(vectors, model=meta["model"], digest=meta.get("digest"), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return get_embedder(self.model)(texts)
+
+    # -------------------------------------------------------------------------
+    # IVF
+    # -------------------------------------------------------------------------
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK_ROWS])
+            labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return labels
+
+    def _build_ivf(self, n_lists: int, seed: int) -> None:
+        """Spherical k-means on a sample, then assign every row to its closest centroid."""
+        rng = np.random.default_rng(seed)
+        n = len(self.vectors)
+        sample = np.sort(rng.choice(n, size=min(n, n_lists * IVF_TRAIN_PER_LIST), replace=False))
+        train = np.asarray(self.vectors[sample])
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)].copy()
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = self._assign(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, train)
+            filled = np.bincount(labels, minlength=n_lists) > 0
+            # Empty lists keep their previous centroid
+            centroids[filled] = normalize(sums[filled])
+
+        labels = self._assign(self.vectors, centroids)
+        self.centroids = centroids
+        self.list_ids = np.argsort(labels, kind="stable").astype(np.int32)
+        self.list_indptr = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=n_lists)))).astype(np.int64)
+
+    def probe(self, query: np.ndarray) -> np.ndarray:
+        """Sorted row ids in the `n_probe` lists closest to `query`."""
+        lists = np.argsort(-(self.centroids @ query))[:self.n_probe]
+        rows = [self.list_ids[self.list_indptr[l]:self.list_indptr[l + 1]] for l in lists]
+        return np.sort(np.concatenate(rows))
+
+    # -------------------------------------------------------------------------
+    # Search
+    # -------------------------------------------------------------------------
+
+    def scores(self, query: np.ndarray, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of `query` to every row (or to each of `candidates`)."""
+        vectors = self.vectors if candidates is None else self.vectors[candidates]
+        return vectors @ query.astype(np.float32, copy=False)
+
+    def search(self, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best `k` rows by cosine similarity: (row ids, scores), best first.
+
+        `candidates` restricts the search to those rows (exactly); otherwise
+        the IVF lists are probed when built, else every row is scanned.
+        """
+        if candidates is None and self.centroids is not None:
+            candidates = self.probe(query)
+        scores = self.scores(query, candidates)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.lexsort((best, -scores[best]))]
+        ids = best if candidates is None else np.asarray(candidates)[best]
+        return ids.astype(np.int64), scores[best]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute precedent embeddings for a corpus file")
+    parser.add_argument("corpus", type=Path, help="Corpus file (see shared_lib/precedent_corpus.py)")
+    parser.add_argument("output", type=Path, help="Embedding matrix to write (e.g. precedents.npy)")
+    parser.add_argument("--model", default=HASHING_MODEL, help="Embedding model name")
+    args = parser.parse_args()
+
+    from shared_lib.precedent_corpus import PrecedentCorpus
+
+    with PrecedentCorpus(args.corpus) as corpus:
+        write_embeddings(corpus, args.output, model=args.model)
+        print(f"Wrote {len(corpus)} embeddings ({args.model}) to {args.output}")
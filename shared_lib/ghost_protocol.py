@@ -2,40 +2,297 @@
 GHOST PROTOCOL - JurisLink Privacy Enforcement
 Auto-deletion of user data after retention period (60 minutes by default).
 
+Enforcement is driven by an in-memory expiry index (a min-heap of last
+activity times) that is updated whenever a case file is written through
+shared_lib.storage, so each call only visits items whose deadline has passed.
+A full reconciliation scan runs once at startup and then rarely in the
+background to pick up files written outside the API.
+
+Deletion runs on a background sweeper thread; the request path only calls
+`maybe_trigger_cleanup()`, which never touches the filesystem.
+
 Usage:
+    from shared_lib.ghost_protocol import maybe_trigger_cleanup
+    maybe_trigger_cleanup()  # Call on each request (non-blocking)
+
     from shared_lib.ghost_protocol import enforce_privacy
-    enforce_privacy()  # Call before each request
+    enforce_privacy(verbose=True)  # Synchronous sweep (CLI / maintenance)
 """
+import atexit
+import heapq
 import os
 import time
-import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from shared_lib.config import RetentionConfig
+from shared_lib.metrics import metrics
+from shared_lib import storage
+from shared_lib.utils import invalidate_storage_cache, is_shard_name
 
-# Configuration
-RETENTION_SECONDS = 3600  # 60 minutes (1 hour)
+# Configuration (shared with session TTL in shared_lib/db.py)
+RETENTION_SECONDS = RetentionConfig.RETENTION_SECONDS  # 60 minutes (1 hour) by default
+RECONCILE_INTERVAL_SECONDS = RetentionConfig.RECONCILE_INTERVAL_SECONDS
+SWEEP_INTERVAL_SECONDS = RetentionConfig.GHOST_SWEEP_INTERVAL_SECONDS
+TRIGGER_MIN_SECONDS = RetentionConfig.GHOST_TRIGGER_MIN_SECONDS
+INCINERATION_WORKERS = RetentionConfig.INCINERATION_WORKERS
+INCINERATION_BUDGET_SECONDS = RetentionConfig.INCINERATION_BUDGET_SECONDS
 STORAGE_PATHS = [
     Path(__file__).parent.parent / "TEMP",           # Temp files (PDFs, etc.)
     Path(__file__).parent.parent / "frontend_portal" / "public" / "users",  # User files
 ]
 
 
-def enforce_privacy(verbose: bool = False) -> dict:
+def _iter_items(storage_path: Path):
+    """
+    Yield the retention units under a storage root.
+
+    User folders live one level down in hash shards (users/{shard}/{user_id}),
+    so shard folders are descended into rather than expired as a whole. The
+    blob store is skipped: blobs are released by storage.release_blobs()
+    once no case links to them.
+    """
+    for item in storage_path.iterdir():
+        if item.name == storage.BLOBS_DIR_NAME:
+            continue
+        if is_shard_name(item.name) and item.is_dir():
+            yield from item.iterdir()
+        else:
+            yield item
+
+
+def _retention_unit(path: Path) -> Optional[Path]:
+    """Map a written file to the top-level item that expires with it (see _iter_items)."""
+    for root in STORAGE_PATHS:
+        try:
+            parts = path.relative_to(root).parts
+        except ValueError:
+            continue
+        if not parts or parts[0] == storage.BLOBS_DIR_NAME:
+            return None
+        depth = 2 if is_shard_name(parts[0]) and len(parts) > 1 else 1
+        return root.joinpath(*parts[:depth])
+    return None
+
+
+# =============================================================================
+# EXPIRY INDEX
+# =============================================================================
+
+class ExpiryIndex:
+    """
+    Min-heap of (last_activity, item) for expirable storage items.
+
+    Re-recording an item pushes a new heap entry and leaves the old one in
+    place; stale entries are skipped when popped (lazy deletion), so writes
+    are O(log n) and never search the heap.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._latest = {}  # item -> most recent activity time
+        self._lock = threading.Lock()
+        self.reconciled_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def record(self, item: Path, when: float) -> None:
+        """Note activity on `item` at `when` (older times are ignored)."""
+        key = str(item)
+        with self._lock:
+            if when <= self._latest.get(key, float("-inf")):
+                return
+            self._latest[key] = when
+            heapq.heappush(self._heap, (when, key))
+
+    def pop_due(self, cutoff: float) -> List[Tuple[Path, float]]:
+        """Remove and return items whose last activity is older than `cutoff`."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                when, key = heapq.heappop(self._heap)
+                if self._latest.get(key) != when:
+                    continue  # Superseded by a later write
+                del self._latest[key]
+                due.append((Path(key), when))
+        return due
+
+    def count_due(self, cutoff: float) -> int:
+        with self._lock:
+            return sum(1 for when in self._latest.values() if when < cutoff)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._latest.clear()
+            self.reconciled_at = None
+
+
+_index = ExpiryIndex()
+_reconcile_lock = threading.Lock()
+
+
+def record_write(path: Path, when: Optional[float] = None) -> None:
+    """Refresh the retention deadline of the item containing `path`."""
+    unit = _retention_unit(Path(path))
+    if unit is not None:
+        _index.record(unit, time.time() if when is None else when)
+
+
+def _scan_into_index() -> int:
+    started = time.time()
+    seen = 0
+    for storage_path in STORAGE_PATHS:
+        if not storage_path.exists():
+            continue
+        for item in _iter_items(storage_path):
+            try:
+                _index.record(item, item.stat().st_mtime)
+                seen += 1
+            except OSError:
+                continue
+    _index.reconciled_at = started
+    return seen
+
+
+def reconcile_index() -> int:
+    """
+    Full scan of STORAGE_PATHS, merging on-disk mtimes into the index.
+
+    Returns:
+        Number of items seen.
+    """
+    with _reconcile_lock:
+        return _scan_into_index()
+
+
+def _reconcile_in_background() -> None:
+    """Start a reconciliation scan unless one is already running."""
+    if not _reconcile_lock.acquire(blocking=False):
+        return
+
+    def _run():
+        try:
+            _scan_into_index()
+        except Exception as e:
+            print(f"⚠️ GHOST PROTOCOL: Reconciliation failed: {e}")
+        finally:
+            _reconcile_lock.release()
+
+    threading.Thread(target=_run, name="ghost-reconcile", daemon=True).start()
+
+
+def reset_expiry_index() -> None:
+    """Forget all indexed items; the next enforcement rebuilds from disk."""
+    _index.clear()
+
+
+storage.add_write_listener(record_write)
+
+
+# =============================================================================
+# ENFORCEMENT
+# =============================================================================
+
+def _incinerate(path: str, measure: bool = True) -> int:
+    """
+    Delete a file or directory tree in a single os.scandir pass.
+
+    Sizes come from the same directory entries used for removal, so no
+    separate walk is needed to report bytes freed.
+
+    Returns:
+        Bytes removed (0 when `measure` is False).
+    """
+    if os.path.islink(path) or not os.path.isdir(path):
+        size = os.lstat(path).st_size if measure else 0
+        os.unlink(path)
+        return size
+
+    freed = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                freed += _incinerate(entry.path, measure)
+            else:
+                if measure:
+                    freed += entry.stat(follow_symlinks=False).st_size
+                os.unlink(entry.path)
+    os.rmdir(path)
+    return freed
+
+
+_incinerator: Optional[ThreadPoolExecutor] = None
+_incinerator_lock = threading.Lock()
+
+
+def _get_incinerator() -> ThreadPoolExecutor:
+    global _incinerator
+    with _incinerator_lock:
+        if _incinerator is None:
+            _incinerator = ThreadPoolExecutor(max_workers=INCINERATION_WORKERS,
+                                              thread_name_prefix="ghost-incinerate")
+        return _incinerator
+
+
+def _process_due(item: Path, last_activity: float, cutoff_time: float,
+                 deadline: float, measure: bool) -> tuple:
+    """
+    Re-check and delete one due item (runs on the incineration pool).
+
+    Returns:
+        (outcome, mtime, size, error, digests) where outcome is one of
+        'deleted', 'kept', 'gone', 'deferred' or 'error', and digests are
+        the blobs the item's case manifests referenced.
+    """
+    if time.perf_counter() >= deadline:
+        return 'deferred', last_activity, 0, None, ()
+    digests = ()
+    try:
+        # Files touched outside the API since indexing extend the deadline
+        mtime = max(last_activity, item.stat().st_mtime)
+        if mtime >= cutoff_time:
+            return 'kept', mtime, 0, None, ()
+        if item.is_dir():
+            digests = storage.manifest_digests(item)
+        return 'deleted', mtime, _incinerate(str(item), measure), None, digests
+    except FileNotFoundError:
+        return 'gone', last_activity, 0, None, digests
+    except PermissionError:
+        return 'error', last_activity, 0, f"Permission denied: {item}", digests
+    except Exception as e:
+        return 'error', last_activity, 0, f"Error processing {item}: {str(e)}", digests
+
+
+def enforce_privacy(verbose: bool = False, measure_sizes: bool = True,
+                    time_budget: Optional[float] = None) -> dict:
     """
-    Scans user folders and incinerates data older than retention period.
+    Incinerates data older than the retention period.
     
-    This function is designed to be called on every API request to ensure
-    continuous privacy enforcement ("self-cleaning" server).
+    Normally run by the background sweeper (see maybe_trigger_cleanup).
+    Only items the expiry index reports as due are visited; the first call
+    in a process builds the index with a full scan, later rescans run in the
+    background every RECONCILE_INTERVAL_SECONDS. Due items are deleted in
+    parallel on a small thread pool.
     
     Args:
         verbose: If True, print detailed logs
+        measure_sizes: If False, skip size accounting ('bytes_freed' stays 0)
+        time_budget: Max seconds to spend deleting (default
+            INCINERATION_BUDGET_SECONDS); items not reached are deferred to
+            the next call
         
     Returns:
-        dict with stats: {'scanned': N, 'deleted': N, 'errors': []}
+        dict with stats: {'scanned': N, 'deleted': N, 'deferred': N, 'errors': []}
+        ('scanned' counts the due items examined)
     """
     stats = {
         'scanned': 0,
         'deleted': 0,
+        'deferred': 0,
         'bytes_freed': 0,
         'errors': [],
         'timestamp': datetime.now().isoformat()
@@ -43,62 +300,316 @@ def enforce_privacy(verbose: bool = False) -> dict:
     
     now = time.time()
     cutoff_time = now - RETENTION_SECONDS
+    budget = INCINERATION_BUDGET_SECONDS if time_budget is None else time_budget
+    deadline = time.perf_counter() + budget
     
-    for storage_path in STORAGE_PATHS:
-        if not storage_path.exists():
+    if _index.reconciled_at is None:
+        try:
+            reconcile_index()
+        except Exception as e:
+            stats['errors'].append(f"Error scanning storage: {str(e)}")
+    elif now - _index.reconciled_at >= RECONCILE_INTERVAL_SECONDS:
+        _reconcile_in_background()
+    
+    due = _index.pop_due(cutoff_time)
+    if len(due) > 1:
+        pool = _get_incinerator()
+        results = pool.map(lambda d: _process_due(*d, cutoff_time, deadline, measure_sizes), due)
+    else:
+        results = (_process_due(*d, cutoff_time, deadline, measure_sizes) for d in due)
+    
+    released = set()
+    for (item, _), (outcome, mtime, size, error, digests) in zip(due, results):
+        released.update(digests)
+        if outcome == 'deferred':
+            stats['deferred'] += 1
+            _index.record(item, mtime)
             continue
-            
+        stats['scanned'] += 1
+        if outcome == 'kept':
+            _index.record(item, mtime)
+        elif outcome == 'error':
+            stats['errors'].append(error)
+        elif outcome == 'deleted':
+            stats['deleted'] += 1
+            stats['bytes_freed'] += size
+            if verbose:
+                age_minutes = int((now - mtime) / 60)
+                print(f"👻 GHOST PROTOCOL: Incinerated {item.name} (age: {age_minutes}min)")
+    
+    if stats['deleted'] > 0:
+        # Cached "directory exists" entries may now point at deleted folders
+        invalidate_storage_cache()
+    if released:
         try:
-            for item in storage_path.iterdir():
-                stats['scanned'] += 1
-                
-                try:
-                    # Get modification time (most recent activity)
-                    mtime = item.stat().st_mtime
-                    
-                    if mtime < cutoff_time:
-                        # Calculate size before deletion
-                        if item.is_dir():
-                            size = sum(f.stat().st_size for f in item.rglob('*') if f.is_file())
-                        else:
-                            size = item.stat().st_size
-                        
-                        # Incinerate expired data
-                        if item.is_dir():
-                            shutil.rmtree(item)
-                        else:
-                            item.unlink()
-                        
-                        stats['deleted'] += 1
-                        stats['bytes_freed'] += size
-                        
-                        if verbose:
-                            age_minutes = int((now - mtime) / 60)
-                            print(f"👻 GHOST PROTOCOL: Incinerated {item.name} (age: {age_minutes}min)")
-                            
-                except PermissionError as e:
-                    stats['errors'].append(f"Permission denied: {item}")
-                except Exception as e:
-                    stats['errors'].append(f"Error processing {item}: {str(e)}")
-                    
+            # Deleted case files were hard links; drop the blobs they used if nothing links to them now
+            storage.release_blobs(released)
         except Exception as e:
-            stats['errors'].append(f"Error scanning {storage_path}: {str(e)}")
+            stats['errors'].append(f"Error releasing blobs: {str(e)}")
     
     if verbose and stats['deleted'] > 0:
         mb_freed = stats['bytes_freed'] / (1024 * 1024)
         print(f"👻 GHOST PROTOCOL: Freed {mb_freed:.2f}MB from {stats['deleted']} items")
+    if verbose and stats['deferred'] > 0:
+        print(f"👻 GHOST PROTOCOL: Time budget reached, {stats['deferred']} items deferred")
     
     return stats
 
 
+# =============================================================================
+# RETENTION ENGINE
+# =============================================================================
+
+# Store name -> expire(now, dry_run) callback returning {'expired': N, ...}
+_stores: Dict[str, Callable[[float, bool], dict]] = {}
+_stores_lock = threading.Lock()
+
+
+def register_store(name: str, expire: Callable[[float, bool], dict]) -> None:
+    """
+    Put a data store under the shared retention policy.
+
+    `expire(now, dry_run)` removes the store's items that are past
+    RETENTION_SECONDS (or, when `dry_run` is set, only counts them) and
+    returns a dict with at least {'expired': N}. Re-registering a name
+    replaces its callback.
+    """
+    with _stores_lock:
+        _stores[name] = expire
+
+
+def unregister_store(name: str) -> None:
+    with _stores_lock:
+        _stores.pop(name, None)
+
+
+def registered_stores() -> List[str]:
+    with _stores_lock:
+        return list(_stores)
+
+
+def run_retention(dry_run: bool = False) -> dict:
+    """
+    Apply the retention policy to every registered store.
+
+    Args:
+        dry_run: Report what each store would expire without deleting.
+
+    Returns:
+        {store_name: {'expired': N, 'ms': elapsed, ...store-specific}}
+        (a failing store reports 'error' instead of aborting the run)
+    """
+    now = time.time()
+    with _stores_lock:
+        stores = list(_stores.items())
+
+    results = {}
+    for name, expire in stores:
+        start = time.perf_counter()
+        try:
+            result = dict(expire(now, dry_run))
+        except Exception as e:
+            result = {'expired': 0, 'error': str(e)}
+            metrics.inc("retention_errors_total", store=name)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        result['ms'] = round(elapsed_ms, 3)
+        if not dry_run:
+            metrics.observe("retention_store_ms", elapsed_ms, store=name)
+            metrics.inc("retention_expired_total", result.get('expired', 0), store=name)
+        results[name] = result
+    return results
+
+
+def _expire_files(now: float, dry_run: bool = False) -> dict:
+    """Retention callback for STORAGE_PATHS (user folders and TEMP)."""
+    if dry_run:
+        if _index.reconciled_at is None:
+            reconcile_index()
+        return {'expired': _index.count_due(now - RETENTION_SECONDS), 'indexed': len(_index)}
+    stats = enforce_privacy()
+    return {'expired': stats['deleted'], **stats}
+
+
+register_store("files", _expire_files)
+
+
+# =============================================================================
+# BACKGROUND SWEEPER
+# =============================================================================
+
+class GhostSweeper:
+    """
+    Daemon thread that runs the retention engine (every registered store,
+    files included) every `interval` seconds.
+
+    Requests call `maybe_trigger()` to ask for an early sweep; at most one
+    trigger per `min_trigger_interval` is honoured and the call never blocks
+    (a contended lock just means another request is already triggering).
+
+    Metrics (shared_lib.metrics):
+        ghost_sweeps_total          counter    completed sweeps
+        ghost_sweep_errors_total    counter    sweeps that raised or reported errors
+        ghost_items_deleted_total   counter    items incinerated
+        ghost_bytes_freed_total     counter    bytes incinerated
+        ghost_items_deferred_total  counter    due items left for the next sweep (time budget)
+        ghost_triggers_total        counter    early sweeps requested by requests
+        ghost_sweep_ms              histogram  sweep duration
+        ghost_indexed_items         gauge      items tracked by the expiry index
+        ghost_last_sweep_timestamp  gauge      wall-clock time of the last sweep
+        retention_store_ms          histogram  per-store expiry time (label: store)
+        retention_expired_total     counter    per-store items expired (label: store)
+        retention_errors_total      counter    per-store callback failures (label: store)
+    """
+
+    def __init__(self, interval: float = SWEEP_INTERVAL_SECONDS,
+                 min_trigger_interval: float = TRIGGER_MIN_SECONDS,
+                 clock=time.monotonic):
+        self.interval = interval
+        self.min_trigger_interval = min_trigger_interval
+        self._clock = clock
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._trigger_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._last_trigger: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the sweeper thread (no-op if already running)."""
+        with self._state_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ghost-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Ask the thread to exit after its current sweep and wait for it."""
+        with self._state_lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def maybe_trigger(self) -> bool:
+        """
+        Request an early sweep without blocking the caller.
+
+        Returns:
+            True if a sweep was scheduled, False if rate-limited.
+        """
+        if not self._trigger_lock.acquire(blocking=False):
+            return False
+        try:
+            now = self._clock()
+            if self._last_trigger is not None and now - self._last_trigger < self.min_trigger_interval:
+                return False
+            self._last_trigger = now
+        finally:
+            self._trigger_lock.release()
+
+        if not self.running:
+            self.start()
+        self._wake.set()
+        metrics.inc("ghost_triggers_total")
+        return True
+
+    def run_once(self) -> dict:
+        """Run the retention engine once on the calling thread and export stats."""
+        start = time.perf_counter()
+        try:
+            results = run_retention()
+        except Exception as e:
+            metrics.inc("ghost_sweep_errors_total")
+            print(f"⚠️ GHOST PROTOCOL: Sweep failed: {e}")
+            raise
+        metrics.observe("ghost_sweep_ms", (time.perf_counter() - start) * 1000)
+        metrics.inc("ghost_sweeps_total")
+        files = results.get('files', {})
+        metrics.inc("ghost_items_deleted_total", files.get('deleted', 0))
+        metrics.inc("ghost_bytes_freed_total", files.get('bytes_freed', 0))
+        if files.get('deferred'):
+            metrics.inc("ghost_items_deferred_total", files['deferred'])
+            self._wake.set()  # Budget ran out: continue right after this sweep
+        if any(r.get('error') or r.get('errors') for r in results.values()):
+            metrics.inc("ghost_sweep_errors_total")
+        metrics.set_gauge("ghost_indexed_items", len(_index))
+        metrics.set_gauge("ghost_last_sweep_timestamp", time.time())
+        return results
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception:
+                pass  # Logged and counted in run_once; keep sweeping
+            self._wake.wait(self.interval)
+
+    def get_stats(self) -> dict:
+        """Sweeper state plus its exported metrics."""
+        return {
+            'running': self.running,
+            'interval_seconds': self.interval,
+            'min_trigger_seconds': self.min_trigger_interval,
+            'indexed_items': len(_index),
+            'stores': registered_stores(),
+            'metrics': {**metrics.snapshot("ghost_"), 'retention': metrics.snapshot("retention_")},
+        }
+
+
+# Process-wide sweeper (started on first trigger)
+_sweeper: Optional[GhostSweeper] = None
+_sweeper_lock = threading.Lock()
+
+
+def get_sweeper() -> GhostSweeper:
+    """Return the shared GhostSweeper, creating it on first use."""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = GhostSweeper()
+        return _sweeper
+
+
+def maybe_trigger_cleanup() -> bool:
+    """Request-path hook: wake the background sweeper (rate-limited, non-blocking)."""
+    return get_sweeper().maybe_trigger()
+
+
+def stop_sweeper(timeout: Optional[float] = 5.0) -> None:
+    """Stop the shared sweeper if it was started (also runs at interpreter exit)."""
+    global _incinerator
+    if _sweeper is not None:
+        _sweeper.stop(timeout)
+    with _incinerator_lock:
+        pool, _incinerator = _incinerator, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+atexit.register(stop_sweeper)
+
+
 def get_retention_info() -> dict:
     """
     Returns information about current retention policy and storage status.
+    
+    'stores' is a dry-run plan from the retention engine: what each
+    registered store (files, sessions, caches) would expire right now.
     """
     info = {
         'retention_seconds': RETENTION_SECONDS,
         'retention_minutes': RETENTION_SECONDS // 60,
+        'session_ttl_seconds': RetentionConfig.SESSION_TTL_SECONDS,
         'storage_paths': [str(p) for p in STORAGE_PATHS],
+        'indexed_items': len(_index),
+        'index_reconciled_at': _index.reconciled_at,
         'items_at_risk': 0,
         'total_size_bytes': 0
     }
@@ -110,7 +621,7 @@ def get_retention_info() -> dict:
         if not storage_path.exists():
             continue
             
-        for item in storage_path.iterdir():
+        for item in _iter_items(storage_path):
             try:
                 mtime = item.stat().st_mtime
                 if mtime < cutoff_time:
@@ -123,6 +634,7 @@ def get_retention_info() -> dict:
             except:
                 pass
     
+    info['stores'] = run_retention(dry_run=True)
     return info
 
 
@@ -136,6 +648,8 @@ if __name__ == "__main__":
     print(f"Storage Paths: {len(info['storage_paths'])}")
     print(f"Items at risk: {info['items_at_risk']}")
     print(f"Total size: {info['total_size_bytes'] / 1024:.1f}KB")
+    for name, plan in info['stores'].items():
+        print(f"  {name}: {plan['expired']} due ({plan['ms']:.1f}ms)")
     
     print("\n🧹 Running cleanup...")
     stats = enforce_privacy(verbose=True)
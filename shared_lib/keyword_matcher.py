@@ -0,0 +1,108 @@
+"""
+Multi-keyword matcher for JurisLink.
+
+Aho-Corasick automaton compiled once from a fixed phrase list, so checking
+a text for any number of phrases is a single linear pass over its
+characters instead of one substring scan per phrase.
+
+Matches are word-boundary aware by default: "done" matches "I'm done."
+but not "abandoned", and "title vii" does not match "title viii".
+
+Usage:
+    from shared_lib.keyword_matcher import KeywordMatcher
+    matcher = KeywordMatcher(["hostile work environment", "retaliation"])
+    matcher.find_all("Retaliation after a hostile work environment complaint")
+    # -> {'hostile work environment', 'retaliation'}
+"""
+from collections import deque
+from typing import Iterable, Iterator, List, Set, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Compiled Aho-Corasick automaton over a set of lowercase phrases.
+
+    States are integers; `_goto[s]` maps a character to the next state,
+    `_fail[s]` is the longest proper suffix state, and `_out[s]` lists the
+    ids of the patterns ending at `s` (including those inherited through
+    failure links).
+    """
+
+    def __init__(self, patterns: Iterable[str], word_boundary: bool = True):
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(p.lower() for p in patterns if p))
+        self.word_boundary = word_boundary
+        self._goto: List[dict] = [{}]
+        self._out: List[List[int]] = [[]]
+
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+
+        # Breadth-first construction of failure links
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (pattern_id, end_offset) for every match in `text`.
+
+        `text` is lowercased here; end_offset is exclusive.
+        """
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        boundary = self.word_boundary
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            if boundary and end < len(text) and _is_word_char(text[end]):
+                # Mid-word: only patterns ending in punctuation can match here
+                ids = [p for p in out[state] if not _is_word_char(self.patterns[p][-1])]
+            else:
+                ids = out[state]
+            for pid in ids:
+                start = end - len(self.patterns[pid])
+                if boundary and start > 0 and _is_word_char(text[start - 1]) \
+                        and _is_word_char(self.patterns[pid][0]):
+                    continue
+                yield pid, end
+
+    def find_ids(self, text: str) -> Set[int]:
+        """Ids (indexes into `patterns`) of every pattern present in `text`."""
+        return {pid for pid, _ in self.iter_matches(text)}
+
+    def find_all(self, text: str) -> Set[str]:
+        """Every pattern present in `text`."""
+        return {self.patterns[pid] for pid in self.find_ids(text)}
+
+    def search(self, text: str) -> bool:
+        """True if any pattern occurs in `text` (stops at the first match)."""
+        return next(self.iter_matches(text), None) is not None
@@ -0,0 +1,134 @@
+"""
+In-Process Metrics Registry for JurisLink.
+
+Lightweight counters and histograms keyed by metric name and label set,
+so shared_lib modules can export operational numbers (RU spend, latency,
+queue depth, ...) without an external metrics dependency.
+
+Usage:
+    from shared_lib.metrics import metrics
+    metrics.inc("db_calls_total", operation="get_session")
+    metrics.observe("db_latency_ms", 12.5, operation="get_session")
+    metrics.snapshot()
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Default histogram buckets (upper bounds). Suits latencies in ms and RU charges.
+DEFAULT_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum/min/max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)  # last = +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0.0,
+            "buckets": {
+                **{str(b): c for b, c in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a value in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def get_gauge(self, name: str, **labels) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(name, {}).get(_label_key(labels))
+
+    def get_histogram(self, name: str, **labels) -> Optional[dict]:
+        with self._lock:
+            hist = self._histograms.get(name, {}).get(_label_key(labels))
+            return hist.to_dict() if hist else None
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """
+        Export all metrics (optionally filtered by name prefix) as plain dicts.
+
+        Returns:
+            {'counters': {...}, 'gauges': {...}, 'histograms': {...}} where each
+            series is a list of {'labels': {...}, 'value': ...} entries.
+        """
+        def series(store, render):
+            return {
+                name: [{"labels": dict(k), "value": render(v)} for k, v in entries.items()]
+                for name, entries in store.items() if name.startswith(prefix)
+            }
+
+        with self._lock:
+            return {
+                "counters": series(self._counters, lambda v: v),
+                "gauges": series(self._gauges, lambda v: v),
+                "histograms": series(self._histograms, lambda h: h.to_dict()),
+            }
+
+    def reset(self, prefix: str = "") -> None:
+        """Drop all metrics whose name starts with prefix (all if empty)."""
+        with self._lock:
+            for store in (self._counters, self._gauges, self._histograms):
+                for name in [n for n in store if n.startswith(prefix)]:
+                    del store[name]
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
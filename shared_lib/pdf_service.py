@@ -0,0 +1,238 @@
+"""
+PDF RENDERING SERVICE - JurisLink
+Runs CaseBriefPDF rendering in a process pool so CPU-bound FPDF layout
+does not hold the GIL on request threads.
+
+Usage:
+    from shared_lib.pdf_service import get_render_service
+    service = get_render_service()
+    pdf_bytes = await service.render_async({"case_id": "c1", "facts": {...}})
+    all_pdfs = service.render_batch(cases)  # e.g. a firm exporting every case
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from shared_lib.metrics import metrics
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUE = 32  # Renders waiting for a worker (beyond those running)
+# Workers start fresh instead of forking: the host process runs request
+# threads, and a fork taken while one of them holds a lock (logging, the
+# metrics registry, an SDK client) can deadlock the child.
+WORKER_START_METHOD = "spawn"
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when the render queue stays full past the caller's timeout."""
+
+
+def _render_in_worker(case: dict) -> tuple:
+    """Worker entry point: render one brief and time it inside the worker."""
+    from shared_lib.pdf_utils import render_case_brief_bytes
+
+    start = time.perf_counter()
+    data = render_case_brief_bytes(
+        case["case_id"],
+        case.get("facts") or {},
+        case.get("strategy"),
+        case.get("research"),
+    )
+    return data, time.perf_counter() - start
+
+
+class PDFRenderService:
+    """
+    Process-pool backed Case Brief renderer with a bounded queue.
+
+    At most `max_workers + max_queue` renders are admitted at once; further
+    submissions block (or time out with RenderQueueFull), which applies
+    backpressure to bulk exports instead of growing memory without bound.
+
+    Metrics (shared_lib.metrics):
+        pdf_render_queue_depth  gauge      renders admitted but not finished
+        pdf_render_ms           histogram  time spent rendering in the worker
+        pdf_render_total_ms     histogram  submit-to-result latency
+        pdf_renders_total       counter    completed renders
+        pdf_render_errors_total counter    failed renders
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    # -------------------------------------------------------------------------
+    # Pool management
+    # -------------------------------------------------------------------------
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+                )
+            return self._executor
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Underlying pool, e.g. for pdf_utils.render_case_documents(pool=...)."""
+        return self._get_executor()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    @property
+    def queue_depth(self) -> int:
+        """Renders admitted but not yet finished (running + waiting)."""
+        return self._in_flight
+
+    def _set_in_flight(self, delta: int) -> None:
+        with self._lock:
+            self._in_flight += delta
+            depth = self._in_flight
+        metrics.set_gauge("pdf_render_queue_depth", depth)
+
+    # -------------------------------------------------------------------------
+    # Submission
+    # -------------------------------------------------------------------------
+
+    def submit(self, case: dict, timeout: Optional[float] = None) -> Future:
+        """
+        Queue one brief for rendering.
+
+        Args:
+            case: {'case_id', 'facts', 'strategy', 'research'}
+            timeout: Seconds to wait for a queue slot (None = wait forever).
+
+        Returns:
+            Future resolving to the PDF bytes.
+
+        Raises:
+            RenderQueueFull: If no slot frees up within `timeout`.
+        """
+        if not case or not case.get("case_id"):
+            raise ValueError("Render request requires a case_id")
+        if not self._slots.acquire(timeout=timeout):
+            raise RenderQueueFull(f"PDF render queue full ({self.max_workers + self.max_queue} in flight)")
+
+        self._set_in_flight(1)
+        submitted = time.perf_counter()
+        try:
+            inner = self._get_executor().submit(_render_in_worker, case)
+        except BrokenProcessPool:
+            logging.warning("[PDFService] Worker pool broken; restarting")
+            self.shutdown(wait=False)
+            try:
+                inner = self._get_executor().submit(_render_in_worker, case)
+            except Exception:
+                self._release()
+                raise
+        except Exception:
+            self._release()
+            raise
+
+        outer: Future = Future()
+
+        def _done(f: Future):
+            self._release()
+            try:
+                data, render_seconds = f.result()
+            except BaseException as e:
+                metrics.inc("pdf_render_errors_total")
+                outer.set_exception(e)
+                return
+            metrics.inc("pdf_renders_total")
+            metrics.observe("pdf_render_ms", render_seconds * 1000)
+            metrics.observe("pdf_render_total_ms", (time.perf_counter() - submitted) * 1000)
+            outer.set_result(data)
+
+        inner.add_done_callback(_done)
+        return outer
+
+    def _release(self) -> None:
+        self._set_in_flight(-1)
+        self._slots.release()
+
+    def render(self, case: dict, timeout: Optional[float] = None) -> bytes:
+        """Render one brief in the pool and wait for the result."""
+        return self.submit(case, timeout=timeout).result()
+
+    async def render_async(self, case: dict, timeout: Optional[float] = None) -> bytes:
+        """Render one brief without blocking the event loop."""
+        future = await asyncio.to_thread(self.submit, case, timeout)
+        return await asyncio.wrap_future(future)
+
+    def render_batch(self, cases: List[dict], return_exceptions: bool = False) -> list:
+        """
+        Render many briefs (bulk export), preserving input order.
+
+        Submission is throttled by the bounded queue, so arbitrarily large
+        batches never hold more than `max_workers + max_queue` renders.
+
+        Args:
+            cases: List of render requests (see `submit`).
+            return_exceptions: If True, failed renders (including requests
+                `submit` rejects, e.g. a missing case_id) yield their
+                exception in place of bytes instead of raising.
+        """
+        pending = []
+        for case in cases:
+            try:
+                pending.append(self.submit(case))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                pending.append(e)
+        results = []
+        for future in pending:
+            if isinstance(future, Exception):
+                results.append(future)
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def get_stats(self) -> dict:
+        """Queue depth and render timing metrics."""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            "renders": metrics.get_counter("pdf_renders_total"),
+            "errors": metrics.get_counter("pdf_render_errors_total"),
+            "render_ms": metrics.get_histogram("pdf_render_ms"),
+            "total_ms": metrics.get_histogram("pdf_render_total_ms"),
+        }
+
+
+# Process-wide service (created on first use)
+_service: Optional[PDFRenderService] = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> PDFRenderService:
+    """Return the shared PDFRenderService, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PDFRenderService()
+        return _service
@@ -1,26 +1,81 @@
 """
 PDF GENERATION UTILITIES - JurisLink V4.0 (Secure)
 Provides secure PDF generation and static file serving for case documents.
+
+Case briefs are content-addressed: the normalized inputs are hashed and the
+hash is recorded in the case manifest (see shared_lib/storage.py), so
+repeated downloads of an unchanged case return the existing file instead of
+re-rendering it.
+
+Briefs can also be rendered purely in memory (`get_case_brief_bytes`) and
+streamed to the client, with disk persistence optional and off the request
+thread; an unchanged stored brief is streamed back instead of re-rendered.
+
+`render_case_documents` normalizes a case once and renders any set of
+documents (case brief, demand letter, reasoning memo, HTML preview) from
+the shared layout, optionally in parallel on an executor.
 """
 import os
+import json
+import html
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait as futures_wait
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from typing import Iterator
 import logging
-from fpdf import FPDF
-from shared_lib.utils import get_secure_storage_path
+from fpdf import FPDF, FPDF_VERSION
+from shared_lib.storage import put_case_file, get_case_file_path, delete_case_file, read_manifest
+from shared_lib.ghost_protocol import register_store
+
+BRIEF_FILENAME = "case_brief.pdf"
+BRIEF_TEMPLATE_VERSION = "4.0"  # Bump when the layout changes to invalidate cached briefs
+
+# Optional TTF (e.g. Noto Sans) used for body text so es/fr/zh/hi content
+# renders instead of degrading to '?'. fpdf2 embeds only the glyphs used.
+PDF_UNICODE_FONT_PATH = os.environ.get("JURISLINK_PDF_FONT_PATH")
+UNICODE_FONT_FAMILY = "JurisUnicode"
+
+# In-process LRU of recent brief hashes: (user_id, case_id) -> content hash
+RENDER_CACHE_SIZE = 256
+_render_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+# Streaming / background persistence
+STREAM_CHUNK_SIZE = 64 * 1024
+_persist_executor = None
+_persist_lock = threading.Lock()
+_pending_writes: set = set()
 
 class CaseBriefPDF(FPDF):
     """Professional Case Brief PDF template (V4.0 Design)."""
     
-    def __init__(self, case_id: str):
+    def __init__(self, case_id: str, title: str = 'JURISLINK INTELLIGENCE REPORT'):
         super().__init__()
         self.case_id = case_id
+        self.report_title = title
+        self.body_font = "Arial"
+        font_path = get_unicode_font_path()
+        if font_path:
+            if FPDF_VERSION.startswith("1."):
+                self.add_font(UNICODE_FONT_FAMILY, '', font_path, uni=True)
+            else:
+                self.add_font(UNICODE_FONT_FAMILY, '', font_path)
+            self.body_font = UNICODE_FONT_FAMILY
+
+    @property
+    def unicode_font(self) -> bool:
+        return self.body_font == UNICODE_FONT_FAMILY
         
     def header(self):
         self.set_font('Arial', 'B', 14)
         self.set_fill_color(15, 23, 42)  # Slate 900
         self.set_text_color(255, 255, 255)
-        self.cell(0, 15, 'JURISLINK INTELLIGENCE REPORT', 0, 1, 'C', True)
+        self.cell(0, 15, self.report_title, 0, 1, 'C', True)
         self.set_text_color(0, 0, 0)
         self.set_font('Arial', 'B', 10)
         self.ln(5)
@@ -32,83 +87,456 @@ class CaseBriefPDF(FPDF):
         self.set_y(-15)
         self.set_font('Arial', 'I', 8)
         self.set_text_color(100, 116, 139) # Slate 500
-        self.cell(0, 10, f'CONFIDENTIAL • Generated by JurisLink AI • Page {self.page_no()}', 0, 0, 'C')
+        self.cell(0, 10, clean_text_for_pdf(f'CONFIDENTIAL • Generated by JurisLink AI • Page {self.page_no()}'), 0, 0, 'C')
 
-def clean_text_for_pdf(text: str) -> str:
-    """Replace problematic characters for PDF encoding."""
+# Replacements for characters the core (latin-1) fonts lack. Built once at
+# import; str.replace runs in C and beats str.translate/regex on large text
+# (see benchmarks/bench_clean_text.py).
+_PDF_REPLACEMENTS = (
+    ('\u2018', "'"), ('\u2019', "'"), ('\u201c', '"'), ('\u201d', '"'),
+    ('\u2013', '-'), ('\u2014', '--'), ('\u2026', '...'), ('\u2022', '-'),
+)
+
+
+def clean_text_for_pdf(text: str, unicode_font: bool = False) -> str:
+    """
+    Replace problematic characters for PDF encoding.
+
+    Pure-ASCII text is returned untouched. With a Unicode font embedded the
+    text is passed through as-is; otherwise smart punctuation is mapped to
+    ASCII and anything outside latin-1 becomes '?'.
+    """
     if not text:
         return ""
-    # Replace common smart quotes and em-dashes
-    replacements = {
-        '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
-        '\u2013': '-', '\u2014': '--', '\u2026': '...'
-    }
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
+    if text.isascii() or unicode_font:
+        return text
+    for char, replacement in _PDF_REPLACEMENTS:
+        if char in text:
+            text = text.replace(char, replacement)
+    if text.isascii():
+        return text
     return text.encode('latin-1', 'replace').decode('latin-1')
 
-def generate_case_brief_pdf(user_id: str, case_id: str, facts: dict, strategy: str = None, research: dict = None) -> str:
+
+@lru_cache(maxsize=4)
+def _resolve_unicode_font(font_path: str):
+    """Validate a configured TTF path once per process (None if unusable)."""
+    if not font_path:
+        return None
+    path = Path(font_path)
+    if not path.is_file():
+        logging.warning(f"PDF Unicode font not found at {font_path}; falling back to latin-1 core fonts")
+        return None
+    return str(path.resolve())
+
+
+def get_unicode_font_path():
+    """Resolved path of the embedded Unicode font, or None to use core fonts."""
+    return _resolve_unicode_font(PDF_UNICODE_FONT_PATH or "")
+
+def compute_brief_hash(case_id: str, facts: dict, strategy: str = None, research=None) -> str:
     """
-    Generate a secure Case Brief PDF.
+    Content hash of the normalized case brief inputs.
+
+    Keys are sorted so dict ordering does not matter; the template version
+    is included so layout changes invalidate previously rendered briefs.
     """
-    if not user_id:
-        raise ValueError("Security Violation: Missing user_id")
+    normalized = json.dumps(
+        {
+            "v": BRIEF_TEMPLATE_VERSION,
+            "font": get_unicode_font_path() or "",
+            "case_id": case_id,
+            "facts": facts or {},
+            "strategy": strategy or "",
+            "research": research or {},
+        },
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
-    storage_path = get_secure_storage_path(user_id, case_id)
-    filename = "case_brief.pdf" # Standardized name inside protected folder
-    file_path = storage_path / filename
-    
-    pdf = CaseBriefPDF(case_id)
+
+def _cache_get(key: tuple):
+    with _render_cache_lock:
+        content_hash = _render_cache.get(key)
+        if content_hash is not None:
+            _render_cache.move_to_end(key)
+        return content_hash
+
+
+def _cache_put(key: tuple, content_hash: str) -> None:
+    with _render_cache_lock:
+        _render_cache[key] = content_hash
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+
+
+def _cache_evict(key: tuple) -> None:
+    with _render_cache_lock:
+        _render_cache.pop(key, None)
+
+
+def _expire_render_cache(now: float, dry_run: bool = False) -> dict:
+    """Retention-engine callback: drop cache entries whose brief has been incinerated."""
+    with _render_cache_lock:
+        keys = list(_render_cache)
+    stale = [key for key in keys if get_case_file_path(*key, BRIEF_FILENAME) is None]
+    if not dry_run:
+        for key in stale:
+            _cache_evict(key)
+    return {"expired": len(stale), "entries": len(keys)}
+
+
+def _read_stored_hash(user_id: str, case_id: str):
+    return read_manifest(user_id, case_id).get(BRIEF_FILENAME, {}).get("source_hash")
+
+
+def _stored_brief(user_id: str, case_id: str, content_hash: str):
+    """Path of the stored brief if it was rendered from `content_hash`, else None."""
+    file_path = get_case_file_path(user_id, case_id, BRIEF_FILENAME)
+    if file_path is None:
+        return None
+    cache_key = (user_id, case_id)
+    if _cache_get(cache_key) == content_hash:
+        return file_path
+    if _read_stored_hash(user_id, case_id) == content_hash:
+        _cache_put(cache_key, content_hash)
+        return file_path
+    return None
+
+
+# =============================================================================
+# DOCUMENT PIPELINE
+# =============================================================================
+
+DOCUMENT_TITLES = {
+    "case_brief": "JURISLINK INTELLIGENCE REPORT",
+    "demand_letter": "DEMAND LETTER",
+    "reasoning_memo": "REASONING MEMORANDUM",
+}
+HTML_PREVIEW = "html_preview"
+DEFAULT_OUTPUTS = ("case_brief",)
+
+
+def _format_facts(facts: dict) -> str:
+    if not facts:
+        return "No facts recorded."
+    return "".join(
+        f"{k.replace('_', ' ').title()}: {v}\n"
+        for k, v in facts.items() if k != 'status' and v
+    )
+
+
+def _format_research(research) -> str:
+    if not research:
+        return ""
+    if isinstance(research, dict):
+        return "".join(f"[{k}]: {str(v)[:1000]}...\n\n" for k, v in research.items())
+    return str(research)[:3000]
+
+
+def normalize_case_inputs(
+    case_id: str,
+    facts: dict,
+    strategy: str = None,
+    research=None,
+    critique: str = None,
+    demand_letter_text: str = None,
+    reasoning_memo_text: str = None,
+) -> dict:
+    """
+    Format and clean every text input exactly once.
+
+    The result is shared by all document layouts, so rendering several
+    documents does not repeat fact formatting or PDF text cleaning.
+    """
+    unicode_font = get_unicode_font_path() is not None
+
+    def clean(text):
+        return clean_text_for_pdf(text, unicode_font) if text else ""
+
+    facts = facts or {}
+    return {
+        "case_id": case_id,
+        "date": datetime.now().strftime('%Y-%m-%d %H:%M'),
+        "client_name": clean(str(facts.get("client_name") or "")),
+        "opposing_party": clean(str(facts.get("opposing_party") or facts.get("employer") or "")),
+        "case_type": clean(str(facts.get("case_type") or "")),
+        "facts": clean(_format_facts(facts)),
+        "strategy": clean(strategy),
+        "research": clean(_format_research(research)),
+        "critique": clean(critique),
+        "demand_letter": clean(demand_letter_text),
+        "reasoning_memo": clean(reasoning_memo_text),
+    }
+
+
+def _layout_case_brief(n: dict) -> list:
+    blocks = [("Key Facts", n["facts"])]
+    if n["strategy"]:
+        blocks.append(("Legal Strategy", n["strategy"]))
+    if n["research"]:
+        blocks.append(("Research Notes", n["research"]))
+    return blocks
+
+
+def _layout_demand_letter(n: dict) -> list:
+    if n["demand_letter"]:
+        return [("Correspondence", n["demand_letter"])]
+    subject = " - ".join(x for x in (n["case_type"] or "Employment matter", n["client_name"]) if x)
+    blocks = [("Re", subject)]
+    if n["opposing_party"]:
+        blocks.append(("To", n["opposing_party"]))
+    blocks.append(("Statement of Facts", n["facts"]))
+    if n["strategy"]:
+        blocks.append(("Basis for Claim", n["strategy"]))
+    return blocks
+
+
+def _layout_reasoning_memo(n: dict) -> list:
+    blocks = []
+    if n["reasoning_memo"]:
+        blocks.append(("Analysis", n["reasoning_memo"]))
+    blocks.append(("Key Facts", n["facts"]))
+    if n["strategy"]:
+        blocks.append(("Legal Strategy", n["strategy"]))
+    if n["critique"]:
+        blocks.append(("Adversarial Review", n["critique"]))
+    if n["research"]:
+        blocks.append(("Research Notes", n["research"]))
+    return blocks
+
+
+LAYOUTS = {
+    "case_brief": _layout_case_brief,
+    "demand_letter": _layout_demand_letter,
+    "reasoning_memo": _layout_reasoning_memo,
+}
+
+
+def _build_document(title: str, case_id: str, date: str, blocks: list) -> CaseBriefPDF:
+    """Lay out a document from pre-cleaned (heading, text) blocks (no I/O)."""
+    pdf = CaseBriefPDF(case_id, title=title)
     pdf.add_page()
     
     # Metadata
     pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 6, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 0, 1)
+    pdf.cell(0, 6, f"Date: {date}", 0, 1)
     pdf.ln(5)
     
-    # Helper for sections
-    def add_section(title, content):
+    for heading, content in blocks:
         pdf.set_font("Arial", 'B', 12)
         pdf.set_fill_color(241, 245, 249) # Slate 100
-        pdf.cell(0, 8, title.upper(), 0, 1, 'L', True)
+        pdf.cell(0, 8, heading.upper(), 0, 1, 'L', True)
         pdf.ln(3)
-        pdf.set_font("Arial", '', 11)
-        pdf.multi_cell(0, 6, clean_text_for_pdf(content))
+        pdf.set_font(pdf.body_font, '', 11)
+        pdf.multi_cell(0, 6, content)
         pdf.ln(6)
 
-    # 1. Facts
-    fact_text = ""
-    if facts:
-        for k, v in facts.items():
-            if k != 'status' and v:
-                fact_text += f"{k.replace('_', ' ').title()}: {v}\n"
+    return pdf
+
+
+def _render_layout_pdf(title: str, case_id: str, date: str, blocks: list) -> bytes:
+    """Render one laid-out document to PDF bytes (picklable for process pools)."""
+    return _pdf_to_bytes(_build_document(title, case_id, date, blocks))
+
+
+def _render_layout_html(title: str, case_id: str, date: str, blocks: list) -> str:
+    """Render laid-out blocks as a self-contained HTML preview fragment."""
+    parts = [
+        '<article class="jurislink-document">',
+        f"<header><h1>{html.escape(title)}</h1>",
+        f"<p>CASE ID: {html.escape(case_id)} &middot; Date: {html.escape(date)}</p></header>",
+    ]
+    for heading, content in blocks:
+        body = "<br>\n".join(html.escape(line) for line in content.rstrip("\n").split("\n"))
+        parts.append(f"<section><h2>{html.escape(heading.upper())}</h2><p>{body}</p></section>")
+    parts.append("</article>")
+    return "\n".join(parts)
+
+
+def render_case_documents(
+    case_id: str,
+    facts: dict,
+    strategy: str = None,
+    research=None,
+    outputs=DEFAULT_OUTPUTS,
+    critique: str = None,
+    demand_letter_text: str = None,
+    reasoning_memo_text: str = None,
+    pool: Executor = None,
+) -> dict:
+    """
+    Render several case documents from one normalization pass.
+
+    Args:
+        outputs: Any of 'case_brief', 'demand_letter', 'reasoning_memo',
+            'html_preview' (HTML of the case brief layout).
+        demand_letter_text / reasoning_memo_text: Writer-generated bodies;
+            when omitted the documents are assembled from facts/strategy.
+        pool: Optional executor (e.g. a ProcessPoolExecutor) used to render
+            the PDFs in parallel.
+
+    Returns:
+        {output_name: bytes} for PDFs and {'html_preview': str}.
+    """
+    unknown = set(outputs) - set(LAYOUTS) - {HTML_PREVIEW}
+    if unknown:
+        raise ValueError(f"Unknown document outputs: {sorted(unknown)}")
+
+    normalized = normalize_case_inputs(
+        case_id, facts, strategy, research, critique, demand_letter_text, reasoning_memo_text
+    )
+    date = normalized["date"]
+    layouts = {name: LAYOUTS[name](normalized) for name in outputs if name in LAYOUTS}
+
+    results = {}
+    if pool is not None and len(layouts) > 1:
+        futures = {
+            name: pool.submit(_render_layout_pdf, DOCUMENT_TITLES[name], case_id, date, blocks)
+            for name, blocks in layouts.items()
+        }
     else:
-        fact_text = "No facts recorded."
-    add_section("Key Facts", fact_text)
-
-    # 2. Strategy
-    if strategy:
-        add_section("Legal Strategy", strategy)
-
-    # 3. Research
-    if research:
-        res_text = ""
-        if isinstance(research, dict):
-            for k, v in research.items():
-                res_text += f"[{k}]: {str(v)[:1000]}...\n\n"
-        else:
-            res_text = str(research)[:3000]
-        add_section("Research Notes", res_text)
-    
-    pdf.output(str(file_path))
+        futures = {}
+        for name, blocks in layouts.items():
+            results[name] = _render_layout_pdf(DOCUMENT_TITLES[name], case_id, date, blocks)
+
+    if HTML_PREVIEW in outputs:
+        blocks = layouts.get("case_brief") or _layout_case_brief(normalized)
+        results[HTML_PREVIEW] = _render_layout_html(DOCUMENT_TITLES["case_brief"], case_id, date, blocks)
+
+    for name, future in futures.items():
+        results[name] = future.result()
+    return {name: results[name] for name in outputs}
+
+
+def to_generated_docs(documents: dict) -> dict:
+    """Base64-encode rendered PDFs into the GeneratedDocs state shape."""
+    return {
+        name: base64.b64encode(documents[name]).decode("ascii")
+        for name in ("demand_letter", "reasoning_memo") if name in documents
+    }
+
+
+def _build_case_brief(case_id: str, facts: dict, strategy: str = None, research=None) -> CaseBriefPDF:
+    """Lay out a Case Brief in memory (no I/O)."""
+    normalized = normalize_case_inputs(case_id, facts, strategy, research)
+    return _build_document(
+        DOCUMENT_TITLES["case_brief"], case_id, normalized["date"], _layout_case_brief(normalized)
+    )
+
+
+def _pdf_to_bytes(pdf: FPDF) -> bytes:
+    """Serialize an FPDF document to bytes (fpdf2 and legacy fpdf 1.x)."""
+    if FPDF_VERSION.startswith("1."):
+        return pdf.output(dest="S").encode("latin-1")
+    return bytes(pdf.output())
+
+
+def render_case_brief_bytes(case_id: str, facts: dict, strategy: str = None, research: dict = None) -> bytes:
+    """
+    Render a Case Brief entirely in memory.
+
+    Touches no filesystem, so it is safe on read-only/serverless hosts.
+    """
+    return _pdf_to_bytes(_build_case_brief(case_id, facts, strategy, research))
+
+
+def iter_pdf_chunks(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a rendered PDF in fixed-size chunks for streaming responses."""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+def _write_brief(user_id: str, case_id: str, data: bytes, content_hash: str) -> str:
+    """Persist rendered brief bytes, recording the input hash in the case manifest."""
+    _cache_evict((user_id, case_id))
+    file_path = put_case_file(user_id, case_id, BRIEF_FILENAME, data, source_hash=content_hash)
+    _cache_put((user_id, case_id), content_hash)
     return str(file_path)
 
+
+def _persist_in_background(user_id: str, case_id: str, data: bytes, content_hash: str) -> Future:
+    global _persist_executor
+    with _persist_lock:
+        if _persist_executor is None:
+            _persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-persist")
+        future = _persist_executor.submit(_write_brief, user_id, case_id, data, content_hash)
+
+    def _log_failure(f: Future):
+        if f.exception() is not None:
+            logging.warning(f"Background brief persist failed for {case_id}: {f.exception()}")
+
+    future.add_done_callback(_log_failure)
+    _pending_writes.add(future)
+    future.add_done_callback(_pending_writes.discard)
+    return future
+
+
+def flush_pending_writes(timeout: float = None) -> None:
+    """Block until queued background brief writes have finished."""
+    futures_wait(list(_pending_writes), timeout=timeout)
+
+
+def get_case_brief_bytes(
+    user_id: str,
+    case_id: str,
+    facts: dict,
+    strategy: str = None,
+    research: dict = None,
+    persist: bool = True,
+) -> bytes:
+    """
+    Render a Case Brief for direct streaming to the client.
+
+    If a brief with identical inputs is already stored it is read back
+    instead of re-rendered. Otherwise the PDF is rendered in memory and,
+    when `persist` is set, saved to secure storage on a background thread,
+    so the download never waits on a disk write.
+    """
+    if not user_id:
+        raise ValueError("Security Violation: Missing user_id")
+
+    content_hash = compute_brief_hash(case_id, facts, strategy, research)
+    stored = _stored_brief(user_id, case_id, content_hash)
+    if stored is not None:
+        try:
+            return stored.read_bytes()
+        except OSError:
+            pass  # Incinerated or replaced since the lookup; render it again
+
+    data = render_case_brief_bytes(case_id, facts, strategy, research)
+    if persist:
+        _persist_in_background(user_id, case_id, data, content_hash)
+    return data
+
+
+def generate_case_brief_pdf(user_id: str, case_id: str, facts: dict, strategy: str = None, research: dict = None) -> str:
+    """
+    Generate a secure Case Brief PDF.
+
+    If a brief with identical inputs was already rendered for this case, the
+    existing file path is returned without re-rendering.
+    """
+    if not user_id:
+        raise ValueError("Security Violation: Missing user_id")
+
+    content_hash = compute_brief_hash(case_id, facts, strategy, research)
+    stored = _stored_brief(user_id, case_id, content_hash)
+    if stored is not None:
+        return str(stored)
+
+    data = render_case_brief_bytes(case_id, facts, strategy, research)
+    return _write_brief(user_id, case_id, data, content_hash)
+
 def get_existing_pdf_path(user_id: str, case_id: str) -> str:
     """Get path to existing PDF if authorized."""
     try:
-        storage_path = get_secure_storage_path(user_id, case_id)
-        file_path = storage_path / "case_brief.pdf"
-        if file_path.exists():
+        file_path = get_case_file_path(user_id, case_id, BRIEF_FILENAME)
+        if file_path:
             return str(file_path)
     except Exception:
         pass
@@ -117,10 +545,11 @@ def get_existing_pdf_path(user_id: str, case_id: str) -> str:
 def delete_case_pdf(user_id: str, case_id: str) -> bool:
     """Securely delete case file."""
     try:
-        path_str = get_existing_pdf_path(user_id, case_id)
-        if path_str:
-            Path(path_str).unlink()
-            return True
+        _cache_evict((user_id, case_id))
+        return delete_case_file(user_id, case_id, BRIEF_FILENAME)
     except Exception:
         pass
     return False
+
+
+register_store("pdf_render_cache", _expire_render_cache)
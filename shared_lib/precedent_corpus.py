@@ -0,0 +1,234 @@
+"""
+PRECEDENT CORPUS FILES - JurisLink
+Columnar, memory-mapped storage for large precedent sets.
+
+A corpus file is opened with `mmap`, so every worker process on a host
+shares the same page-cache pages and nothing is parsed up front; a record
+is only decoded when it is accessed.
+
+File layout (all integers little-endian, arrays 8-byte aligned):
+    b"JLPCORP1"              Magic
+    uint64                   Header length
+    header (JSON, utf-8)     {"count", "digest", "heap_offset", "heap_size",
+                              "columns": [{"name", "type", "offset"}]}
+    column data              int   -> int64[count]
+                             str   -> uint64[count + 1] offsets into the heap
+                             list  -> uint64[count + 1] offsets; items joined by \\x1f
+    string heap              utf-8 bytes
+
+Usage:
+    from shared_lib.precedent_corpus import write_corpus, PrecedentCorpus
+    write_corpus(records, "precedents.jlpc")
+    corpus = PrecedentCorpus("precedents.jlpc")
+    corpus[0]["name"]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"JLPCORP1"
+LIST_SEPARATOR = "\x1f"
+MISSING_INT = np.iinfo(np.int64).min
+
+
+class CorpusFormatError(ValueError):
+    """Raised when a file is not a readable precedent corpus."""
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _column_type(values: list) -> str:
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if all(isinstance(v, (list, tuple)) for v in present):
+        return "list"
+    return "str"
+
+
+def corpus_digest(records: Sequence[dict]) -> str:
+    """Stable content hash of a record list (the corpus version)."""
+    payload = json.dumps(list(records), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_corpus(records: Sequence[dict], path) -> Path:
+    """
+    Write `records` to a corpus file (atomically replacing `path`).
+
+    Columns are inferred from the union of record keys: all-int values
+    become int64 columns, lists become list columns (items must not contain
+    \\x1f), everything else is stored as text.
+    """
+    records = list(records)
+    names = list(dict.fromkeys(key for r in records for key in r))
+    heap = bytearray()
+    arrays, columns = [], []
+    offset = 0
+
+    for name in names:
+        values = [r.get(name) for r in records]
+        kind = _column_type(values)
+        if kind == "int":
+            array = np.array([MISSING_INT if v is None else v for v in values], dtype="<i8")
+        else:
+            bounds = [len(heap)]
+            for v in values:
+                if kind == "list":
+                    v = LIST_SEPARATOR.join(str(item) for item in (v or ()))
+                heap += ("" if v is None else str(v)).encode("utf-8")
+                bounds.append(len(heap))
+            array = np.array(bounds, dtype="<u8")
+        columns.append({"name": name, "type": kind, "offset": offset})
+        arrays.append(array)
+        offset = _align(offset + array.nbytes)
+
+    header = {
+        "count": len(records),
+        "digest": corpus_digest(records),
+        "heap_offset": offset,
+        "heap_size": len(heap),
+        "columns": columns,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (_align(len(MAGIC) + 8 + len(header_bytes)) - len(MAGIC) - 8 - len(header_bytes))
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        data_start = f.tell()
+        for column, array in zip(columns, arrays):
+            f.write(b"\0" * (data_start + column["offset"] - f.tell()))
+            f.write(array.tobytes())
+        f.write(b"\0" * (data_start + offset - f.tell()))
+        f.write(heap)
+    os.replace(tmp, path)
+    return path
+
+
+class PrecedentCorpus:
+    """
+    Read-only, memory-mapped precedent corpus.
+
+    Behaves like a sequence of record dicts; each record is decoded from
+    the mapped file when it is accessed. Offsets and int columns are NumPy
+    views straight onto the mapping (no copies).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise CorpusFormatError(f"{self.path} is not a precedent corpus file")
+            (header_len,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+            data_start = len(MAGIC) + 8 + header_len
+            header = json.loads(self._mmap[len(MAGIC) + 8:data_start])
+        except CorpusFormatError:
+            self._mmap.close()
+            raise
+        except (struct.error, ValueError) as e:
+            self._mmap.close()
+            raise CorpusFormatError(f"{self.path}: corrupt corpus header ({e})") from e
+
+        self.count: int = header["count"]
+        self.digest: str = header["digest"]
+        self._heap_start = data_start + header["heap_offset"]
+        self._columns = {}
+        for column in header["columns"]:
+            if column["type"] == "int":
+                dtype, length = "<i8", self.count
+            else:
+                dtype, length = "<u8", self.count + 1
+            view = np.frombuffer(self._mmap, dtype=dtype, count=length,
+                                 offset=data_start + column["offset"])
+            self._columns[column["name"]] = (column["type"], view)
+
+    # -------------------------------------------------------------------------
+    # Sequence protocol
+    # -------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> dict:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("corpus index out of range")
+        record = {}
+        for name in self._columns:
+            value = self.get(i, name)
+            if value not in (None, "", []):
+                record[name] = value
+        return record
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[i] for i in range(self.count))
+
+    # -------------------------------------------------------------------------
+    # Column access
+    # -------------------------------------------------------------------------
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    def get(self, i: int, name: str):
+        """Decode one field of one record (None if the column is absent)."""
+        column = self._columns.get(name)
+        if column is None:
+            return None
+        kind, view = column
+        if kind == "int":
+            value = int(view[i])
+            return None if value == MISSING_INT else value
+        start, end = int(view[i]), int(view[i + 1])
+        text = self._mmap[self._heap_start + start:self._heap_start + end].decode("utf-8")
+        if kind == "list":
+            return text.split(LIST_SEPARATOR) if text else []
+        return text
+
+    def int_column(self, name: str) -> Optional[np.ndarray]:
+        """Zero-copy int64 view of an int column (MISSING_INT marks absent values)."""
+        column = self._columns.get(name)
+        return column[1] if column and column[0] == "int" else None
+
+    def close(self) -> None:
+        # Views must be dropped before the mapping can close
+        self._columns = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # A caller still holds a column view; the GC unmaps it later
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a precedent corpus file from a JSON list of records")
+    parser.add_argument("source", type=Path, help="JSON file containing a list of precedent records")
+    parser.add_argument("output", type=Path, help="Corpus file to write (e.g. precedents.jlpc)")
+    args = parser.parse_args()
+
+    records = json.loads(args.source.read_text(encoding="utf-8"))
+    write_corpus(records, args.output)
+    print(f"Wrote {len(records)} precedents to {args.output}")
@@ -1,7 +1,54 @@
 """
 Employment Law Precedent Database
 Landmark cases for case matching and citation in legal strategy.
+
+Matching uses a BM25 ranking engine: each record's name, summary and
+keywords are tokenized (unigrams + bigrams) into an inverted index at load
+time, with per-posting BM25 weights precomputed as NumPy arrays, so a query
+is scored against the whole corpus in one vectorized pass. Exact keyword
+phrases found in the facts (one Aho-Corasick pass, see
+shared_lib/keyword_matcher.py) add a bonus on top of BM25. A record is only
+ranked if it hits a curated keyword or clears the BM25 relevance floor
+(MIN_TERM_MATCHES), so facts with no legal content match nothing.
+
+With precomputed embeddings (shared_lib/embeddings.py, the
+JURISLINK_PRECEDENT_EMBEDDINGS setting) ranking becomes hybrid: BM25 and
+cosine similarity blended by PrecedentConfig.SEMANTIC_WEIGHT.
+
+Records may link to each other through "cites" and "overruled_by" (lists of
+citations or case names; overruling statutes outside the corpus are kept
+as notes). The links form a citation graph whose personalized PageRank,
+precomputed per record at load, re-ranks the top matches by their citation
+neighbourhood (PrecedentConfig.GRAPH_WEIGHT).
+
+Lookups are memoized per normalized case facts and corpus version
+(find_relevant_precedents, precedents_for_strategy), so strategist
+iterations over unchanged facts skip ranking and rendering.
+
+Facets (category, decision year, court, jurisdiction) are indexed as
+packed bitsets; `find_relevant_precedents` restricts scoring to the
+jurisdiction of the case facts, and boosts (never filters) precedents in a
+category of the case type.
+
+`PRECEDENTS` is the built-in default corpus. Larger sets are loaded from a
+memory-mapped corpus file (shared_lib/precedent_corpus.py) via
+`load_corpus(path)` or the JURISLINK_PRECEDENT_CORPUS setting.
 """
+import hashlib
+import json
+import re
+import threading
+from collections import Counter, OrderedDict
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared_lib.config import PrecedentConfig
+from shared_lib.embeddings import EmbeddingIndex
+from shared_lib.keyword_matcher import KeywordMatcher
+from shared_lib.metrics import metrics
+from shared_lib.precedent_corpus import MISSING_INT, PrecedentCorpus, corpus_digest
 
 # Landmark Employment Law Cases
 PRECEDENTS = [
@@ -19,7 +66,8 @@ PRECEDENTS = [
         "year": 1998,
         "category": "harassment",
         "summary": "Employer vicariously liable for supervisor harassment. Affirmative defense available if employer took reasonable care to prevent/correct harassment and employee unreasonably failed to use complaint procedures.",
-        "keywords": ["harassment", "hostile work environment", "supervisor", "vicarious liability", "title vii"]
+        "keywords": ["harassment", "hostile work environment", "supervisor", "vicarious liability", "title vii"],
+        "cites": ["477 U.S. 57 (1986)"]
     },
     {
         "name": "Faragher v. City of Boca Raton",
@@ -27,7 +75,8 @@ PRECEDENTS = [
         "year": 1998,
         "category": "harassment",
         "summary": "Companion case to Ellerth. Established employer liability standards for supervisor harassment creating hostile work environment.",
-        "keywords": ["harassment", "hostile work environment", "employer liability", "title vii"]
+        "keywords": ["harassment", "hostile work environment", "employer liability", "title vii"],
+        "cites": ["477 U.S. 57 (1986)", "524 U.S. 742 (1998)"]
     },
     {
         "name": "Meritor Savings Bank v. Vinson",
@@ -43,7 +92,8 @@ PRECEDENTS = [
         "year": 1989,
         "category": "discrimination",
         "summary": "Sex stereotyping constitutes sex discrimination. Established mixed-motive analysis for discrimination cases.",
-        "keywords": ["sex discrimination", "stereotyping", "mixed motive", "title vii", "gender"]
+        "keywords": ["sex discrimination", "stereotyping", "mixed motive", "title vii", "gender"],
+        "cites": ["411 U.S. 792 (1973)"]
     },
     {
         "name": "Griggs v. Duke Power Co.",
@@ -59,7 +109,8 @@ PRECEDENTS = [
         "year": 1996,
         "category": "age_discrimination",
         "summary": "Age discrimination claim does not require replacement by someone under 40. Key is whether age was the determining factor.",
-        "keywords": ["age discrimination", "adea", "replacement", "over 40"]
+        "keywords": ["age discrimination", "adea", "replacement", "over 40"],
+        "cites": ["411 U.S. 792 (1973)", "507 U.S. 604 (1993)"]
     },
     {
         "name": "Gross v. FBL Financial Services",
@@ -67,7 +118,8 @@ PRECEDENTS = [
         "year": 2009,
         "category": "age_discrimination",
         "summary": "ADEA requires plaintiff to prove age was 'but-for' cause of adverse action. No mixed-motive claims under ADEA.",
-        "keywords": ["age discrimination", "adea", "but for", "causation"]
+        "keywords": ["age discrimination", "adea", "but for", "causation"],
+        "cites": ["490 U.S. 228 (1989)", "507 U.S. 604 (1993)"]
     },
     {
         "name": "Hazen Paper Co. v. Biggins",
@@ -83,7 +135,8 @@ PRECEDENTS = [
         "year": 1998,
         "category": "harassment",
         "summary": "Same-sex harassment is actionable under Title VII. Focus is on whether conduct was because of sex.",
-        "keywords": ["sexual harassment", "same sex", "title vii", "hostile work environment"]
+        "keywords": ["sexual harassment", "same sex", "title vii", "hostile work environment"],
+        "cites": ["477 U.S. 57 (1986)", "490 U.S. 228 (1989)"]
     },
     {
         "name": "Ledbetter v. Goodyear Tire & Rubber Co.",
@@ -91,7 +144,8 @@ PRECEDENTS = [
         "year": 2007,
         "category": "wage_discrimination",
         "summary": "Each discriminatory paycheck is not a separate violation (overruled by Lilly Ledbetter Fair Pay Act 2009).",
-        "keywords": ["pay discrimination", "statute of limitations", "title vii", "equal pay"]
+        "keywords": ["pay discrimination", "statute of limitations", "title vii", "equal pay"],
+        "overruled_by": ["Lilly Ledbetter Fair Pay Act of 2009"]
     },
     {
         "name": "Thompson v. North American Stainless",
@@ -99,7 +153,8 @@ PRECEDENTS = [
         "year": 2011,
         "category": "retaliation",
         "summary": "Third-party retaliation claims are actionable. Firing employee's fiancé after she filed EEOC charge is unlawful retaliation.",
-        "keywords": ["retaliation", "third party", "title vii", "eeoc", "wrongful termination"]
+        "keywords": ["retaliation", "third party", "title vii", "eeoc", "wrongful termination"],
+        "cites": ["548 U.S. 53 (2006)"]
     },
     {
         "name": "Burlington Northern v. White",
@@ -107,7 +162,8 @@ PRECEDENTS = [
         "year": 2006,
         "category": "retaliation",
         "summary": "Retaliation standard is broader than discrimination standard. Covers any action that might dissuade reasonable worker from making complaint.",
-        "keywords": ["retaliation", "title vii", "adverse action", "materially adverse"]
+        "keywords": ["retaliation", "title vii", "adverse action", "materially adverse"],
+        "cites": ["524 U.S. 742 (1998)", "524 U.S. 775 (1998)"]
     },
     {
         "name": "Staub v. Proctor Hospital",
@@ -115,7 +171,8 @@ PRECEDENTS = [
         "year": 2011,
         "category": "discrimination",
         "summary": "Cat's paw liability: Employer liable when supervisor's discriminatory animus is proximate cause of adverse action, even if decision-maker unaware.",
-        "keywords": ["discrimination", "userra", "cat's paw", "supervisor bias", "proximate cause"]
+        "keywords": ["discrimination", "userra", "cat's paw", "supervisor bias", "proximate cause"],
+        "cites": ["524 U.S. 742 (1998)"]
     },
     {
         "name": "Bostock v. Clayton County",
@@ -123,37 +180,932 @@ PRECEDENTS = [
         "year": 2020,
         "category": "discrimination",
         "summary": "Title VII prohibits discrimination based on sexual orientation and gender identity as forms of sex discrimination.",
-        "keywords": ["lgbtq", "sexual orientation", "gender identity", "title vii", "sex discrimination"]
+        "keywords": ["lgbtq", "sexual orientation", "gender identity", "title vii", "sex discrimination"],
+        "cites": ["490 U.S. 228 (1989)", "523 U.S. 75 (1998)"]
     }
 ]
 
 
+# =============================================================================
+# BM25 RANKING ENGINE
+# =============================================================================
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+KEYWORD_BOOST = 2  # Curated keywords count as this many occurrences
+KEYWORD_MATCH_WEIGHT = 2.0  # Bonus per curated keyword phrase found verbatim in the facts
+CATEGORY_BOOST = 0.1  # Relative score bonus for matches in a category of the case type
+DENSE_TERM_MIN_DF = 0.25  # Terms in at least this share of records also get a dense weight row
+HYBRID_POOL = 10  # Unfiltered hybrid queries blend each ranker's best k * HYBRID_POOL records
+# Relevance floor: a record without an exact keyword hit is only ranked if its
+# BM25 score is at least this many typical (median) single-term matches
+MIN_TERM_MATCHES = 2.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+# NLTK English stopword list, plus case-name and legal-prose function words
+_STOPWORDS = frozenset("""
+    i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself
+    yourselves he him his himself she she's her hers herself it it's its itself they them their
+    theirs themselves what which who whom this that that'll these those am is are was were be
+    been being have has had having do does did doing a an the and but if or because as until
+    while of at by for with about against between into through during before after above below
+    to from up down in out on off over under again further then once here there when where why
+    how all any both each few more most other some such no nor not only own same so than too
+    very s t can will just don don't should should've now d ll m o re ve y ain aren aren't
+    couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't
+    ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't
+    weren weren't won won't wouldn wouldn't
+    v vs also could would upon within without
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word unigrams plus adjacent bigrams ("title vii"), stopwords removed."""
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _document_tokens(record: dict) -> List[str]:
+    return _tokens_of(record.get("name"), record.get("summary"), record.get("keywords"))
+
+
+def _tokens_of(name: Optional[str], summary: Optional[str], keywords) -> List[str]:
+    tokens = tokenize(f"{name or ''} {summary or ''}")
+    for kw in keywords or ():
+        tokens.extend(tokenize(kw) * KEYWORD_BOOST)
+    return tokens
+
+
+# =============================================================================
+# RECORD COLUMNS
+# =============================================================================
+
+def record_columns(records, fields: Sequence[str]) -> Dict[str, list]:
+    """
+    The given fields of every record, decoded in one pass (None where absent).
+
+    A PrecedentCorpus decodes only these columns instead of building a dict
+    per record, and "year" comes back as an int64 array (-1 where absent),
+    taken straight from the corpus int column when there is one. The index
+    builders share one decode (see PrecedentIndex).
+    """
+    n = len(records)
+    corpus = records if isinstance(records, PrecedentCorpus) else None
+    year_column = corpus.int_column("year") if corpus is not None and "year" in fields else None
+    names = [name for name in fields if name != "year" or year_column is None]
+    columns = {name: [None] * n for name in names}
+    if corpus is not None:
+        present = set(corpus.fields)
+        names = [name for name in names if name in present]
+
+    for doc in range(n):
+        if corpus is None:
+            record = records[doc]
+            for name in names:
+                columns[name][doc] = record.get(name)
+        else:
+            for name in names:
+                columns[name][doc] = corpus.get(doc, name)
+
+    if year_column is not None:
+        columns["year"] = np.where(year_column == MISSING_INT, -1, year_column)
+    elif "year" in fields:
+        columns["year"] = np.array([y if isinstance(y, int) else -1 for y in columns["year"]], dtype=np.int64)
+    return columns
+
+
+# =============================================================================
+# CITATION GRAPH
+# =============================================================================
+
+PAGERANK_RESTART = 0.15  # Random-walk restart probability
+PAGERANK_HOPS = 2  # The precomputed PageRank series stops after this many steps
+PAGERANK_TOP = 32  # Largest entries kept per precomputed row
+PAGERANK_MAX_FANOUT = 256  # Second-hop walks skip nodes with more links than this
+GRAPH_SEEDS = 10  # Top matches whose citation neighbourhood is re-ranked
+OVERRULED_PENALTY = 0.5  # Score multiplier for overruled precedents
+
+
+def _reference_key(reference: str) -> str:
+    return " ".join(str(reference).lower().split())
+
+
+def _edge_csr(edges: list, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR (indptr, int32 targets) of (source, target) pairs, deduplicated and sorted."""
+    keys = np.unique(np.asarray(edges, dtype=np.int64).reshape(-1, 2) @ np.array([max(n, 1), 1]))
+    return _rows_csr(keys // max(n, 1), keys % max(n, 1), n)
+
+
+def _rows_csr(rows: np.ndarray, cols: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR of entries already sorted by row."""
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n)))).astype(np.int64)
+    return indptr, cols.astype(np.int32)
+
+
+def _gather_rows(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of every entry of CSR `rows`, plus the row (index into `rows`) each came from."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return positions, owners
+
+
+class CitationGraph:
+    """
+    Citation links between records, as CSR adjacency (int32 record ids).
+
+    - `cites_indptr` / `cites_ids`: records each record cites.
+    - `links_indptr` / `links_ids`: the undirected graph (cites + cited by),
+      used for expansion and PageRank.
+    - `overruled_by_indptr` / `overruled_by_ids`: in-corpus overruling records.
+    - `overruled`: bool per record, also set for overruling statutes or
+      cases outside the corpus.
+
+    Personalized PageRank from each record is precomputed as the series
+    r * sum((1 - r)^t * P^t) for t <= PAGERANK_HOPS (P = random walk on the
+    undirected graph, r = PAGERANK_RESTART), keeping the PAGERANK_TOP largest
+    entries per record (`ppr_indptr`, `ppr_ids`, `ppr_weights`). PageRank is
+    linear in its restart distribution, so the PageRank of a weighted seed
+    set is the weighted sum of the seeds' rows.
+
+    `columns` (from record_columns, with at least FIELDS) lets a caller
+    share one decode of the records across builders.
+    """
+
+    FIELDS = ("citation", "name", "cites", "overruled_by")
+
+    def __init__(self, records, columns: Optional[Dict[str, list]] = None):
+        n = self.size = len(records)
+        if columns is None:
+            columns = record_columns(records, self.FIELDS)
+        # Normalized citations and names; `_exact` skips normalizing references
+        # spelled exactly like the target (the common case)
+        self.lookup, self._exact = {}, {}
+        for doc, references in enumerate(zip(columns["citation"], columns["name"])):
+            for reference in references:
+                if reference:
+                    self._exact.setdefault(reference, doc)
+                    self.lookup.setdefault(_reference_key(reference), doc)
+
+        cites, overrules = [], []
+        self.overruled = np.zeros(n, dtype=bool)
+        for doc, (cited, overruled_by) in enumerate(zip(columns["cites"], columns["overruled_by"])):
+            for reference in cited or ():
+                target = self.resolve(reference)
+                if target is not None and target != doc:
+                    cites.append((doc, target))
+            for reference in overruled_by or ():
+                self.overruled[doc] = True
+                target = self.resolve(reference)
+                if target is not None and target != doc:
+                    overrules.append((doc, target))
+
+        self.cites_indptr, self.cites_ids = _edge_csr(cites, n)
+        self.overruled_by_indptr, self.overruled_by_ids = _edge_csr(overrules, n)
+        self.links_indptr, self.links_ids = _edge_csr(cites + [(b, a) for a, b in cites], n)
+        self.ppr_indptr, self.ppr_ids, self.ppr_weights = self._precompute_pagerank()
+
+    def resolve(self, reference: str) -> Optional[int]:
+        """Record id for a citation or case name, or None if it is not in the corpus."""
+        doc = self._exact.get(reference)
+        return doc if doc is not None else self.lookup.get(_reference_key(reference))
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.cites_ids)
+
+    def _precompute_pagerank(self):
+        n, r = self.size, PAGERANK_RESTART
+        degree = np.diff(self.links_indptr)
+        # Step 0: every record restarts on itself
+        rows = [np.arange(n, dtype=np.int64)]
+        cols = [np.arange(n, dtype=np.int64)]
+        values = [np.full(n, r, dtype=np.float64)]
+
+        # Walk entries (row, col, probability) after t steps
+        walk_rows = np.repeat(np.arange(n, dtype=np.int64), degree)
+        walk_cols = self.links_ids.astype(np.int64)
+        walk_prob = 1.0 / np.repeat(np.maximum(degree, 1), degree)
+        for step in range(1, PAGERANK_HOPS + 1):
+            rows.append(walk_rows)
+            cols.append(walk_cols)
+            values.append(r * (1 - r) ** step * walk_prob)
+            if step == PAGERANK_HOPS:
+                break
+            through = degree[walk_cols] <= PAGERANK_MAX_FANOUT
+            positions, owners = _gather_rows(self.links_indptr, walk_cols[through])
+            walk_rows = walk_rows[through][owners]
+            walk_prob = walk_prob[through][owners] / degree[walk_cols[through]][owners]
+            walk_cols = self.links_ids[positions].astype(np.int64)
+
+        keys, inverse = np.unique(np.concatenate(rows) * n + np.concatenate(cols), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate(values))
+        rows, cols = keys // max(n, 1), keys % max(n, 1)
+        # Keep the PAGERANK_TOP largest entries of each row: one sort on
+        # row + (0, 0.5] with larger values first within a row
+        order = np.argsort(rows + 0.5 * (1 - sums / sums.max()) if len(sums) else rows, kind="stable")
+        rows, cols, sums = rows[order], cols[order], sums[order]
+        starts = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))[:-1]
+        keep = np.arange(len(rows)) - starts[rows] < PAGERANK_TOP
+        indptr, ids = _rows_csr(rows[keep], cols[keep], n)
+        return indptr, ids, sums[keep].astype(np.float32)
+
+    def expand(self, seeds, hops: int = 1) -> np.ndarray:
+        """Sorted ids of records within `hops` citation links of `seeds` (seeds excluded)."""
+        seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+        seen = frontier = seeds
+        for _ in range(hops):
+            positions, _ = _gather_rows(self.links_indptr, frontier)
+            frontier = np.setdiff1d(self.links_ids[positions], seen)
+            seen = np.union1d(seen, frontier)
+        return np.setdiff1d(seen, seeds).astype(np.int64)
+
+    def personalized_pagerank(self, seeds, weights=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        PageRank restarting at `seeds` (in proportion to `weights`).
+
+        Returns (sorted record ids, float32 scores) over the seeds' precomputed neighbourhoods.
+        """
+        seeds = np.asarray(seeds, dtype=np.int64)
+        weights = np.ones(len(seeds)) if weights is None else np.asarray(weights, dtype=np.float64)
+        positions, owners = _gather_rows(self.ppr_indptr, seeds)
+        ids, inverse = np.unique(self.ppr_ids[positions], return_inverse=True)
+        scores = np.bincount(inverse, weights=self.ppr_weights[positions] * weights[owners], minlength=len(ids))
+        return ids.astype(np.int64), scores.astype(np.float32)
+
+
+# =============================================================================
+# FACET INDEX
+# =============================================================================
+
+FEDERAL = "federal"
+_COURT_PATTERNS = [
+    ("supreme_court", re.compile(r"\bU\.\s?S\.|\bS\.\s?Ct\.")),
+    ("district_court", re.compile(r"\bF\.\s?Supp\.")),
+    ("court_of_appeals", re.compile(r"\bF\.(?:\s?(?:2d|3d|4th)|\s?App'x)?\s")),
+]
+_FEDERAL_COURTS = frozenset(name for name, _ in _COURT_PATTERNS)
+_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+
+def _facet_value(value) -> str:
+    """Normalized facet key: lowercase words joined by underscores."""
+    return re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_")
+
+
+_STATE_VALUES = frozenset(_facet_value(name) for name in _STATES.values())
+
+
+def state_of(place: str) -> Optional[str]:
+    """
+    Jurisdiction facet of a US state named in a place ("San Francisco,
+    California" / "Austin, TX, USA" -> california / texas), or None.
+    """
+    for part in reversed(str(place).split(",")):
+        part = part.strip()
+        name = _STATES.get(part.upper()) if len(part) == 2 else part
+        value = _facet_value(name or "")
+        if value and value in _STATE_VALUES:
+            return value
+    return None
+
+
+def court_of(record: dict) -> str:
+    """Court facet: the record's "court" field, else inferred from the citation reporter."""
+    return _court_facet(record.get("court"), record.get("citation"))
+
+
+def jurisdiction_of(record: dict) -> str:
+    """Jurisdiction facet: the record's "jurisdiction" field, else federal for federal reporters."""
+    return _jurisdiction_facet(record.get("jurisdiction"), court_of(record))
+
+
+def _court_facet(court: Optional[str], citation: Optional[str]) -> str:
+    if court:
+        return _facet_value(court)
+    for name, pattern in _COURT_PATTERNS:
+        if pattern.search(citation or ""):
+            return name
+    return ""
+
+
+def _jurisdiction_facet(jurisdiction: Optional[str], court: str) -> str:
+    if jurisdiction:
+        return _facet_value(jurisdiction)
+    return FEDERAL if court in _FEDERAL_COURTS else ""
+
+
+class FacetIndex:
+    """
+    Per-facet postings stored as packed bitsets (one bit per record).
+
+    Each categorical value (category, court, jurisdiction) maps to a
+    `uint8[ceil(n / 8)]` bitset; years are a sorted stack of per-year
+    bitsets so a range is one OR-reduce over a contiguous slice. A query
+    ORs the values it accepts within a facet and ANDs across facets.
+    `columns` is as for CitationGraph.
+    """
+
+    FACETS = ("category", "court", "jurisdiction")
+    FIELDS = FACETS + ("citation", "year")
+
+    def __init__(self, records, columns: Optional[Dict[str, list]] = None):
+        self.size = len(records)
+        if columns is None:
+            columns = record_columns(records, self.FIELDS)
+        courts = [_court_facet(court, citation) for court, citation in zip(columns["court"], columns["citation"])]
+        values = {
+            "category": [_facet_value(category or "") for category in columns["category"]],
+            "court": courts,
+            "jurisdiction": [_jurisdiction_facet(j, court) for j, court in zip(columns["jurisdiction"], courts)],
+        }
+        years = columns["year"]
+
+        self.postings = {}
+        for facet, column in values.items():
+            keys, inverse = np.unique(np.asarray(column, dtype=object).astype(str), return_inverse=True)
+            self.postings[facet] = {
+                str(key): self._pack(inverse == i) for i, key in enumerate(keys)
+            }
+
+        self.years = np.unique(years[years >= 0])
+        self.year_bits = np.stack([self._pack(years == y) for y in self.years]) if len(self.years) \
+            else np.zeros((0, self._nbytes()), dtype=np.uint8)
+
+    def _nbytes(self) -> int:
+        return (self.size + 7) // 8
+
+    @staticmethod
+    def _pack(mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def values(self, facet: str) -> List[str]:
+        return sorted(self.postings[facet])
+
+    def _any_of(self, facet: str, accepted: Iterable[str]) -> np.ndarray:
+        rows = [self.postings[facet][v] for v in accepted if v in self.postings[facet]]
+        if not rows:
+            return np.zeros(self._nbytes(), dtype=np.uint8)
+        return np.bitwise_or.reduce(rows, axis=0)
+
+    def _year_range(self, low: Optional[int], high: Optional[int]) -> np.ndarray:
+        start = 0 if low is None else int(np.searchsorted(self.years, low, side="left"))
+        stop = len(self.years) if high is None else int(np.searchsorted(self.years, high, side="right"))
+        if start >= stop:
+            return np.zeros(self._nbytes(), dtype=np.uint8)
+        return np.bitwise_or.reduce(self.year_bits[start:stop], axis=0)
+
+    def bitset(self, category=None, court=None, jurisdiction=None,
+               years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Optional[np.ndarray]:
+        """
+        Packed bitset of the records passing every given facet.
+
+        Args:
+            category, court, jurisdiction: Accepted value or values for the
+                facet (any of them matches); None leaves the facet open.
+            years: Inclusive (low, high) decision-year range; either end may be None.
+
+        Returns:
+            The intersection, or None when no facet was constrained.
+        """
+        parts = []
+        for facet, accepted in (("category", category), ("court", court), ("jurisdiction", jurisdiction)):
+            if accepted is None:
+                continue
+            if isinstance(accepted, str):
+                accepted = [accepted]
+            parts.append(self._any_of(facet, [_facet_value(v) for v in accepted]))
+        if years is not None:
+            parts.append(self._year_range(*years))
+        if not parts:
+            return None
+        return np.bitwise_and.reduce(parts, axis=0)
+
+    def mask(self, **facets) -> Optional[np.ndarray]:
+        """`bitset(**facets)` unpacked to one bool per record (None when unconstrained)."""
+        bits = self.bitset(**facets)
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=self.size).view(bool)
+
+
+class PrecedentIndex:
+    """
+    Inverted BM25 index over a list of precedent records.
+
+    Postings are stored term-major in CSR form: the documents containing
+    term `t` are `doc_ids[indptr[t]:indptr[t + 1]]`, with their BM25 weights
+    in the matching slice of `weights`. Scoring a query gathers the slices
+    for its terms and sums them per document with `np.bincount`.
+
+    Curated keywords get the same CSR treatment (`keyword_indptr` /
+    `keyword_doc_ids`), addressed by the ids of a KeywordMatcher compiled
+    over every distinct keyword in the corpus.
+
+    `facets` holds the FacetIndex; `top_k` accepts a candidate mask from it
+    and then only scores the surviving records. Very common terms (see
+    DENSE_TERM_MIN_DF) keep a dense weight row in `dense_weights`, so
+    scoring a few candidates never walks their long posting lists.
+
+    `embeddings` (an EmbeddingIndex aligned with `records`, or None) enables
+    `hybrid_top_k`; `graph` is the CitationGraph used by `graph_rerank`.
+    """
+
+    FIELDS = ("name", "summary", "keywords")
+
+    def __init__(self, records, k1: float = BM25_K1, b: float = BM25_B):
+        self.records = records
+        self.vocabulary = {}
+        # One decode of every field the BM25, facet and graph builders read
+        fields = dict.fromkeys(self.FIELDS + FacetIndex.FIELDS + CitationGraph.FIELDS)
+        columns = record_columns(records, list(fields))
+
+        term_ids, doc_ids, tfs = [], [], []
+        doc_lengths = np.zeros(len(records), dtype=np.float32)
+        documents = zip(columns["name"], columns["summary"], columns["keywords"])
+        for doc, (name, summary, keywords) in enumerate(documents):
+            counts = Counter(_tokens_of(name, summary, keywords))
+            doc_lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf = np.asarray(tfs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.indptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        n = max(len(records), 1)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = float(doc_lengths.mean()) if len(records) else 1.0
+        norm = k1 * (1 - b + b * doc_lengths[self.doc_ids] / max(avg_len, 1e-9))
+        self.weights = np.repeat(idf, df) * tf * (k1 + 1) / (tf + norm)
+        # Relevance floor for records without a keyword hit (see MIN_TERM_MATCHES)
+        self.min_bm25 = MIN_TERM_MATCHES * float(np.median(self.weights)) if len(self.weights) else 0.0
+
+        dense = np.flatnonzero(df >= max(DENSE_TERM_MIN_DF * len(records), 1))
+        self.dense_rows = {int(term): row for row, term in enumerate(dense)}
+        self.dense_weights = np.zeros((len(dense), len(records)), dtype=np.float32)
+        for row, term in enumerate(dense):
+            start, end = self.indptr[term], self.indptr[term + 1]
+            self.dense_weights[row, self.doc_ids[start:end]] = self.weights[start:end]
+
+        self.keyword_matcher = KeywordMatcher(kw for kws in columns["keywords"] for kw in kws or ())
+        keyword_ids = {kw: i for i, kw in enumerate(self.keyword_matcher.patterns)}
+        kw_pairs = sorted({(keyword_ids[kw.lower()], doc)
+                           for doc, kws in enumerate(columns["keywords"]) for kw in kws or () if kw})
+        kw_terms = np.asarray([t for t, _ in kw_pairs], dtype=np.int64)
+        self.keyword_doc_ids = np.asarray([d for _, d in kw_pairs], dtype=np.int32)
+        self.keyword_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(kw_terms, minlength=len(keyword_ids))))
+        ).astype(np.int64)
+
+        self.facets = FacetIndex(records, columns)
+        self.graph = CitationGraph(records, columns)
+        self.embeddings: Optional[EmbeddingIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @cached_property
+    def version(self) -> str:
+        """Corpus version: the corpus file's digest, or the records' content hash."""
+        return getattr(self.records, "digest", None) or corpus_digest(self.records)
+
+    def _accumulate(self, indptr, doc_ids, terms, weights=None, candidates=None) -> np.ndarray:
+        """
+        Sum the CSR rows `terms` into one value per record, or, given the
+        sorted record indices `candidates`, one value per candidate.
+        """
+        if candidates is None:
+            starts, ends = indptr[terms], indptr[terms + 1]
+            lengths = ends - starts
+            # Flattened posting positions for all query terms, without a Python loop
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            positions = offsets + np.arange(lengths.sum())
+            return np.bincount(doc_ids[positions],
+                               weights=None if weights is None else weights[positions],
+                               minlength=len(self.records)).astype(np.float32)
+
+        totals = np.zeros(len(candidates), dtype=np.float32)
+        if not len(candidates):
+            return totals
+        # Record index -> position in `candidates` (-1 elsewhere)
+        slots = np.full(len(self.records), -1, dtype=np.int32)
+        slots[candidates] = np.arange(len(candidates), dtype=np.int32)
+        for term in terms.tolist():
+            if weights is self.weights and term in self.dense_rows:
+                totals += self.dense_weights[self.dense_rows[term], candidates]
+                continue
+            start, end = indptr[term], indptr[term + 1]
+            targets = slots[doc_ids[start:end]]
+            hit = np.flatnonzero(targets >= 0)
+            totals[targets[hit]] += 1 if weights is None else weights[start + hit]
+        return totals
+
+    def _query_terms(self, text: str) -> np.ndarray:
+        ids = {self.vocabulary[t] for t in tokenize(text) if t in self.vocabulary}
+        return np.fromiter(ids, dtype=np.int64, count=len(ids))
+
+    def bm25(self, text: str, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 score of every record (or of each of `candidates`) against `text`."""
+        terms = self._query_terms(text)
+        if not len(terms):
+            return np.zeros(len(self.records) if candidates is None else len(candidates), dtype=np.float32)
+        return self._accumulate(self.indptr, self.doc_ids, terms, self.weights, candidates)
+
+    def keyword_hits(self, text: str, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Number of each record's keywords found verbatim (word-bounded) in `text`."""
+        ids = self.keyword_matcher.find_ids(text)
+        if not ids:
+            return np.zeros(len(self.records) if candidates is None else len(candidates), dtype=np.float32)
+        terms = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        return self._accumulate(self.keyword_indptr, self.keyword_doc_ids, terms, None, candidates)
+
+    def score(self, text: str, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Ranking score: BM25 plus KEYWORD_MATCH_WEIGHT per exact keyword phrase.
+
+        Records with no keyword hit and a BM25 score below `min_bm25` (a
+        shared common word or two) score 0, so they are never ranked.
+        """
+        bm25 = self.bm25(text, candidates)
+        hits = self.keyword_hits(text, candidates)
+        scores = bm25 + KEYWORD_MATCH_WEIGHT * hits
+        scores[(hits == 0) & (bm25 < self.min_bm25)] = 0
+        return scores
+
+    def top_k(self, text: str, k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Best `k` (record index, score) pairs with a positive score, best first.
+
+        `mask` (one bool per record, see FacetIndex.mask) restricts ranking
+        to the candidate records; only those are scored.
+        """
+        candidates = None if mask is None else np.flatnonzero(mask)
+        return self._best(self.score(text, candidates), k, candidates)
+
+    def hybrid_top_k(self, text: str, query_vector: np.ndarray, k: int, mask: Optional[np.ndarray] = None,
+                     semantic_weight: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Best `k` (record index, score) pairs by keyword and semantic relevance.
+
+        score = (1 - w) * score / best score + w * max(cosine, 0), computed
+        exactly over the `mask` candidates, or, unfiltered, over the union of
+        the best k * HYBRID_POOL records of each ranker (IVF-probed when the
+        embeddings are partitioned).
+        """
+        w = PrecedentConfig.SEMANTIC_WEIGHT if semantic_weight is None else semantic_weight
+        if mask is not None:
+            pool = np.flatnonzero(mask)
+        else:
+            lexical = [i for i, _ in self.top_k(text, k * HYBRID_POOL)]
+            semantic, _ = self.embeddings.search(query_vector, k * HYBRID_POOL)
+            pool = np.union1d(np.asarray(lexical, dtype=np.int64), semantic)
+        if not len(pool):
+            return []
+        lexical = self.score(text, pool)
+        peak = float(lexical.max())
+        if peak > 0:
+            lexical /= peak
+        semantic = np.maximum(self.embeddings.scores(query_vector, pool), 0)
+        return self._best((1 - w) * lexical + w * semantic, k, pool)
+
+    def graph_rerank(self, ranked: List[Tuple[int, float]], k: int, mask: Optional[np.ndarray] = None,
+                     graph_weight: Optional[float] = None,
+                     relevant: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Re-rank (record index, score) matches by their citation neighbourhood.
+
+        Personalized PageRank seeded on the matches (weighted by score) adds
+        records one or two citation links away; the result is
+        (1 - w) * score / best score + w * PageRank / best PageRank, times
+        OVERRULED_PENALTY for overruled records. Records outside `mask`, or
+        outside `relevant` (one bool per record: records with a score of
+        their own for the query), are never added.
+        """
+        w = PrecedentConfig.GRAPH_WEIGHT if graph_weight is None else graph_weight
+        if not ranked or (not self.graph.edge_count and not self.graph.overruled.any()):
+            return ranked[:k]
+        seeds = np.asarray([i for i, _ in ranked], dtype=np.int64)
+        base = np.asarray([score for _, score in ranked], dtype=np.float64)
+        base /= max(base.max(), 1e-12)
+
+        ids, ppr = self.graph.personalized_pagerank(seeds, base)
+        for allowed in (mask, relevant):
+            if allowed is not None:
+                keep = allowed[ids]
+                ids, ppr = ids[keep], ppr[keep]
+        pool = np.union1d(seeds, ids)
+        scores = np.zeros(len(pool))
+        scores[np.searchsorted(pool, seeds)] = (1 - w) * base
+        if len(ppr):
+            scores[np.searchsorted(pool, ids)] += w * ppr / max(float(ppr.max()), 1e-12)
+        scores[self.graph.overruled[pool]] *= OVERRULED_PENALTY
+        return self._best(scores.astype(np.float32), k, pool)
+
+    def related(self, record: dict, hops: int = 1) -> list:
+        """Records within `hops` citation links of `record` (matched by citation or name)."""
+        doc = self.graph.resolve(record.get("citation") or record.get("name") or "")
+        if doc is None:
+            return []
+        return [self.records[i] for i in self.graph.expand([doc], hops)]
+
+    @staticmethod
+    def _best(scores: np.ndarray, k: int, candidates: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        """Top `k` positive entries of `scores` (indexed by `candidates` when given)."""
+        k = min(k, int(np.count_nonzero(scores > 0)))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        # Highest score first; ties keep corpus order
+        best = best[np.lexsort((best, -scores[best]))]
+        docs = best if candidates is None else candidates[best]
+        return [(int(d), float(scores[i])) for d, i in zip(docs, best)]
+
+    def search(self, text: str, k: int, mask: Optional[np.ndarray] = None) -> list:
+        return [self.records[i] for i, _ in self.top_k(text, k, mask)]
+
+
+_index: Optional[PrecedentIndex] = None
+_index_lock = threading.Lock()
+# Serializes index builds, so concurrent first requests build the index once
+_index_build_lock = threading.RLock()
+
+# LRU of query embeddings: (facts hash, model) -> vector
+_query_vectors: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
+
+class PrecedentMemo:
+    """
+    Bounded LRU of precedent lookups.
+
+    Each entry holds the ranked precedents for one lookup key and, once
+    requested, their strategy markdown. Keys include the corpus version, and
+    the memo is cleared whenever a corpus is loaded.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[list]:
+        """The [precedents, markdown or None] entry for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        metrics.inc("precedent_memo_total", result="miss" if entry is None else "hit")
+        return entry
+
+    def put(self, key: tuple, precedents: list) -> list:
+        entry = [precedents, None]
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+_memo = PrecedentMemo(PrecedentConfig.MEMO_SIZE)
+
+
+def load_corpus(path=None, embeddings_path=None) -> PrecedentIndex:
+    """
+    Switch matching to a new corpus and index it.
+
+    Args:
+        path: Corpus file written by precedent_corpus.write_corpus, or None
+            for the built-in PRECEDENTS list.
+        embeddings_path: Optional embeddings for that corpus (written by
+            embeddings.write_embeddings); enables hybrid ranking.
+
+    Returns:
+        The new index (its `records` is the corpus).
+
+    Raises:
+        EmbeddingFormatError: The embeddings belong to a different corpus.
+    """
+    global _index
+    with _index_build_lock:
+        records = PRECEDENTS if path is None else PrecedentCorpus(path)
+        index = PrecedentIndex(records)
+        if embeddings_path is not None:
+            index.embeddings = EmbeddingIndex.load(
+                embeddings_path, count=len(records),
+                digest=index.version,
+                n_lists=PrecedentConfig.IVF_LISTS, n_probe=PrecedentConfig.IVF_PROBES,
+            )
+        with _index_lock:
+            _index = index
+        _memo.clear()
+    return index
+
+
+def get_index() -> PrecedentIndex:
+    """
+    Index over the active corpus (PrecedentConfig.CORPUS_PATH or PRECEDENTS),
+    built on first use. Concurrent first callers wait for a single build.
+    """
+    with _index_lock:
+        index = _index
+    if index is not None:
+        return index
+    with _index_build_lock:
+        with _index_lock:
+            index = _index
+        if index is not None:
+            return index
+        return load_corpus(PrecedentConfig.CORPUS_PATH, PrecedentConfig.EMBEDDINGS_PATH)
+
+
+def get_corpus():
+    """The active corpus: a list of dicts or a memory-mapped PrecedentCorpus."""
+    return get_index().records
+
+
+def _normalized_facts(case_facts: dict) -> dict:
+    return {str(k): " ".join(str(v).lower().split()) for k, v in case_facts.items() if v}
+
+
+def facts_hash(case_facts: dict) -> str:
+    """Stable hash of the case facts, ignoring key order, case, whitespace and empty fields."""
+    payload = json.dumps(_normalized_facts(case_facts), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _facts_text(case_facts: dict) -> str:
+    facts = _normalized_facts(case_facts)
+    return " ".join(facts[k] for k in sorted(facts))
+
+
+def query_vector(case_facts: dict, index: Optional[PrecedentIndex] = None) -> np.ndarray:
+    """Embedding of the case facts, cached per facts hash (PrecedentConfig.QUERY_EMBEDDING_CACHE_SIZE)."""
+    index = index or get_index()
+    key = (facts_hash(case_facts), index.embeddings.model)
+    with _query_vectors_lock:
+        vector = _query_vectors.get(key)
+        if vector is not None:
+            _query_vectors.move_to_end(key)
+    metrics.inc("precedent_query_embedding_cache_total", result="miss" if vector is None else "hit")
+    if vector is None:
+        vector = index.embeddings.embed([_facts_text(case_facts)])[0]
+        with _query_vectors_lock:
+            _query_vectors[key] = vector
+            while len(_query_vectors) > PrecedentConfig.QUERY_EMBEDDING_CACHE_SIZE:
+                _query_vectors.popitem(last=False)
+    return vector
+
+
+def facet_filters(case_facts: dict, index: Optional[PrecedentIndex] = None) -> dict:
+    """
+    Hard facet constraints implied by the case facts.
+
+    jurisdiction / state: federal precedents plus those of the US state it
+    names ("San Francisco, California" -> california, see state_of);
+    records without a known jurisdiction are always kept. A place that
+    names no state adds no constraint.
+
+    The case type is not a filter: see preferred_categories.
+    """
+    filters = {}
+    place = case_facts.get("jurisdiction") or case_facts.get("state")
+    state = state_of(place) if place else None
+    if state:
+        filters["jurisdiction"] = sorted({FEDERAL, "", state})
+    return filters
+
+
+def preferred_categories(case_facts: dict, index: Optional[PrecedentIndex] = None) -> List[str]:
+    """
+    Corpus categories matching the case type, in either direction of the
+    hierarchy: "discrimination" matches discrimination, age_discrimination
+    and wage_discrimination; "age discrimination" matches age_discrimination
+    and discrimination.
+    """
+    case_type = _facet_value(case_facts.get("case_type") or "")
+    if not case_type:
+        return []
+    index = index or get_index()
+    return [c for c in index.facets.values("category")
+            if c and (c in case_type or c.endswith(f"_{case_type}"))]
+
+
+def related_precedents(precedent: dict, hops: int = 1) -> list:
+    """Precedents citing or cited by `precedent`, up to `hops` links away."""
+    return get_index().related(precedent, hops)
+
+
+def _memo_key(case_facts: dict, max_results: int, index: PrecedentIndex) -> tuple:
+    # Ranking settings are part of the key so changing them never serves stale results
+    return (facts_hash(case_facts), index.version, max_results,
+            PrecedentConfig.SEMANTIC_WEIGHT, PrecedentConfig.GRAPH_WEIGHT)
+
+
+def _memo_entry(case_facts: dict, max_results: int) -> list:
+    index = get_index()
+    key = _memo_key(case_facts, max_results, index)
+    entry = _memo.get(key)
+    if entry is None:
+        entry = _memo.put(key, _rank_precedents(case_facts, max_results, index))
+    return entry
+
+
 def find_relevant_precedents(case_facts: dict, max_results: int = 3) -> list:
     """
     Find relevant precedents based on case facts.
-    Uses keyword matching (can be upgraded to embeddings later).
+    Results are memoized per normalized facts (see facts_hash) and corpus
+    version, so repeated calls across refinement iterations and debate
+    rounds skip ranking.
     """
     if not case_facts:
         return []
-    
-    # Extract keywords from case facts
-    facts_text = " ".join([
-        str(v).lower() for v in case_facts.values() if v
-    ])
-    
-    # Score each precedent
-    scored = []
-    for p in PRECEDENTS:
-        score = 0
-        for kw in p["keywords"]:
-            if kw in facts_text:
-                score += 1
-        if score > 0:
-            scored.append((score, p))
-    
-    # Sort by score and return top matches
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [p for _, p in scored[:max_results]]
+    return list(_memo_entry(case_facts, max_results)[0])
+
+
+def precedents_for_strategy(case_facts: dict, max_results: int = 3) -> str:
+    """Markdown of the relevant precedents (format_precedents_for_strategy), memoized with the ranking."""
+    if not case_facts:
+        return ""
+    entry = _memo_entry(case_facts, max_results)
+    if entry[1] is None:
+        entry[1] = format_precedents_for_strategy(entry[0])
+    return entry[1]
+
+
+def precedent_memo_stats() -> dict:
+    """Hits, misses, hit rate and size of the precedent memo."""
+    return _memo.stats()
+
+
+def _rank_precedents(case_facts: dict, max_results: int, index: PrecedentIndex) -> list:
+    """
+    Rank the corpus for the case facts (uncached).
+    Prunes it to the jurisdiction implied by the facts (see facet_filters),
+    then ranks the candidates with BM25 over name, summary and keywords,
+    blended with embedding similarity when the corpus has embeddings and
+    PrecedentConfig.SEMANTIC_WEIGHT > 0. Matches in a category of the case
+    type (see preferred_categories) get CATEGORY_BOOST, which breaks close
+    calls without overriding what the facts describe. The best matches are
+    then re-ranked by their citation neighbourhood (see graph_rerank); only
+    records that match the facts themselves are added from it, so a
+    precedent is never returned just for being cited by one that matched.
+    """
+    text = _facts_text(case_facts)
+    mask = index.facets.mask(**facet_filters(case_facts, index))
+    seeds = max(max_results, GRAPH_SEEDS)
+    if index.embeddings is not None and PrecedentConfig.SEMANTIC_WEIGHT > 0:
+        ranked = index.hybrid_top_k(text, query_vector(case_facts, index), seeds, mask)
+    else:
+        ranked = index.top_k(text, seeds, mask)
+
+    preferred = preferred_categories(case_facts, index)
+    if preferred and ranked:
+        boosted = index.facets.mask(category=preferred)
+        ranked = sorted(((i, s * (1 + CATEGORY_BOOST) if boosted[i] else s) for i, s in ranked),
+                        key=lambda pair: (-pair[1], pair[0]))
+    relevant = index.score(text) > 0 if ranked else None
+    ranked = index.graph_rerank(ranked, max_results, mask, relevant=relevant)
+    return [index.records[i] for i, _ in ranked]
 
 
 def format_precedents_for_strategy(precedents: list) -> str:
@@ -166,5 +1118,7 @@ def format_precedents_for_strategy(precedents: list) -> str:
         lines.append(f"### {p['name']}")
         lines.append(f"**{p['citation']}**\n")
         lines.append(f"{p['summary']}\n")
+        if p.get("overruled_by"):
+            lines.append(f"*Overruled by: {', '.join(p['overruled_by'])}*\n")
     
     return "\n".join(lines)
@@ -0,0 +1,257 @@
+"""
+CASE FILE STORAGE - JurisLink
+Sharded, content-addressed storage for user case files.
+
+Layout under frontend_portal/public/users/:
+    {shard}/{user_id}/cases/{case_id}/manifest.json   Per-case manifest
+    {shard}/{user_id}/cases/{case_id}/{name}          Hard link to the blob
+    _blobs/{aa}/{bb}/{sha256}                         Content-addressed blobs
+
+Each blob is stored once no matter how many cases contain identical bytes.
+Case files are hard links to their blob, so the filesystem link count is the
+reference count: deleting a case folder (e.g. Ghost Protocol's rmtree)
+releases its references without extra bookkeeping; `release_blobs` then
+drops the blobs that folder referenced once nothing links to them, and
+`collect_garbage` sweeps the whole blob store for any left over. On filesystems without hard
+link support the file is copied instead (correct, but not deduplicated).
+
+Usage:
+    from shared_lib.storage import put_case_file, get_case_file_path
+    path = put_case_file(user_id, case_id, "case_brief.pdf", pdf_bytes)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from shared_lib import utils
+from shared_lib.utils import get_secure_storage_path, invalidate_storage_cache
+
+BLOBS_DIR_NAME = "_blobs"
+MANIFEST_FILENAME = "manifest.json"
+
+_manifest_lock = threading.Lock()
+_write_listeners = []  # Callables notified with the path of every stored case file
+
+
+def add_write_listener(callback) -> None:
+    """Register `callback(path)` to run after each successful put_case_file."""
+    if callback not in _write_listeners:
+        _write_listeners.append(callback)
+
+
+def get_blobs_dir() -> Path:
+    return utils.STATIC_DIR / utils.USERS_DIR_NAME / BLOBS_DIR_NAME
+
+
+def blob_path(digest: str) -> Path:
+    """Content-addressed path for a sha256 hex digest (two-level fan-out)."""
+    return get_blobs_dir() / digest[:2] / digest[2:4] / digest
+
+
+def blob_refcount(digest: str) -> int:
+    """Number of case files referencing a blob (0 if only the store holds it)."""
+    try:
+        return blob_path(digest).stat().st_nlink - 1
+    except FileNotFoundError:
+        return 0
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _ensure_blob(digest: str, data: bytes) -> Path:
+    path = blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, data)
+    return path
+
+
+def _link_into(blob: Path, target: Path) -> None:
+    """Atomically point `target` at `blob` (hard link, copy as fallback)."""
+    if target.exists():
+        try:
+            if os.path.samefile(blob, target):
+                return
+        except OSError:
+            pass
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.link(blob, tmp)
+    except FileNotFoundError:
+        raise  # Missing blob or folder: caller rebuilds and retries
+    except OSError:
+        shutil.copyfile(blob, tmp)  # No hard link support (e.g. some network shares)
+    os.replace(tmp, target)
+
+
+# =============================================================================
+# MANIFEST
+# =============================================================================
+
+def read_manifest(user_id: str, case_id: str) -> dict:
+    """Return the case manifest ({name: entry}), or {} if none exists."""
+    path = get_secure_storage_path(user_id, case_id, create=False) / MANIFEST_FILENAME
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_manifest(case_dir: Path, name: str, entry: Optional[dict]) -> None:
+    path = case_dir / MANIFEST_FILENAME
+    with _manifest_lock:
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+        if entry is None:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = entry
+        _atomic_write(path, json.dumps(manifest, sort_keys=True).encode("utf-8"))
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+def put_case_file(user_id: str, case_id: str, name: str, data: bytes, **meta) -> Path:
+    """
+    Store `data` as case file `name`, deduplicated by content.
+
+    Args:
+        name: File name inside the case folder (no path separators).
+        **meta: Extra JSON-serializable fields recorded in the manifest entry.
+
+    Returns:
+        Path of the case file (a hard link to the shared blob).
+    """
+    if not name or "/" in name or "\\" in name or name.startswith("."):
+        raise ValueError(f"Security Error: invalid case file name {name!r}")
+
+    digest = hashlib.sha256(data).hexdigest()
+    case_dir = get_secure_storage_path(user_id, case_id)
+    target = case_dir / name
+
+    # Drop the old entry first so a crash mid-replace never leaves stale metadata
+    if name in read_manifest(user_id, case_id):
+        _update_manifest(case_dir, name, None)
+
+    for attempt in range(2):
+        try:
+            _link_into(_ensure_blob(digest, data), target)
+            break
+        except FileNotFoundError:
+            # Blob collected or case folder deleted since it was cached; rebuild once
+            if attempt:
+                raise
+            invalidate_storage_cache()
+            case_dir = get_secure_storage_path(user_id, case_id)
+
+    _update_manifest(case_dir, name, {"sha256": digest, "size": len(data), "stored_at": time.time(), **meta})
+    for callback in _write_listeners:
+        try:
+            callback(target)
+        except Exception as e:
+            logging.warning(f"[Storage] Write listener failed for {name}: {e}")
+    return target
+
+
+def get_case_file_path(user_id: str, case_id: str, name: str) -> Optional[Path]:
+    """Path of an existing case file, or None (never creates directories)."""
+    path = get_secure_storage_path(user_id, case_id, create=False) / name
+    return path if path.exists() else None
+
+
+def delete_case_file(user_id: str, case_id: str, name: str) -> bool:
+    """Remove a case file and its manifest entry; frees the blob if unreferenced."""
+    case_dir = get_secure_storage_path(user_id, case_id, create=False)
+    path = case_dir / name
+    entry = read_manifest(user_id, case_id).get(name)
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return False
+    if entry:
+        _update_manifest(case_dir, name, None)
+        if blob_refcount(entry["sha256"]) == 0:
+            blob_path(entry["sha256"]).unlink(missing_ok=True)
+    return True
+
+
+def manifest_digests(user_dir: Path) -> set:
+    """Blob digests referenced by the case manifests under a user folder."""
+    digests = set()
+    for path in Path(user_dir).glob(f"cases/*/{MANIFEST_FILENAME}"):
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        digests.update(entry["sha256"] for entry in manifest.values() if entry.get("sha256"))
+    return digests
+
+
+def release_blobs(digests) -> dict:
+    """
+    Delete the given blobs if no case file links to them any more.
+
+    Checks only those blobs (blob_refcount), unlike collect_garbage, which
+    scans the whole blob store.
+
+    Returns:
+        {'scanned': N, 'deleted': N, 'bytes_freed': N}
+    """
+    stats = {"scanned": 0, "deleted": 0, "bytes_freed": 0}
+    for digest in digests:
+        stats["scanned"] += 1
+        if blob_refcount(digest) != 0:
+            continue
+        path = blob_path(digest)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logging.warning(f"[Storage] Could not release blob {digest}: {e}")
+            continue
+        stats["deleted"] += 1
+        stats["bytes_freed"] += size
+    return stats
+
+
+def collect_garbage() -> dict:
+    """
+    Delete blobs no case file links to (link count 1).
+
+    Returns:
+        {'scanned': N, 'deleted': N, 'bytes_freed': N}
+    """
+    stats = {"scanned": 0, "deleted": 0, "bytes_freed": 0}
+    blobs_dir = get_blobs_dir()
+    if not blobs_dir.exists():
+        return stats
+    for blob in blobs_dir.glob("*/*/*"):
+        stats["scanned"] += 1
+        try:
+            st = blob.stat()
+            if st.st_nlink <= 1 and not blob.name.startswith("."):
+                blob.unlink()
+                stats["deleted"] += 1
+                stats["bytes_freed"] += st.st_size
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logging.warning(f"[Storage] Could not collect blob {blob.name}: {e}")
+    return stats
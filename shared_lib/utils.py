@@ -3,6 +3,11 @@ SHARED UTILITIES - JurisLink
 Centralized utility functions for security and path management.
 """
 import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 
 # Static files directory - served by the frontend
@@ -13,14 +18,64 @@ PROJECT_ROOT = CURRENT_DIR.parent
 STATIC_DIR = PROJECT_ROOT / "frontend_portal" / "public"
 USERS_DIR_NAME = "users"
 
-def get_secure_storage_path(user_id: str, case_id: str) -> Path:
+# User folders are sharded by a hash prefix of the user_id so no directory
+# grows with the user count: users/{shard}/{user_id}/cases/{case_id}
+SHARD_CHARS = 2  # 256 shards
+
+# Compiled ID validator: alphanumerics plus hyphens/underscores
+_VALID_ID = re.compile(r"[\w-]+")
+_PROHIBITED = ('/', '\\', '..')
+
+# Directories already created by this process (bounded, insertion-ordered)
+CREATED_DIRS_CACHE_SIZE = 4096
+_created_dirs: "OrderedDict[Path, None]" = OrderedDict()
+_created_dirs_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def _resolve_storage_path(static_dir: Path, user_id: str, case_id: str) -> Path:
+    """Validate IDs and build the storage path (pure; failures are not cached)."""
+    if not user_id or not case_id:
+        raise ValueError("Security Error: user_id and case_id are required.")
+
+    # 1. STRICT VALIDATION (Reject don't sanitize)
+    # Prevent Path Traversal: reject if containing path separators or parent reference
+    for prohibited in _PROHIBITED:
+        if prohibited in user_id or prohibited in case_id:
+            raise ValueError(f"Security Warning: malicious characters detected in ID. Access denied.")
+            
+    # 2. ALPHANUMERIC CHECK (Allow hyphens/underscores)
+    # This ensures "user-123" works but "../../etc" fails
+    if not _VALID_ID.fullmatch(user_id) or not _VALID_ID.fullmatch(case_id):
+        raise ValueError("Security Error: IDs must be alphanumeric (hyphens/underscores allowed).")
+    
+    # 3. CONSTRUCT PATH
+    return static_dir / USERS_DIR_NAME / shard_for(user_id) / user_id / "cases" / case_id
+
+
+def shard_for(user_id: str) -> str:
+    """Stable shard directory name for a user (hex prefix of sha256(user_id))."""
+    return hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:SHARD_CHARS]
+
+
+def is_shard_name(name: str) -> bool:
+    """True if a directory name under users/ is a shard (not a legacy user folder)."""
+    return len(name) == SHARD_CHARS and all(c in "0123456789abcdef" for c in name)
+
+
+def get_secure_storage_path(user_id: str, case_id: str, create: bool = True) -> Path:
     """
     Generates a secure, nested storage path:
-    frontend_portal/public/users/{user_id}/cases/{case_id}/
+    frontend_portal/public/users/{shard}/{user_id}/cases/{case_id}/
+    
+    Validation results and created directories are cached per process, so
+    repeat calls cost a dict lookup. Pass create=False for read-only lookups
+    (existence checks, deletes), which never touch the filesystem.
     
     Args:
         user_id: ID of the user (must be alphanumeric)
         case_id: ID of the case (must be alphanumeric)
+        create: Ensure the directory exists (cached after the first mkdir).
         
     Returns:
         Path object to the secure directory.
@@ -28,28 +83,28 @@ def get_secure_storage_path(user_id: str, case_id: str) -> Path:
     Raises:
         ValueError: If inputs are invalid, missing, or contain malicious characters.
     """
-    if not user_id or not case_id:
+    if not isinstance(user_id, str) or not isinstance(case_id, str):
         raise ValueError("Security Error: user_id and case_id are required.")
 
-    # 1. STRICT VALIDATION (Reject don't sanitize)
-    # Prevent Path Traversal: reject if containing path separators or parent reference
-    prohibited_chars = ['/', '\\', '..']
+    target_path = _resolve_storage_path(STATIC_DIR, user_id, case_id)
     
-    for prohibited in prohibited_chars:
-        if prohibited in user_id or prohibited in case_id:
-            raise ValueError(f"Security Warning: malicious characters detected in ID. Access denied.")
-            
-    # 2. ALPHANUMERIC CHECK (Allow hyphens/underscores)
-    # This ensures "user-123" works but "../../etc" fails
-    valid_pattern = lambda s: all(c.isalnum() or c in ('-', '_') for c in s)
-    
-    if not valid_pattern(user_id) or not valid_pattern(case_id):
-        raise ValueError("Security Error: IDs must be alphanumeric (hyphens/underscores allowed).")
-    
-    # 3. CONSTRUCT PATH
-    target_path = STATIC_DIR / USERS_DIR_NAME / user_id / "cases" / case_id
-    
-    # Ensure directory exists
-    target_path.mkdir(parents=True, exist_ok=True)
+    if create and target_path not in _created_dirs:
+        # Ensure directory exists
+        target_path.mkdir(parents=True, exist_ok=True)
+        with _created_dirs_lock:
+            _created_dirs[target_path] = None
+            while len(_created_dirs) > CREATED_DIRS_CACHE_SIZE:
+                _created_dirs.popitem(last=False)
     
     return target_path
+
+
+def invalidate_storage_cache() -> None:
+    """
+    Forget which storage directories exist.
+
+    Call after deleting user data (e.g. Ghost Protocol) so the next
+    creating lookup re-runs mkdir.
+    """
+    with _created_dirs_lock:
+        _created_dirs.clear()
@@ -2,13 +2,20 @@
 Tests for the AgenticSimLaw Adversarial Debate Protocol.
 
 Validates the 7-turn debate protocol, KS convergence detection,
-risk score extraction, and debate result construction.
+risk score extraction, debate result construction, the asyncio debate
+engine (speculative critic start, background round emission, timings),
+parallel debate branches, termination policies and history compaction.
 
 Run with: pytest tests/test_adversarial_debate.py -v
 """
+import asyncio
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -18,10 +25,28 @@ from shared_lib.debate import (
     compute_ks_statistic,
     extract_risk_score,
     create_debate_result,
+    run_debate,
+    run_debate_async,
+    run_debate_branches,
+    BRANCH_GRACE_TURNS,
+    TenantLimiter,
+    TerminationPolicy,
+    AllPolicies,
+    CostBudget,
+    DebateProgress,
+    KSDriftPolicy,
+    KSTestPolicy,
+    MaxTurnsPolicy,
+    TokenBudget,
+    WallClockBudget,
+    ks_two_sample,
+    HistoryCompactor,
+    history_tokens,
     MAX_DEBATE_TURNS,
     MIN_TURNS_BEFORE_KS,
     KS_THRESHOLD,
 )
+from shared_lib.config import DebateConfig
 
 
 # =============================================================================
@@ -203,3 +228,572 @@ class TestConstants:
     def test_ks_threshold(self):
         """KS threshold is 0.15."""
         assert KS_THRESHOLD == 0.15
+
+
+
+# =============================================================================
+# TEST 6: ASYNC DEBATE ENGINE
+# =============================================================================
+
+SENTENCE = "The employer fired the plaintiff two days after the complaint. "
+
+
+def _strategist(chunks_per_round, delay=0.0):
+    """Streams the given chunks (a list per round, reused for later rounds)."""
+    async def strategist(history):
+        for chunk in chunks_per_round[min(len(history), len(chunks_per_round) - 1)]:
+            await asyncio.sleep(delay)
+            yield chunk
+    return strategist
+
+
+class RecordingCritic:
+    """Critic returning scripted risk scores and recording what it saw."""
+
+    def __init__(self, scores, delay=0.0):
+        self.scores = scores
+        self.delay = delay
+        self.arguments = []
+        self.cancelled = 0
+
+    async def __call__(self, argument, history):
+        self.arguments.append(argument)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"Weak causation. Risk: {self.scores[min(len(history), len(self.scores) - 1)]}"
+
+
+class TestAsyncDebateEngine:
+    """Tests for run_debate_async."""
+
+    def test_rounds_until_convergence(self):
+        critic = RecordingCritic([0.7, 0.55, 0.5, 0.9])
+        result = run_debate(_strategist([["Argument one."]]), critic, speculation_min_chars=10_000)
+        assert [r["risk_score"] for r in result["rounds"]] == [0.7, 0.55, 0.5]
+        assert result["converged"] is True and result["convergence_turn"] == 3
+        assert all(r["timing"]["round_ms"] >= r["timing"]["strategist_ms"] for r in result["rounds"])
+
+    def test_max_turns_without_convergence(self):
+        critic = RecordingCritic([0.1, 0.9] * 4)
+        result = run_debate(_strategist([["A."]]), critic, speculation_min_chars=10_000)
+        assert len(result["rounds"]) == MAX_DEBATE_TURNS and result["converged"] is False
+
+    def test_speculative_critic_overlaps_the_stream(self):
+        # Full argument, then only trailing whitespace: the critique stands
+        chunks = [SENTENCE * 8, "\n\n"]
+        critic = RecordingCritic([0.5], delay=0.1)
+        start = time.perf_counter()
+        result = run_debate(_strategist([chunks], delay=0.1), critic, max_turns=1, speculation_min_chars=100)
+        elapsed = time.perf_counter() - start
+        timing = result["rounds"][0]["timing"]
+        assert timing["speculative"] == 1.0 and timing["speculation_cancelled"] == 0.0
+        assert critic.arguments == [SENTENCE * 8]
+        assert result["final_strategy"] == SENTENCE * 8 + "\n\n"
+        assert timing["critic_wait_ms"] < 60
+        assert elapsed < 0.27  # Sequential would be 2 x 100 ms stream + 100 ms critic
+
+    def test_appended_conclusion_reruns_the_critic(self):
+        chunks = [SENTENCE * 8, "We should therefore settle."]
+        critic = RecordingCritic([0.5], delay=0.05)
+        result = run_debate(_strategist([chunks], delay=0.02), critic, max_turns=1, speculation_min_chars=100)
+        timing = result["rounds"][0]["timing"]
+        assert timing["speculation_cancelled"] == 1.0 and timing["speculative"] == 0.0
+        assert critic.arguments == [SENTENCE * 8, "".join(chunks)]
+
+    def test_speculation_tolerance_is_opt_in(self):
+        chunks = [SENTENCE * 8, "Thanks."]
+        critic = RecordingCritic([0.5], delay=0.05)
+        result = run_debate(_strategist([chunks], delay=0.02), critic, max_turns=1, speculation_min_chars=100,
+                            speculation_tolerance=0.1)
+        assert result["rounds"][0]["timing"]["speculative"] == 1.0
+        assert critic.arguments == [SENTENCE * 8]
+
+    def test_speculation_cancelled_when_argument_changes(self):
+        chunks = [SENTENCE * 8, "However, new evidence changes everything. " * 6]
+        critic = RecordingCritic([0.5], delay=0.2)
+        result = run_debate(_strategist([chunks], delay=0.02), critic, max_turns=1, speculation_min_chars=100)
+        timing = result["rounds"][0]["timing"]
+        assert timing["speculation_cancelled"] == 1.0 and timing["speculative"] == 0.0
+        assert critic.cancelled == 1
+        assert critic.arguments == [SENTENCE * 8, "".join(chunks)]
+
+    def test_failed_stream_cancels_speculative_critic(self):
+        async def strategist(history):
+            yield SENTENCE * 8
+            await asyncio.sleep(0.02)
+            raise ConnectionError("LLM stream dropped")
+
+        async def scenario(critic):
+            try:
+                await run_debate_async(strategist, critic, max_turns=1, speculation_min_chars=100)
+            except ConnectionError:
+                pass
+            else:
+                raise AssertionError("expected ConnectionError")
+            # Checked on the still-running loop (asyncio.run would cancel leftovers on exit)
+            return critic.cancelled
+
+        critic = RecordingCritic([0.5], delay=0.2)
+        assert asyncio.run(scenario(critic)) == 1
+        assert critic.arguments == [SENTENCE * 8]
+
+    def test_plain_coroutine_strategist(self):
+        async def strategist(history):
+            return f"Argument {len(history) + 1}."
+        critic = RecordingCritic([0.6, 0.6, 0.6])
+        result = run_debate(strategist, critic, speculation_min_chars=10_000)
+        assert result["final_strategy"] == "Argument 3."
+
+    def test_emission_overlaps_next_round_in_order(self):
+        emitted = []
+
+        async def on_round(debate_round):
+            await asyncio.sleep(0.05)
+            emitted.append(debate_round["turn_number"])
+
+        critic = RecordingCritic([0.1, 0.9, 0.1, 0.9], delay=0.05)
+        start = time.perf_counter()
+        result = asyncio.run(run_debate_async(
+            _strategist([["A."]]), critic, on_round=on_round, max_turns=4, speculation_min_chars=10_000,
+        ))
+        elapsed = time.perf_counter() - start
+        assert emitted == [1, 2, 3, 4] and len(result["rounds"]) == 4
+        assert elapsed < 0.35  # Serial persistence would take 4 x (50 + 50) ms
+
+    def test_emission_errors_do_not_abort_the_debate(self):
+        async def on_round(debate_round):
+            raise RuntimeError("SSE client gone")
+
+        critic = RecordingCritic([0.1, 0.9])
+        result = run_debate(_strategist([["A."]]), critic, on_round=on_round, max_turns=2,
+                            speculation_min_chars=10_000)
+        assert len(result["rounds"]) == 2
+
+
+# =============================================================================
+# TEST 7: PARALLEL BRANCHES
+# =============================================================================
+
+class ConcurrencyProbe:
+    """Critic wrapper tracking how many critic calls are in flight at once."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    def wrap(self, critic):
+        async def probed(argument, history):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                return await critic(argument, history)
+            finally:
+                self.active -= 1
+        return probed
+
+
+def _branches(*critics, **kwargs):
+    kwargs.setdefault("speculation_min_chars", 10_000)
+    kwargs.setdefault("tenant", "test")
+    return run_debate_branches(_strategist([["Argument."]]), list(critics), **kwargs)
+
+
+class TestParallelBranches:
+    """Tests for run_debate_branches."""
+
+    def test_selects_lowest_risk_converged_branch(self):
+        result = _branches(
+            RecordingCritic([0.7, 0.6, 0.6]),
+            RecordingCritic([0.4, 0.3, 0.3]),
+            RecordingCritic([0.1, 0.9] * 4),
+        )
+        assert result["branch"] == 1
+        assert result["converged"] is True and result["final_risk_score"] == 0.3
+        outcomes = [b["outcome"] for b in result["branches"]]
+        assert outcomes == ["converged", "converged", "diverging"]
+        assert result["branches"][2]["turns"] == MIN_TURNS_BEFORE_KS
+
+    def test_dominated_branch_pruned(self):
+        result = _branches(
+            RecordingCritic([0.3, 0.3, 0.3]),
+            RecordingCritic([0.5, 0.8, 0.6, 0.55, 0.5], delay=0.01),
+        )
+        assert result["branch"] == 0
+        assert result["branches"][1]["outcome"] == "dominated"
+        assert result["branches"][1]["turns"] == MIN_TURNS_BEFORE_KS
+
+    def test_stragglers_stop_after_grace_turns(self):
+        result = _branches(
+            RecordingCritic([0.9, 0.3, 0.3]),
+            RecordingCritic([0.25, 0.05] * 4, delay=0.01),
+        )
+        straggler = result["branches"][1]
+        assert straggler["outcome"] == "straggler"
+        assert straggler["turns"] == MIN_TURNS_BEFORE_KS + BRANCH_GRACE_TURNS
+
+    def test_last_branch_never_pruned(self):
+        result = _branches(RecordingCritic([0.1, 0.9] * 4), RecordingCritic([0.9, 0.1] * 4), max_turns=5)
+        assert [b["outcome"] for b in result["branches"]] == ["diverging", "exhausted"]
+        assert result["branch"] == 1 and len(result["rounds"]) == 5
+
+    def test_branches_run_concurrently_within_tenant_limit(self):
+        probe = ConcurrencyProbe()
+        critics = [probe.wrap(RecordingCritic([0.5], delay=0.05)) for _ in range(3)]
+        start = time.perf_counter()
+        result = _branches(*critics, tenant="wide", max_concurrency=3)
+        elapsed = time.perf_counter() - start
+        assert probe.peak == 3
+        assert all(b["outcome"] == "converged" for b in result["branches"])
+        assert elapsed < 0.3  # One branch is 3 x 50 ms; serial branches would be 450 ms
+
+    def test_tenant_limit_bounds_in_flight_rounds(self):
+        probe = ConcurrencyProbe()
+        critics = [probe.wrap(RecordingCritic([0.5], delay=0.01)) for _ in range(3)]
+        result = _branches(*critics, tenant="narrow", max_concurrency=1)
+        assert probe.peak == 1
+        assert result["converged"] is True
+
+    def test_tenant_limit_holds_across_threads(self):
+        # Each blocking call runs its own event loop; the limit must still be process-wide
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        async def critic(argument, history):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return "Risk: 0.5"
+
+        errors = []
+
+        def worker():
+            try:
+                _branches(critic, critic, tenant="threaded", max_concurrency=2)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+        assert state["peak"] == 2
+
+    def test_cancelled_waiter_does_not_leak_a_slot(self):
+        async def scenario():
+            limiter = TenantLimiter(1)
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            limiter.release()
+            await asyncio.gather(waiter, return_exceptions=True)
+            async with limiter:
+                held = limiter.active
+            return held, limiter.active
+
+        assert asyncio.run(scenario()) == (1, 0)
+
+    def test_failed_branch_is_skipped(self):
+        async def broken(argument, history):
+            raise RuntimeError("model unavailable")
+        result = _branches(broken, RecordingCritic([0.4, 0.4, 0.4]))
+        assert result["branch"] == 1
+        assert result["branches"][0]["outcome"] == "failed"
+
+    def test_all_branches_failed_raises(self):
+        async def broken(argument, history):
+            raise RuntimeError("model unavailable")
+        try:
+            _branches(broken, broken)
+        except RuntimeError as e:
+            assert "model unavailable" in str(e)
+        else:
+            raise AssertionError("expected RuntimeError")
+
+    def test_mismatched_agent_count_rejected(self):
+        try:
+            run_debate_branches(_strategist([["A."]]), [RecordingCritic([0.5])] * 2, branches=3)
+        except ValueError as e:
+            assert "3 critic" in str(e)
+        else:
+            raise AssertionError("expected ValueError")
+
+
+# =============================================================================
+# TEST 8: TERMINATION POLICIES
+# =============================================================================
+
+def _progress(scores):
+    return DebateProgress([{"turn_number": i + 1, "risk_score": s} for i, s in enumerate(scores)])
+
+
+class TestKSTwoSample:
+    """Tests for ks_two_sample."""
+
+    def test_identical_samples(self):
+        assert ks_two_sample([0.5, 0.6, 0.7], [0.7, 0.5, 0.6]) == (0.0, 1.0)
+
+    def test_separated_small_samples_exact(self):
+        statistic, p_value = ks_two_sample([0.1, 0.2, 0.3], [0.7, 0.8, 0.9])
+        assert statistic == 1.0
+        assert abs(p_value - 0.1) < 1e-12  # 2 of C(6, 3) orderings
+        statistic, p_value = ks_two_sample([1, 2, 3, 4], [5, 6, 7, 8])
+        assert abs(p_value - 2 / 70) < 1e-12
+
+    def test_partial_overlap(self):
+        statistic, p_value = ks_two_sample([0.1, 0.2, 0.6], [0.3, 0.7, 0.8])
+        assert abs(statistic - 2 / 3) < 1e-12
+        assert abs(p_value - 0.6) < 1e-12
+
+    def test_large_samples_asymptotic(self):
+        same_a = [i / 200 for i in range(0, 200, 2)] * 2
+        same_b = [i / 200 for i in range(1, 200, 2)] * 2
+        assert ks_two_sample(same_a, same_b)[1] > 0.9
+        shifted = [x + 0.5 for x in same_b]
+        assert ks_two_sample(same_a, shifted)[1] < 1e-6
+
+    def test_empty_sample(self):
+        assert ks_two_sample([], [0.5]) == (0.0, 1.0)
+
+
+class TestTerminationPolicies:
+    """Tests for the termination policy framework."""
+
+    def test_ks_drift_matches_check_convergence(self):
+        for scores in ([0.6, 0.55], [0.6, 0.55, 0.52], [0.3, 0.5, 0.8], [0.5, 0.5, 0.5, 0.5]):
+            progress = _progress(scores)
+            assert KSDriftPolicy().triggered(progress) == check_convergence(progress.history)
+
+    def test_ks_test_waits_for_trend_to_stop(self):
+        assert not KSTestPolicy().triggered(_progress([0.9, 0.8, 0.7, 0.6, 0.5, 0.4]))
+        assert KSTestPolicy().triggered(_progress([0.5, 0.6, 0.5, 0.55, 0.5, 0.6]))
+        assert not KSTestPolicy().triggered(_progress([0.5, 0.5, 0.5, 0.5, 0.5]))
+
+    def test_any_reports_first_triggered_policy(self):
+        policy = KSDriftPolicy() | MaxTurnsPolicy(2)
+        assert policy.evaluate(_progress([0.1, 0.9])).name == "max_turns"
+        assert policy.evaluate(_progress([0.5])) is None
+        stop = policy.evaluate(_progress([0.1, 0.9, 0.88]))
+        assert stop.name == "ks_drift" and stop.converged
+
+    def test_all_requires_every_policy(self):
+        policy = KSDriftPolicy() & MaxTurnsPolicy(4)
+        assert policy.evaluate(_progress([0.5, 0.5, 0.5])) is None
+        stop = policy.evaluate(_progress([0.5, 0.5, 0.5, 0.5]))
+        assert stop is policy and stop.converged and stop.name == "ks_drift & max_turns"
+        assert isinstance(policy, AllPolicies)
+
+    def test_policies_must_implement_triggered(self):
+        class Incomplete(TerminationPolicy):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_budgets_project_the_next_round(self):
+        rounds = [{"risk_score": 0.5, "usage": {"prompt_tokens": 300, "completion_tokens": 100},
+                   "timing": {"round_ms": 1000.0}}] * 2
+        progress = DebateProgress(rounds, started=time.perf_counter() - 2.0)
+        assert TokenBudget(1200).triggered(progress) is False
+        assert TokenBudget(1199).triggered(progress) is True
+        assert WallClockBudget(3.5).triggered(progress) is False
+        assert WallClockBudget(2.9).triggered(progress) is True
+        assert CostBudget(1.0).triggered(progress) is False
+        assert CostBudget(progress.cost).triggered(progress) is True
+
+
+class TestPolicyDrivenDebate:
+    """Tests for run_debate with termination policies."""
+
+    def test_default_policy_records_convergence(self):
+        result = run_debate(_strategist([["A."]]), RecordingCritic([0.7, 0.55, 0.5]), speculation_min_chars=10_000)
+        assert result["terminated_by"] == "ks_drift" and result["converged"] is True
+
+    def test_max_turns_recorded(self):
+        result = run_debate(_strategist([["A."]]), RecordingCritic([0.1, 0.9] * 4), max_turns=4,
+                            speculation_min_chars=10_000)
+        assert result["terminated_by"] == "max_turns" and result["converged"] is False
+        assert len(result["rounds"]) == 4
+
+    def test_token_budget_bounds_spend(self):
+        result = run_debate(_strategist([[SENTENCE * 4]]), RecordingCritic([0.1, 0.9] * 4),
+                            policy=KSDriftPolicy() | TokenBudget(600), speculation_min_chars=10_000)
+        spent = sum(r["usage"]["prompt_tokens"] + r["usage"]["completion_tokens"] for r in result["rounds"])
+        assert result["terminated_by"] == "token_budget" and result["converged"] is False
+        assert 0 < spent <= 600
+        prompts = [r["usage"]["prompt_tokens"] for r in result["rounds"]]
+        assert prompts == sorted(prompts) and prompts[0] < prompts[-1]
+
+    def test_wall_clock_budget_stops_before_overrun(self):
+        start = time.perf_counter()
+        result = run_debate(_strategist([["A."]]), RecordingCritic([0.1, 0.9] * 4, delay=0.1),
+                            policy=WallClockBudget(0.25), speculation_min_chars=10_000)
+        elapsed = time.perf_counter() - start
+        assert result["terminated_by"] == "wall_clock"
+        assert len(result["rounds"]) == 2 and elapsed < 0.25
+
+    def test_cost_budget(self):
+        result = run_debate(_strategist([["A."]]), RecordingCritic([0.1, 0.9] * 4),
+                            policy=CostBudget(1e-9), speculation_min_chars=10_000)
+        assert result["terminated_by"] == "cost_budget" and len(result["rounds"]) == 1
+
+    def test_branches_use_the_policy(self):
+        result = _branches(RecordingCritic([0.5, 0.45]), RecordingCritic([0.6, 0.58]),
+                           policy=KSDriftPolicy(min_turns=2))
+        assert result["terminated_by"] == "ks_drift" and result["branch"] == 0
+        assert all(b["turns"] == 2 for b in result["branches"])
+
+
+# =============================================================================
+# TEST 9: HISTORY COMPACTION
+# =============================================================================
+
+THESIS = "The termination was retaliation for the protected complaint."
+
+
+def _round(turn, risk=0.5, extra=4):
+    argument = " ".join([THESIS] + [f"Round {turn} fact {i} shows the stated reason was pretext." for i in range(extra)])
+    rebuttal = f"Round {turn} objection: causation is weak. Comparators differ in role. Risk: {risk}"
+    return {"turn_number": turn, "strategist_argument": argument, "critic_rebuttal": rebuttal, "risk_score": risk}
+
+
+def _scripted_agents(extra=4):
+    async def strategist(history):
+        return _round(history[-1]["turn_number"] + 1 if history else 1, extra=extra)["strategist_argument"]
+
+    async def critic(argument, history):
+        turn = history[-1]["turn_number"] + 1 if history else 1
+        return _round(turn, risk=0.2 if turn % 2 else 0.8)["critic_rebuttal"]
+
+    return strategist, critic
+
+
+def _debate_tokens(max_context_tokens):
+    """Total estimated tokens and per-round agent context of a full 7-round debate."""
+    strategist, critic = _scripted_agents()
+    contexts = []
+
+    async def recording_critic(argument, history):
+        contexts.append(history_tokens(history))
+        return await critic(argument, history)
+
+    result = run_debate(strategist, recording_critic, policy=MaxTurnsPolicy(MAX_DEBATE_TURNS),
+                        speculate=False, max_context_tokens=max_context_tokens)
+    total = sum(r["usage"]["prompt_tokens"] + r["usage"]["completion_tokens"] for r in result["rounds"])
+    return total, contexts, result
+
+
+class TestHistoryCompactor:
+    """Tests for HistoryCompactor."""
+
+    def test_last_round_verbatim_after_digest(self):
+        compactor = HistoryCompactor(0)
+        for turn, risk in enumerate([0.7, 0.6, 0.55], start=1):
+            compactor.add(_round(turn, risk))
+        digest_round, last = compactor.history()
+        assert last == _round(3, 0.55)
+        assert digest_round["digest"]["turns"] == [1, 2]
+        assert digest_round["digest"]["risk_trajectory"] == [0.7, 0.6]
+        assert digest_round["turn_number"] == 2 and digest_round["risk_score"] == 0.6
+        assert "Risk trajectory: T1 0.70 -> T2 0.60" in digest_round["critic_rebuttal"]
+
+    def test_single_round_has_no_digest(self):
+        compactor = HistoryCompactor(0)
+        assert compactor.history() == []
+        compactor.add(_round(1))
+        assert compactor.history() == [_round(1)]
+
+    def test_repeated_claims_kept_once(self):
+        compactor = HistoryCompactor(0)
+        for turn in range(1, 5):
+            compactor.add(_round(turn, extra=1))
+        claims = compactor.digest["claims"]
+        assert sum(THESIS in c for c in claims) == 1
+        assert not any("Risk:" in r for r in compactor.digest["rebuttals"])
+
+    def test_each_round_folded_once(self):
+        compactor = HistoryCompactor(0)
+        for turn in range(1, 6):
+            compactor.add(_round(turn))
+            compactor.history()
+            compactor.history()
+        assert compactor.digest["turns"] == [1, 2, 3, 4]
+
+    def test_context_capped(self):
+        compactor = HistoryCompactor(200)
+        for turn in range(1, MAX_DEBATE_TURNS + 1):
+            compactor.add(_round(turn))
+            assert history_tokens(compactor.history()) <= 200
+        digest_round, last = compactor.history()
+        assert last == _round(MAX_DEBATE_TURNS)
+        # Newest points survive the cap
+        assert f"[T{MAX_DEBATE_TURNS - 1}]" in digest_round["strategist_argument"]
+
+    def test_oversized_last_round_shortened(self):
+        compactor = HistoryCompactor(40)
+        compactor.add(_round(1, extra=20))
+        (last,) = compactor.history()
+        assert history_tokens([last]) <= 40
+        assert last["strategist_argument"].startswith(THESIS[:20])
+
+
+class TestCompactedDebateTokens:
+    """Token harness: the same scripted debate with full vs compacted history."""
+
+    def test_compaction_reduces_total_tokens(self):
+        full_total, full_contexts, full = _debate_tokens(0)
+        compact_total, compact_contexts, compact = _debate_tokens(150)
+        assert len(full["rounds"]) == len(compact["rounds"]) == MAX_DEBATE_TURNS
+        # Verbatim history grows every round; compacted context stays under the cap
+        assert full_contexts == sorted(full_contexts) and full_contexts[-1] > 5 * full_contexts[1]
+        assert max(compact_contexts) <= 150
+        assert compact_total < 0.7 * full_total
+
+    def test_policies_see_the_full_history(self):
+        _, _, result = _debate_tokens(150)
+        assert [r["turn_number"] for r in result["rounds"]] == list(range(1, MAX_DEBATE_TURNS + 1))
+        assert [r["risk_score"] for r in result["rounds"]][:2] == [0.2, 0.8]
+
+    def test_default_config_caps_long_debates(self):
+        cap = DebateConfig.CONTEXT_TOKENS
+        assert cap > 0
+        strategist, critic = _scripted_agents(extra=30)
+        seen = []
+
+        async def recording_critic(argument, history):
+            seen.append(list(history))
+            return await critic(argument, history)
+
+        result = run_debate(strategist, recording_critic, policy=MaxTurnsPolicy(MAX_DEBATE_TURNS), speculate=False)
+        rounds = result["rounds"]
+        assert history_tokens(rounds) > cap
+        assert all(history_tokens(history) <= cap for history in seen)
+        # Verbatim while the history fits, digest + last round once it does not
+        assert seen[1] == rounds[:1]
+        assert "digest" in seen[-1][0] and seen[-1][-1] == rounds[-2]
+
+    def test_default_config_keeps_short_debates_verbatim(self):
+        strategist, critic = _scripted_agents()
+        seen = []
+
+        async def recording_critic(argument, history):
+            seen.append(list(history))
+            return await critic(argument, history)
+
+        result = run_debate(strategist, recording_critic, policy=MaxTurnsPolicy(3), speculate=False)
+        assert seen == [result["rounds"][:turn] for turn in range(3)]
+
+    def test_branches_compact_per_branch(self):
+        strategist, critic = _scripted_agents()
+        result = run_debate_branches(strategist, [critic, critic], tenant="compact",
+                                     policy=MaxTurnsPolicy(4), speculate=False, max_context_tokens=150)
+        assert len(result["rounds"]) == 4 and result["terminated_by"] == "max_turns"
+        assert max(r["usage"]["prompt_tokens"] for r in result["rounds"]) <= 2 * 150 + 100
@@ -0,0 +1,307 @@
+"""
+Tests for the session database (in-memory fallback and instrumentation).
+
+Validates TTL stamping, per-item overrides, lazy expiry and the
+retention sweep, RU instrumentation, the client-side RU limiter and
+enabling TTL on an existing container without a live Cosmos DB connection.
+
+Run with: pytest tests/test_db.py -v
+"""
+import json
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib import db
+from shared_lib.config import RetentionConfig
+from shared_lib.ghost_protocol import registered_stores
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    """Force the in-memory fallback and start from an empty store."""
+    monkeypatch.setattr(db, "_container", None)
+    monkeypatch.setattr(db, "COSMOS_CONNECTION", None)
+    db._memory_store.clear()
+    db._memory_expiry.clear()
+    yield
+    db._memory_store.clear()
+    db._memory_expiry.clear()
+
+
+def _expire(user_id: str, session_id: str):
+    """Move an entry's deadline into the past."""
+    db._memory_expiry[db._get_memory_key(user_id, session_id)] = 0.0
+
+
+# =============================================================================
+# TEST 1: TTL STAMPING
+# =============================================================================
+
+class TestTTLStamping:
+    """Tests for the ttl field written by save_session."""
+
+    def test_default_ttl(self):
+        """Documents get the shared retention default."""
+        db.save_session("u1", "s1", {"title": "A"})
+        doc = db.get_session("u1", "s1")
+        assert doc["ttl"] == RetentionConfig.SESSION_TTL_SECONDS
+
+    def test_per_item_override(self):
+        """A ttl in the payload overrides the default."""
+        db.save_session("u1", "s1", {"ttl": 120})
+        assert db.get_session("u1", "s1")["ttl"] == 120
+
+    def test_never_expire(self):
+        """ttl=-1 is stored without an expiry deadline."""
+        db.save_session("u1", "s1", {"ttl": -1})
+        assert db._get_memory_key("u1", "s1") not in db._memory_expiry
+
+    @pytest.mark.parametrize("bad", [0, -5, "60", 1.5, True])
+    def test_invalid_ttl_falls_back(self, bad):
+        """Invalid ttl values are replaced with the default."""
+        db.save_session("u1", "s1", {"ttl": bad})
+        assert db.get_session("u1", "s1")["ttl"] == RetentionConfig.SESSION_TTL_SECONDS
+
+    def test_rename_preserves_override(self):
+        """Renaming re-saves the session with its existing ttl."""
+        db.save_session("u1", "s1", {"ttl": 300})
+        assert db.rename_session("u1", "s1", "Renamed")
+        doc = db.get_session("u1", "s1")
+        assert doc["title"] == "Renamed"
+        assert doc["ttl"] == 300
+
+
+# =============================================================================
+# TEST 2: EXPIRY
+# =============================================================================
+
+class TestExpiry:
+    """Tests for lazy expiry and the periodic sweep."""
+
+    def test_get_session_lazy_expiry(self):
+        """Expired sessions read as missing and are dropped."""
+        db.save_session("u1", "s1", {})
+        _expire("u1", "s1")
+        assert db.get_session("u1", "s1") is None
+        assert db._get_memory_key("u1", "s1") not in db._memory_store
+
+    def test_list_skips_expired(self):
+        """get_user_sessions omits expired sessions."""
+        db.save_session("u1", "s1", {"timestamp": 1})
+        db.save_session("u1", "s2", {"timestamp": 2})
+        _expire("u1", "s1")
+        ids = [s["id"] for s in db.get_user_sessions("u1")]
+        assert ids == ["s2"]
+
+    def test_retention_sweep(self):
+        """The retention-engine sweep removes every expired entry."""
+        for sid in ("s1", "s2", "s3"):
+            db.save_session("u1", sid, {})
+        _expire("u1", "s1")
+        _expire("u1", "s2")
+        assert db.expire_sessions(dry_run=True) == 2
+        assert db.expire_sessions() == 2
+        assert list(db._memory_store) == [db._get_memory_key("u1", "s3")]
+
+    def test_delete_clears_expiry(self):
+        """Deleting a session also forgets its deadline."""
+        db.save_session("u1", "s1", {})
+        db.delete_session("u1", "s1")
+        assert db._get_memory_key("u1", "s1") not in db._memory_expiry
+
+
+# =============================================================================
+# TEST 3: RU INSTRUMENTATION
+# =============================================================================
+
+class FakeContainer:
+    """Minimal Cosmos container double that reports charges via response_hook."""
+
+    def __init__(self, charge="2.5", throttle_first=0):
+        self.charge = charge
+        self.throttle_first = throttle_first
+        self.items = {}
+
+    def _respond(self, hook, result):
+        if self.throttle_first:
+            self.throttle_first -= 1
+            err = db.exceptions.CosmosHttpResponseError(status_code=429, message="Too many requests")
+            err.headers = {"x-ms-retry-after-ms": "1"}
+            raise err
+        if hook:
+            hook({"x-ms-request-charge": self.charge, "x-ms-throttle-retry-count": "0"}, result)
+        return result
+
+    def upsert_item(self, doc, response_hook=None):
+        self.items[doc["id"]] = doc
+        return self._respond(response_hook, doc)
+
+    def read_item(self, item, partition_key, response_hook=None):
+        return self._respond(response_hook, self.items[item])
+
+
+@pytest.fixture
+def fake_container(monkeypatch):
+    container = FakeContainer()
+    monkeypatch.setattr(db, "_container", container)
+    monkeypatch.setattr(db, "_limiter", db.RequestChargeLimiter(1e6))
+    monkeypatch.setattr(db, "_user_charges", OrderedDict())
+    db.metrics.reset(prefix="db_")
+    return container
+
+
+class TestInstrumentation:
+    """Tests for per-operation RU/latency metrics and throttling."""
+
+    def test_records_charge_per_operation_and_user(self, fake_container):
+        """Request charge is exported per operation; per-user RU is tracked outside the metrics."""
+        db.save_session("u1", "s1", {"title": "A"})
+        db.get_session("u1", "s1")
+        m = db.metrics
+        assert m.get_counter("db_calls_total", operation="save_session") == 1
+        assert m.get_counter("db_request_charge_total", operation="get_session") == 2.5
+        assert "u1" not in json.dumps(db.get_db_metrics(), default=str)
+        assert db.get_user_request_charge("u1") == {"calls": 2, "request_charge": 5.0}
+        latency = m.get_histogram("db_latency_ms", operation="save_session")
+        assert latency["count"] == 1
+        assert m.get_histogram("db_payload_bytes", operation="save_session")["sum"] > 0
+
+    def test_user_charges_are_bounded(self, fake_container, monkeypatch):
+        """The least recently active users are evicted past USER_CHARGE_MAX_USERS."""
+        monkeypatch.setattr(db, "USER_CHARGE_MAX_USERS", 2)
+        for user in ("u1", "u2", "u1", "u3"):
+            db.save_session(user, "s1", {})
+        assert list(db._user_charges) == ["u1", "u3"]
+
+    def test_user_charges_expire_with_retention(self, fake_container):
+        """The retention engine drops users idle for RETENTION_SECONDS."""
+        db.save_session("u1", "s1", {})
+        later = time.time() + RetentionConfig.RETENTION_SECONDS + 1
+        assert "db_user_charges" in registered_stores()
+        assert db.expire_user_charges(later, dry_run=True) == 1
+        assert db.expire_user_charges(time.time()) == 0
+        assert db.expire_user_charges(later) == 1
+        assert db.get_user_request_charge("u1") == {"calls": 0, "request_charge": 0.0}
+
+    def test_throttle_is_retried(self, fake_container):
+        """A 429 surfaced by the SDK is retried instead of failing the request."""
+        fake_container.throttle_first = 2
+        assert db.save_session("u1", "s1", {}) is True
+        assert db.metrics.get_counter("db_throttled_total", operation="save_session") == 2
+        assert db.metrics.get_counter("db_retries_total", operation="save_session") == 2
+
+    def test_throttle_gives_up_after_max_retries(self, fake_container):
+        """Persistent throttling still fails once retries are exhausted."""
+        fake_container.throttle_first = db.MAX_THROTTLE_RETRIES + 1
+        assert db.save_session("u1", "s1", {}) is False
+        assert db.metrics.get_counter("db_errors_total", operation="save_session") == 1
+
+    def test_get_db_metrics_snapshot(self, fake_container):
+        """get_db_metrics exposes counters, histograms and limiter state."""
+        db.save_session("u1", "s1", {})
+        snap = db.get_db_metrics()
+        assert "db_calls_total" in snap["counters"]
+        assert "db_latency_ms" in snap["histograms"]
+        assert "ru_available" in snap
+
+
+class TestRequestChargeLimiter:
+    """Tests for the client-side RU token bucket."""
+
+    def _limiter(self, rate=100.0):
+        clock = [0.0]
+        slept = []
+
+        def sleep(s):
+            slept.append(s)
+            clock[0] += s
+
+        limiter = db.RequestChargeLimiter(rate, clock=lambda: clock[0], sleep=sleep)
+        return limiter, clock, slept
+
+    def test_within_budget_does_not_wait(self):
+        limiter, _, slept = self._limiter()
+        assert limiter.acquire(50) == 0.0
+        assert slept == []
+
+    def test_burst_is_smoothed(self):
+        """Exceeding the bucket sleeps for the deficit instead of failing."""
+        limiter, _, slept = self._limiter()
+        limiter.acquire(100)
+        assert limiter.acquire(50) == pytest.approx(0.5)
+        assert slept == [pytest.approx(0.5)]
+
+    def test_settle_refunds_overestimate(self):
+        limiter, _, _ = self._limiter()
+        limiter.acquire(60)
+        limiter.settle(60, 10)
+        assert limiter.available == pytest.approx(90)
+
+    def test_throttled_drains_bucket(self):
+        limiter, _, _ = self._limiter()
+        limiter.throttled(0.2)
+        assert limiter.available == pytest.approx(-20)
+
+
+# =============================================================================
+# TEST 4: CONTAINER TTL
+# =============================================================================
+
+class TtlContainer:
+    def __init__(self, default_ttl=None):
+        self.properties = {"id": db.CONTAINER_NAME, "indexingPolicy": {"indexingMode": "consistent"}}
+        if default_ttl is not None:
+            self.properties["defaultTtl"] = default_ttl
+
+    def read(self):
+        return self.properties
+
+
+class FakeDatabase:
+    def __init__(self, container, fail=False):
+        self.container = container
+        self.fail = fail
+        self.replaced = []
+
+    def replace_container(self, container, partition_key, indexing_policy=None, default_ttl=None):
+        if self.fail:
+            raise db.exceptions.CosmosHttpResponseError(status_code=403, message="Forbidden")
+        self.replaced.append({"indexing_policy": indexing_policy, "default_ttl": default_ttl})
+        replaced = TtlContainer(default_ttl)
+        replaced.properties["indexingPolicy"] = indexing_policy
+        return replaced
+
+
+class TestContainerTTL:
+    """Tests for enabling TTL on a pre-existing sessions container."""
+
+    def test_existing_container_without_ttl_is_updated(self):
+        database = FakeDatabase(TtlContainer())
+        container = db._ensure_default_ttl(database, database.container)
+        assert database.replaced == [{"indexing_policy": {"indexingMode": "consistent"},
+                                      "default_ttl": RetentionConfig.SESSION_TTL_SECONDS}]
+        assert container.read()["defaultTtl"] == RetentionConfig.SESSION_TTL_SECONDS
+
+    def test_container_with_ttl_is_left_alone(self):
+        database = FakeDatabase(TtlContainer(default_ttl=-1))
+        assert db._ensure_default_ttl(database, database.container) is database.container
+        assert database.replaced == []
+
+    def test_failed_update_logs_loudly(self, caplog):
+        database = FakeDatabase(TtlContainer(), fail=True)
+        assert db._ensure_default_ttl(database, database.container) is database.container
+        assert "will NOT expire" in caplog.text
+
+    def test_request_path_does_not_sweep(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(db, "expire_sessions", lambda *a, **kw: calls.append(a) or 0)
+        db.save_session("u1", "s1", {})
+        db.get_user_sessions("u1")
+        assert calls == []
@@ -0,0 +1,171 @@
+"""
+Tests for semantic precedent search.
+
+Validates the deterministic hashing embedder, the memory-mapped embedding
+file, brute-force and IVF top-k against a full sort, and hybrid ranking
+plus the query-embedding cache in shared_lib/precedents.py.
+
+Run with: pytest tests/test_embeddings.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+np = pytest.importorskip("numpy")
+
+from shared_lib import precedents
+from shared_lib.config import PrecedentConfig
+from shared_lib.embeddings import (
+    EMBEDDING_DIM, FEATURE_CACHE_SIZE, EmbeddingFormatError, EmbeddingIndex, _feature, hash_embed,
+    write_embeddings
+)
+from shared_lib.metrics import metrics
+
+
+def _clustered_vectors(n, clusters=20, seed=5):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, 32))
+    points = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, 32))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def builtin_embeddings(tmp_path):
+    path = write_embeddings(precedents.PRECEDENTS, tmp_path / "builtin.npy")
+    yield path
+    precedents.load_corpus(None)
+
+
+# =============================================================================
+# TEST 1: EMBEDDER AND FILES
+# =============================================================================
+
+class TestEmbeddingFiles:
+    """Tests for hash_embed and the .npy + sidecar format."""
+
+    def test_hash_embed_is_deterministic_and_normalized(self):
+        vectors = hash_embed(["Fired after an EEOC charge", "fired after an eeoc charge", ""])
+        assert vectors.shape == (3, EMBEDDING_DIM) and vectors.dtype == np.float32
+        assert np.allclose(vectors[0], vectors[1])
+        assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+        assert not vectors[2].any()
+
+    def test_related_texts_score_higher(self):
+        query, related, unrelated = hash_embed([
+            "retaliation after complaint to hr", "employer retaliation after an hr complaint",
+            "pension vesting schedule for executives",
+        ])
+        assert query @ related > query @ unrelated
+
+    def test_feature_cache_is_bounded(self):
+        before = hash_embed(["fired after an eeoc charge"])
+        hash_embed([f"token{i}" for i in range(FEATURE_CACHE_SIZE + 100)])
+        assert _feature.cache_info().currsize <= FEATURE_CACHE_SIZE
+        assert np.allclose(hash_embed(["fired after an eeoc charge"]), before)
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        path = write_embeddings(precedents.PRECEDENTS, tmp_path / "e.npy")
+        index = EmbeddingIndex.load(path, count=len(precedents.PRECEDENTS))
+        assert isinstance(index.vectors, np.memmap)
+        texts = [f"{p['name']}. {p['summary']}" for p in precedents.PRECEDENTS]
+        assert np.allclose(index.vectors, hash_embed(texts))
+
+    def test_rejects_embeddings_of_another_corpus(self, tmp_path):
+        path = write_embeddings(precedents.PRECEDENTS, tmp_path / "e.npy")
+        with pytest.raises(EmbeddingFormatError):
+            EmbeddingIndex.load(path, count=3)
+        with pytest.raises(EmbeddingFormatError):
+            EmbeddingIndex.load(path, digest="0" * 64)
+        with pytest.raises(EmbeddingFormatError):
+            EmbeddingIndex.load(tmp_path / "missing.npy")
+
+
+# =============================================================================
+# TEST 2: TOP-K SEARCH
+# =============================================================================
+
+class TestEmbeddingSearch:
+    """Brute-force and IVF search against a full sort."""
+
+    def test_brute_force_equals_full_sort(self):
+        vectors = _clustered_vectors(2000)
+        index = EmbeddingIndex(vectors)
+        query = vectors[7]
+        ids, scores = index.search(query, 10)
+        assert ids.tolist() == np.argsort(-(vectors @ query), kind="stable")[:10].tolist()
+        assert ids[0] == 7 and np.isclose(scores[0], 1.0)
+
+    def test_candidates_are_searched_exactly(self):
+        vectors = _clustered_vectors(500)
+        index = EmbeddingIndex(vectors, n_lists=10, n_probe=1)
+        candidates = np.arange(0, 500, 3)
+        ids, _ = index.search(vectors[0], 5, candidates)
+        expected = candidates[np.argsort(-(vectors[candidates] @ vectors[0]), kind="stable")[:5]]
+        assert ids.tolist() == expected.tolist()
+
+    def test_ivf_recall(self):
+        vectors = _clustered_vectors(5000)
+        exact = EmbeddingIndex(vectors)
+        ivf = EmbeddingIndex(vectors, n_lists=32, n_probe=4)
+        assert ivf.list_indptr[-1] == len(vectors)
+        recall = []
+        for q in range(0, 5000, 250):
+            truth = set(exact.search(vectors[q], 10)[0].tolist())
+            recall.append(len(truth & set(ivf.search(vectors[q], 10)[0].tolist())) / 10)
+        assert np.mean(recall) >= 0.9
+
+    def test_ivf_with_all_lists_probed_is_exact(self):
+        vectors = _clustered_vectors(1000)
+        exact = EmbeddingIndex(vectors)
+        ivf = EmbeddingIndex(vectors, n_lists=16, n_probe=16)
+        assert ivf.search(vectors[3], 20)[0].tolist() == exact.search(vectors[3], 20)[0].tolist()
+
+
+# =============================================================================
+# TEST 3: HYBRID RANKING
+# =============================================================================
+
+class TestHybridRanking:
+    """Hybrid scoring and query-embedding caching in precedents.py."""
+
+    FACTS = {"case_type": "retaliation", "incident_summary": "Fired after filing an EEOC charge"}
+
+    def test_zero_weight_matches_keyword_ranking(self, builtin_embeddings):
+        index = precedents.load_corpus(None, builtin_embeddings)
+        text = precedents._facts_text(self.FACTS)
+        vector = precedents.query_vector(self.FACTS, index)
+        hybrid = [i for i, _ in index.hybrid_top_k(text, vector, 3, semantic_weight=0.0)]
+        assert hybrid == [i for i, _ in index.top_k(text, 3)]
+
+    def test_pure_semantic_and_configured_weight(self, builtin_embeddings, monkeypatch):
+        index = precedents.load_corpus(None, builtin_embeddings)
+        vector = precedents.query_vector(self.FACTS, index)
+        pure = index.hybrid_top_k("", vector, 3, semantic_weight=1.0)
+        expected_ids, expected_scores = index.embeddings.search(vector, 3)
+        assert [i for i, _ in pure] == expected_ids.tolist()
+        assert np.allclose([s for _, s in pure], expected_scores)
+
+        monkeypatch.setattr(PrecedentConfig, "SEMANTIC_WEIGHT", 0.3)
+        names = [p["name"] for p in precedents.find_relevant_precedents(self.FACTS)]
+        assert {"Thompson v. North American Stainless", "Burlington Northern v. White"} <= set(names)
+
+    def test_query_vectors_cached_per_facts_hash(self, builtin_embeddings):
+        index = precedents.load_corpus(None, builtin_embeddings)
+        precedents._query_vectors.clear()
+        metrics.reset("precedent_query_embedding")
+        precedents.query_vector(self.FACTS, index)
+        reordered = {"incident_summary": " fired after filing an EEOC  charge", "case_type": "Retaliation", "x": ""}
+        precedents.query_vector(reordered, index)
+        assert precedents.facts_hash(reordered) == precedents.facts_hash(self.FACTS)
+        assert metrics.get_counter("precedent_query_embedding_cache_total", result="hit") == 1
+
+    def test_cache_is_bounded(self, builtin_embeddings, monkeypatch):
+        index = precedents.load_corpus(None, builtin_embeddings)
+        monkeypatch.setattr(PrecedentConfig, "QUERY_EMBEDDING_CACHE_SIZE", 4)
+        for i in range(10):
+            precedents.query_vector({"summary": f"fact {i}"}, index)
+        assert len(precedents._query_vectors) == 4
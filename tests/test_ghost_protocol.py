@@ -0,0 +1,364 @@
+"""
+Tests for Ghost Protocol privacy enforcement.
+
+Validates the expiry index (only due items are visited, writes extend
+deadlines, stale heap entries are skipped), reconciliation with files
+written outside the API and the rate-limited background sweeper.
+
+Run with: pytest tests/test_ghost_protocol.py -v
+"""
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib import ghost_protocol, storage, utils
+from shared_lib.metrics import metrics
+from shared_lib.utils import invalidate_storage_cache
+
+
+@pytest.fixture(autouse=True)
+def users(tmp_path, monkeypatch):
+    """Point both storage and the Ghost Protocol at a temp users/ root."""
+    monkeypatch.setattr(utils, "STATIC_DIR", tmp_path)
+    users_root = tmp_path / "users"
+    monkeypatch.setattr(ghost_protocol, "STORAGE_PATHS", [users_root])
+    invalidate_storage_cache()
+    ghost_protocol.reset_expiry_index()
+    yield users_root
+    invalidate_storage_cache()
+    ghost_protocol.reset_expiry_index()
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _stale():
+    return time.time() - ghost_protocol.RETENTION_SECONDS - 60
+
+
+def _user_dir(users, user_id):
+    return users / utils.shard_for(user_id) / user_id
+
+
+def _count_scans(monkeypatch):
+    calls = []
+    original = ghost_protocol._iter_items
+
+    def counting(path):
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(ghost_protocol, "_iter_items", counting)
+    return calls
+
+
+# =============================================================================
+# TEST 1: EXPIRY INDEX
+# =============================================================================
+
+class TestExpiryIndex:
+    """Tests for the ExpiryIndex heap."""
+
+    def test_pops_only_due_items_in_order(self, tmp_path):
+        index = ghost_protocol.ExpiryIndex()
+        index.record(tmp_path / "b", 20.0)
+        index.record(tmp_path / "a", 10.0)
+        index.record(tmp_path / "c", 99.0)
+        assert [p.name for p, _ in index.pop_due(50.0)] == ["a", "b"]
+        assert len(index) == 1
+
+    def test_later_write_supersedes_heap_entry(self, tmp_path):
+        index = ghost_protocol.ExpiryIndex()
+        index.record(tmp_path / "a", 10.0)
+        index.record(tmp_path / "a", 90.0)
+        assert index.pop_due(50.0) == []
+        assert index.pop_due(100.0) == [(tmp_path / "a", 90.0)]
+
+    def test_older_time_is_ignored(self, tmp_path):
+        index = ghost_protocol.ExpiryIndex()
+        index.record(tmp_path / "a", 90.0)
+        index.record(tmp_path / "a", 10.0)
+        assert index.pop_due(50.0) == []
+
+
+# =============================================================================
+# TEST 2: ENFORCEMENT
+# =============================================================================
+
+class TestEnforcePrivacy:
+    """Tests for index-driven enforce_privacy."""
+
+    def test_first_call_reconciles_then_skips_scans(self, users, monkeypatch):
+        storage.put_case_file("u1", "c1", "brief.pdf", b"data")
+        scans = _count_scans(monkeypatch)
+        ghost_protocol.enforce_privacy()
+        ghost_protocol.enforce_privacy()
+        assert scans == [users]
+
+    def test_deletes_items_reported_by_reconciliation(self, users):
+        storage.put_case_file("old", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        os.utime(_user_dir(users, "old"), (_stale(), _stale()))
+        stats = ghost_protocol.enforce_privacy()
+        assert stats["deleted"] == 1
+        assert not _user_dir(users, "old").exists()
+
+    def test_indexed_write_expires_without_scan(self, users, monkeypatch):
+        path = storage.put_case_file("u1", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        ghost_protocol._index.reconciled_at = time.time()  # Index considered current
+        ghost_protocol.record_write(path, when=_stale())
+        os.utime(_user_dir(users, "u1"), (_stale(), _stale()))
+        scans = _count_scans(monkeypatch)
+        assert ghost_protocol.enforce_privacy()["deleted"] == 1
+        assert scans == []
+
+    def test_recent_write_protects_stale_folder(self, users):
+        ghost_protocol.reconcile_index()
+        storage.put_case_file("u1", "c1", "brief.pdf", b"data")
+        os.utime(_user_dir(users, "u1"), (_stale(), _stale()))
+        assert ghost_protocol.enforce_privacy()["deleted"] == 0
+        assert _user_dir(users, "u1").exists()
+
+    def test_external_touch_reschedules_due_item(self, users):
+        storage.put_case_file("u1", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        ghost_protocol._index.reconciled_at = time.time()
+        ghost_protocol.record_write(_user_dir(users, "u1"), when=_stale())
+        stats = ghost_protocol.enforce_privacy()  # Folder mtime is fresh on disk
+        assert (stats["scanned"], stats["deleted"]) == (1, 0)
+        assert len(ghost_protocol._index) == 1
+
+    def test_releases_only_the_deleted_cases_blobs(self, users, monkeypatch):
+        storage.put_case_file("old", "c1", "brief.pdf", b"private")
+        storage.put_case_file("old", "c2", "brief.pdf", b"shared")
+        storage.put_case_file("new", "c1", "brief.pdf", b"shared")
+        orphan = storage.blob_path("0" * 64)  # Unreferenced blob from elsewhere: not this sweep's job
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b"orphan")
+        ghost_protocol.reset_expiry_index()
+        os.utime(_user_dir(users, "old"), (_stale(), _stale()))
+        monkeypatch.setattr(storage, "collect_garbage", lambda: pytest.fail("full blob scan"))
+        assert ghost_protocol.enforce_privacy()["deleted"] == 1
+        assert not storage.blob_path(_digest(b"private")).exists()
+        assert storage.blob_refcount(_digest(b"shared")) == 1
+        assert orphan.exists()
+
+    def test_blob_writes_are_not_indexed(self, users):
+        storage.put_case_file("u1", "c1", "brief.pdf", b"data")
+        assert ghost_protocol._retention_unit(storage.blob_path("ab" * 32)) is None
+        assert len(ghost_protocol._index) == 1
+
+    def test_stale_reconcile_runs_in_background(self, users, monkeypatch):
+        ghost_protocol.reconcile_index()
+        ghost_protocol._index.reconciled_at -= ghost_protocol.RECONCILE_INTERVAL_SECONDS + 1
+        started = []
+        monkeypatch.setattr(ghost_protocol, "_reconcile_in_background", lambda: started.append(1))
+        ghost_protocol.enforce_privacy()
+        assert started == [1]
+
+
+# =============================================================================
+# TEST 3: BACKGROUND SWEEPER
+# =============================================================================
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGhostSweeper:
+    """Tests for the background sweeper and request-path trigger."""
+
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        metrics.reset("ghost_")
+        yield
+        metrics.reset("ghost_")
+
+    def test_trigger_is_rate_limited(self, monkeypatch):
+        clock = FakeClock()
+        sweeper = ghost_protocol.GhostSweeper(interval=3600, min_trigger_interval=10, clock=clock)
+        monkeypatch.setattr(sweeper, "start", lambda: None)
+        assert sweeper.maybe_trigger() is True
+        assert sweeper.maybe_trigger() is False
+        clock.now += 10
+        assert sweeper.maybe_trigger() is True
+        assert metrics.get_counter("ghost_triggers_total") == 2
+
+    def test_contended_trigger_does_not_block(self, monkeypatch):
+        sweeper = ghost_protocol.GhostSweeper(interval=3600, min_trigger_interval=0)
+        monkeypatch.setattr(sweeper, "start", lambda: None)
+        with sweeper._trigger_lock:
+            assert sweeper.maybe_trigger() is False
+
+    def test_trigger_never_deletes_inline(self, users, monkeypatch):
+        sweeper = ghost_protocol.GhostSweeper(interval=3600)
+        monkeypatch.setattr(sweeper, "start", lambda: None)
+        monkeypatch.setattr(ghost_protocol, "enforce_privacy", lambda: pytest.fail("swept inline"))
+        sweeper.maybe_trigger()
+
+    def test_thread_sweeps_on_trigger_and_stops(self, users):
+        storage.put_case_file("old", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        os.utime(_user_dir(users, "old"), (_stale(), _stale()))
+        sweeper = ghost_protocol.GhostSweeper(interval=3600, min_trigger_interval=0)
+        try:
+            assert sweeper.maybe_trigger() is True
+            deadline = time.time() + 5
+            while metrics.get_counter("ghost_sweeps_total") < 1 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            sweeper.stop()
+        assert not sweeper.running
+        assert not _user_dir(users, "old").exists()
+        assert metrics.get_counter("ghost_items_deleted_total") == 1
+        assert metrics.get_gauge("ghost_last_sweep_timestamp") is not None
+
+    def test_stats_include_metrics(self, users):
+        sweeper = ghost_protocol.GhostSweeper(interval=3600)
+        sweeper.run_once()
+        stats = sweeper.get_stats()
+        assert stats["running"] is False
+        assert "ghost_sweeps_total" in stats["metrics"]["counters"]
+
+
+# =============================================================================
+# TEST 4: INCINERATION
+# =============================================================================
+
+def _make_tree(root: Path) -> int:
+    (root / "cases" / "c1").mkdir(parents=True)
+    (root / "cases" / "c1" / "a.pdf").write_bytes(b"x" * 100)
+    (root / "cases" / "b.txt").write_bytes(b"y" * 23)
+    return 123
+
+
+class TestIncineration:
+    """Tests for single-pass, parallel, budgeted deletion."""
+
+    def test_incinerate_measures_in_same_pass(self, tmp_path):
+        expected = _make_tree(tmp_path / "u1")
+        assert ghost_protocol._incinerate(str(tmp_path / "u1")) == expected
+        assert not (tmp_path / "u1").exists()
+
+    def test_incinerate_without_sizes(self, tmp_path):
+        _make_tree(tmp_path / "u1")
+        assert ghost_protocol._incinerate(str(tmp_path / "u1"), measure=False) == 0
+        assert not (tmp_path / "u1").exists()
+
+    def test_incinerate_does_not_follow_symlinks(self, tmp_path):
+        outside = tmp_path / "outside.txt"
+        outside.write_text("keep")
+        (tmp_path / "u1").mkdir()
+        (tmp_path / "u1" / "link").symlink_to(outside)
+        ghost_protocol._incinerate(str(tmp_path / "u1"))
+        assert outside.read_text() == "keep"
+
+    def test_parallel_wave(self, users):
+        for i in range(12):
+            storage.put_case_file(f"user{i}", "c1", "brief.pdf", f"brief {i}".encode())
+        ghost_protocol.reset_expiry_index()
+        for i in range(12):
+            os.utime(_user_dir(users, f"user{i}"), (_stale(), _stale()))
+        stats = ghost_protocol.enforce_privacy()
+        assert stats["deleted"] == 12
+        assert stats["bytes_freed"] > 0
+
+    def test_size_accounting_optional(self, users):
+        storage.put_case_file("old", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        os.utime(_user_dir(users, "old"), (_stale(), _stale()))
+        stats = ghost_protocol.enforce_privacy(measure_sizes=False)
+        assert stats["deleted"] == 1
+        assert stats["bytes_freed"] == 0
+
+    def test_time_budget_defers_remaining_items(self, users):
+        for i in range(3):
+            storage.put_case_file(f"user{i}", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        for i in range(3):
+            os.utime(_user_dir(users, f"user{i}"), (_stale(), _stale()))
+        ghost_protocol.reconcile_index()
+
+        stats = ghost_protocol.enforce_privacy(time_budget=0)
+        assert (stats["deleted"], stats["deferred"]) == (0, 3)
+        assert len(ghost_protocol._index) == 3
+
+        assert ghost_protocol.enforce_privacy()["deleted"] == 3
+
+
+# =============================================================================
+# TEST 5: RETENTION ENGINE
+# =============================================================================
+
+class TestRetentionEngine:
+    """Tests for the store registry, dry-run planning and per-store stats."""
+
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        metrics.reset("retention_")
+        yield
+        metrics.reset("retention_")
+
+    def test_builtin_stores_register(self):
+        from shared_lib import db, pdf_utils  # noqa: F401  (registration on import)
+        assert {"files", "sessions", "pdf_render_cache"} <= set(ghost_protocol.registered_stores())
+
+    def test_dry_run_does_not_expire(self, monkeypatch):
+        calls = []
+        ghost_protocol.register_store("fake", lambda now, dry_run: calls.append(dry_run) or {"expired": 2})
+        try:
+            plan = ghost_protocol.run_retention(dry_run=True)
+        finally:
+            ghost_protocol.unregister_store("fake")
+        assert calls == [True]
+        assert plan["fake"]["expired"] == 2
+        assert metrics.get_counter("retention_expired_total", store="fake") == 0
+
+    def test_failing_store_is_isolated(self):
+        def broken(now, dry_run):
+            raise RuntimeError("boom")
+
+        ghost_protocol.register_store("broken", broken)
+        try:
+            results = ghost_protocol.run_retention()
+        finally:
+            ghost_protocol.unregister_store("broken")
+        assert results["broken"]["error"] == "boom"
+        assert "files" in results
+        assert metrics.get_counter("retention_errors_total", store="broken") == 1
+
+    def test_per_store_timing(self):
+        results = ghost_protocol.run_retention()
+        assert results["files"]["ms"] >= 0
+        assert metrics.get_histogram("retention_store_ms", store="files")["count"] == 1
+
+    def test_file_plan_matches_enforcement(self, users):
+        storage.put_case_file("old", "c1", "brief.pdf", b"data")
+        ghost_protocol.reset_expiry_index()
+        os.utime(_user_dir(users, "old"), (_stale(), _stale()))
+        info = ghost_protocol.get_retention_info()
+        assert info["stores"]["files"]["expired"] == 1
+        assert _user_dir(users, "old").exists()
+        assert ghost_protocol.run_retention()["files"]["expired"] == 1
+
+    def test_sessions_expire_through_engine(self, monkeypatch):
+        from shared_lib import db
+        monkeypatch.setattr(db, "_memory_store", {"u1:s1": {}, "u1:s2": {}})
+        monkeypatch.setattr(db, "_memory_expiry", {"u1:s1": time.time() - 1, "u1:s2": time.time() + 60})
+        assert ghost_protocol.run_retention(dry_run=True)["sessions"]["expired"] == 1
+        assert "u1:s1" in db._memory_store
+        assert ghost_protocol.run_retention()["sessions"]["expired"] == 1
+        assert list(db._memory_store) == ["u1:s2"]
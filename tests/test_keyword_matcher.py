@@ -0,0 +1,151 @@
+"""
+Tests for the Aho-Corasick keyword matcher.
+
+Validates matches against plain substring / regex scans, word-boundary
+handling, and the two users: precedent keyword hits and the intake
+agent's completion signals (same results as the old substring checks,
+minus matches inside longer words).
+
+Run with: pytest tests/test_keyword_matcher.py -v
+"""
+import importlib.util
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib.keyword_matcher import KeywordMatcher
+
+
+def _regex_matches(patterns, text):
+    """Reference: one word-bounded regex scan per pattern."""
+    return {p for p in patterns if re.search(rf"(?<!\w){re.escape(p)}(?!\w)", text.lower())}
+
+
+# =============================================================================
+# TEST 1: MATCHER
+# =============================================================================
+
+class TestKeywordMatcher:
+    """Tests for KeywordMatcher against reference scans."""
+
+    def test_overlapping_patterns_without_boundaries(self):
+        matcher = KeywordMatcher(["he", "she", "his", "hers"], word_boundary=False)
+        assert matcher.find_all("ushers") == {"he", "she", "hers"}
+
+    def test_word_boundaries(self):
+        matcher = KeywordMatcher(["done", "title vii", "complete"])
+        assert matcher.find_all("I abandoned title viii; incomplete") == set()
+        assert matcher.find_all("Done. Title VII applies, complete!") == {"done", "title vii", "complete"}
+
+    def test_punctuation_edges(self):
+        matcher = KeywordMatcher(["cat's paw", "u.s.", "i'm done"])
+        assert matcher.find_all("the u.s.a. and a cat's paw theory; i'm done") == {"u.s.", "cat's paw", "i'm done"}
+
+    def test_search_stops_at_first_match(self):
+        assert KeywordMatcher(["x"]).search("a x b") is True
+        assert KeywordMatcher(["x"]).search("axb") is False
+        assert KeywordMatcher([]).search("anything") is False
+
+    def test_random_texts_match_references(self):
+        rng = random.Random(3)
+        alphabet = "ab c"
+        patterns = {"".join(rng.choices(alphabet, k=rng.randint(1, 4))).strip() or "a" for _ in range(40)}
+        bounded = KeywordMatcher(patterns)
+        unbounded = KeywordMatcher(patterns, word_boundary=False)
+        for _ in range(200):
+            text = "".join(rng.choices(alphabet, k=rng.randint(0, 30)))
+            assert unbounded.find_all(text) == {p for p in patterns if p in text}
+            assert bounded.find_all(text) == _regex_matches(patterns, text)
+
+
+# =============================================================================
+# TEST 2: PRECEDENT KEYWORD HITS
+# =============================================================================
+
+class TestPrecedentKeywordHits:
+    """keyword_hits reproduces the old per-keyword substring score."""
+
+    @pytest.mark.parametrize("facts_text", [
+        "hostile work environment created by a supervisor, title vii claim",
+        "age discrimination under the adea; employee was over 40; pension vesting",
+        "retaliation after eeoc complaint, wrongful termination",
+        "nothing relevant",
+    ])
+    def test_matches_legacy_scores(self, facts_text):
+        pytest.importorskip("numpy")
+        from shared_lib.precedents import PRECEDENTS, PrecedentIndex
+
+        legacy = [sum(1 for kw in p["keywords"] if kw in facts_text) for p in PRECEDENTS]
+        assert PrecedentIndex(PRECEDENTS).keyword_hits(facts_text).tolist() == legacy
+
+    def test_no_match_inside_longer_words(self):
+        pytest.importorskip("numpy")
+        from shared_lib.precedents import PRECEDENTS, PrecedentIndex
+
+        # Old substring scan credited "title vii" inside "title viii"
+        assert PrecedentIndex(PRECEDENTS).keyword_hits("title viii").sum() == 0
+
+
+# =============================================================================
+# TEST 3: INTAKE COMPLETION SIGNALS
+# =============================================================================
+
+class Human:
+    """Minimal stand-in for a LangChain HumanMessage."""
+    type = "human"
+
+    def __init__(self, content):
+        self.content = content
+
+
+class TestCompletionSignals:
+    """detect_completion_signal keeps its results on whole-word signals."""
+
+    @pytest.fixture(scope="class")
+    def intake(self):
+        pytest.importorskip("langchain_core")
+        # Load from source: other test modules stub agent_intake.intake in sys.modules
+        path = Path(__file__).parent.parent / "agent_intake" / "intake.py"
+        spec = importlib.util.spec_from_file_location("intake_under_test", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    @staticmethod
+    def _messages(*texts):
+        return [Human(t) for t in texts]
+
+    @pytest.mark.parametrize("text, expected", [
+        ("I'm done", True),
+        ("That's everything I can remember.", True),
+        ("ok that is all", True),
+        ("The project is complete", True),
+        ("I think I finished", True),
+        ("I've completed my story", True),
+        ("He abandoned the project", False),
+        ("The form was incomplete", False),
+        ("My manager yelled at me", False),
+    ])
+    def test_strong_signals(self, intake, text, expected):
+        assert intake.detect_completion_signal(self._messages(text)) is expected
+
+    def test_agrees_with_substring_scan_on_whole_words(self, intake):
+        for text in ["i'm done here", "nothing else to add", "that covers it", "no more information"]:
+            old = any(s in text for s in intake.STRONG_SIGNALS)
+            assert intake._STRONG_MATCHER.search(text) is old is True
+
+    def test_moderate_signal_needs_context(self, intake):
+        short = [Human("that's what happened, done")]
+        long = [Human("a"), Human("b"), Human("that's what happened, done")]
+        assert intake.detect_completion_signal(short) is False
+        assert intake.detect_completion_signal(long) is True
+
+    def test_inflected_moderate_signal(self, intake):
+        msgs = [Human("a"), Human("b"), Human("I'm finishing up with the details")]
+        assert intake.detect_completion_signal(msgs) is True
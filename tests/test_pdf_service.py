@@ -0,0 +1,89 @@
+"""
+Tests for the process-pool PDF rendering service.
+
+Validates single and batch rendering, the bounded queue and the
+queue-depth / render-time metrics.
+
+Run with: pytest tests/test_pdf_service.py -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("fpdf")
+
+from shared_lib.metrics import metrics
+from shared_lib.pdf_service import PDFRenderService, RenderQueueFull
+
+
+def _case(n: int) -> dict:
+    return {
+        "case_id": f"case-{n}",
+        "facts": {"client_name": f"Client {n}", "employer": "Acme"},
+        "strategy": "Negotiate severance.",
+    }
+
+
+@pytest.fixture
+def service():
+    metrics.reset(prefix="pdf_render")
+    svc = PDFRenderService(max_workers=2, max_queue=2)
+    yield svc
+    svc.shutdown()
+
+
+class TestPDFRenderService:
+    """Tests for PDFRenderService."""
+
+    def test_render_returns_pdf(self, service):
+        assert service.render(_case(1)).startswith(b"%PDF")
+
+    def test_render_async(self, service):
+        data = asyncio.run(service.render_async(_case(1)))
+        assert data.startswith(b"%PDF")
+
+    def test_batch_preserves_order(self, service):
+        cases = [_case(n) for n in range(6)]  # More than workers + queue
+        results = service.render_batch(cases)
+        assert len(results) == 6
+        assert all(data.startswith(b"%PDF") for data in results)
+        assert len(set(results)) == 6  # Each brief carries its own case id
+
+    def test_batch_return_exceptions(self, service):
+        results = service.render_batch([_case(1), {"case_id": "bad", "facts": 42}], return_exceptions=True)
+        assert results[0].startswith(b"%PDF")
+        assert isinstance(results[1], Exception)
+
+    def test_batch_returns_rejected_requests(self, service):
+        results = service.render_batch([{"facts": {}}, _case(1)], return_exceptions=True)
+        assert isinstance(results[0], ValueError)
+        assert results[1].startswith(b"%PDF")
+        assert service.queue_depth == 0
+        with pytest.raises(ValueError):
+            service.render_batch([{"facts": {}}])
+
+    def test_workers_are_spawned(self, service):
+        assert service.executor._mp_context.get_start_method() == "spawn"
+
+    def test_missing_case_id_rejected(self, service):
+        with pytest.raises(ValueError):
+            service.submit({"facts": {}})
+
+    def test_queue_full_times_out(self, service):
+        for _ in range(service.max_workers + service.max_queue):
+            service._slots.acquire()
+        with pytest.raises(RenderQueueFull):
+            service.submit(_case(1), timeout=0.01)
+
+    def test_metrics_reported(self, service):
+        service.render_batch([_case(1), _case(2)])
+        stats = service.get_stats()
+        assert stats["renders"] == 2
+        assert stats["queue_depth"] == 0
+        assert stats["render_ms"]["count"] == 2
+        assert metrics.get_gauge("pdf_render_queue_depth") == 0
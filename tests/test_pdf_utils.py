@@ -0,0 +1,301 @@
+"""
+Tests for Case Brief PDF generation.
+
+Validates secure rendering, the content-addressed render cache
+(unchanged inputs reuse the existing PDF) and in-memory streaming.
+
+Run with: pytest tests/test_pdf_utils.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("fpdf")
+
+from shared_lib import pdf_utils, utils
+from shared_lib.storage import read_manifest
+
+
+FACTS = {"client_name": "Jane Doe", "employer": "Acme", "status": "COMPLETE"}
+STRATEGY = "File an EEOC charge within 300 days."
+RESEARCH = {"title_vii": "Prohibits retaliation for protected activity."}
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    """Redirect secure storage to a temp dir and start with an empty cache."""
+    monkeypatch.setattr(utils, "STATIC_DIR", tmp_path)
+    pdf_utils._render_cache.clear()
+    yield tmp_path
+    pdf_utils._render_cache.clear()
+
+
+def _count_renders(monkeypatch):
+    calls = []
+    original = pdf_utils.CaseBriefPDF.output
+
+    def counting_output(self, *args, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_utils.CaseBriefPDF, "output", counting_output)
+    return calls
+
+
+# =============================================================================
+# TEST 1: RENDERING
+# =============================================================================
+
+class TestGenerateCaseBrief:
+    """Tests for generate_case_brief_pdf."""
+
+    def test_writes_pdf_and_manifest_hash(self):
+        path = Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY, RESEARCH))
+        assert path.name == pdf_utils.BRIEF_FILENAME
+        assert path.read_bytes().startswith(b"%PDF")
+        entry = read_manifest("u1", "c1")[pdf_utils.BRIEF_FILENAME]
+        assert entry["source_hash"] == pdf_utils.compute_brief_hash("c1", FACTS, STRATEGY, RESEARCH)
+
+    def test_missing_user_rejected(self):
+        with pytest.raises(ValueError):
+            pdf_utils.generate_case_brief_pdf("", "c1", FACTS)
+
+
+# =============================================================================
+# TEST 2: CONTENT-ADDRESSED CACHE
+# =============================================================================
+
+class TestRenderCache:
+    """Tests for hash-based dedupe of brief regeneration."""
+
+    def test_hash_ignores_key_order(self):
+        a = pdf_utils.compute_brief_hash("c1", {"a": 1, "b": 2})
+        b = pdf_utils.compute_brief_hash("c1", {"b": 2, "a": 1})
+        assert a == b
+
+    def test_hash_changes_with_content(self):
+        a = pdf_utils.compute_brief_hash("c1", FACTS, STRATEGY)
+        b = pdf_utils.compute_brief_hash("c1", FACTS, STRATEGY + " Also sue.")
+        assert a != b
+
+    def test_unchanged_inputs_skip_render(self, monkeypatch):
+        renders = _count_renders(monkeypatch)
+        first = pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY, RESEARCH)
+        second = pdf_utils.generate_case_brief_pdf("u1", "c1", dict(FACTS), STRATEGY, RESEARCH)
+        assert first == second
+        assert len(renders) == 1
+
+    def test_stored_hash_survives_process_cache_loss(self, monkeypatch):
+        renders = _count_renders(monkeypatch)
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY)
+        pdf_utils._render_cache.clear()
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY)
+        assert len(renders) == 1
+
+    def test_changed_inputs_rerender(self, monkeypatch):
+        renders = _count_renders(monkeypatch)
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY)
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, "New strategy")
+        assert len(renders) == 2
+
+    def test_deleted_pdf_rerenders(self, monkeypatch):
+        renders = _count_renders(monkeypatch)
+        path = Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS))
+        path.unlink()
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS)
+        assert len(renders) == 2
+        assert path.exists()
+
+    def test_delete_case_pdf_clears_manifest_entry(self):
+        path = Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS))
+        assert pdf_utils.delete_case_pdf("u1", "c1") is True
+        assert not path.exists()
+        assert pdf_utils.BRIEF_FILENAME not in read_manifest("u1", "c1")
+        assert ("u1", "c1") not in pdf_utils._render_cache
+
+    def test_retention_drops_entries_for_incinerated_briefs(self):
+        path = Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS))
+        pdf_utils.generate_case_brief_pdf("u1", "c2", FACTS)
+        path.unlink()
+        assert pdf_utils._expire_render_cache(0, dry_run=True)["expired"] == 1
+        assert pdf_utils._expire_render_cache(0)["expired"] == 1
+        assert list(pdf_utils._render_cache) == [("u1", "c2")]
+
+    def test_lru_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(pdf_utils, "RENDER_CACHE_SIZE", 2)
+        for case_id in ("c1", "c2", "c3"):
+            pdf_utils.generate_case_brief_pdf("u1", case_id, FACTS)
+        assert list(pdf_utils._render_cache) == [("u1", "c2"), ("u1", "c3")]
+
+
+# =============================================================================
+# TEST 3: IN-MEMORY RENDERING & STREAMING
+# =============================================================================
+
+class TestInMemoryRender:
+    """Tests for rendering briefs without touching disk."""
+
+    def test_render_bytes_touches_no_disk(self, storage):
+        data = pdf_utils.render_case_brief_bytes("c1", FACTS, STRATEGY, RESEARCH)
+        assert data.startswith(b"%PDF")
+        assert list(storage.iterdir()) == []
+
+    def test_chunks_reassemble(self):
+        data = pdf_utils.render_case_brief_bytes("c1", FACTS, STRATEGY, RESEARCH)
+        chunks = list(pdf_utils.iter_pdf_chunks(data, chunk_size=100))
+        assert all(len(c) <= 100 for c in chunks)
+        assert b"".join(chunks) == data
+
+    def test_no_persist_leaves_disk_untouched(self, storage):
+        data = pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, persist=False)
+        pdf_utils.flush_pending_writes()
+        assert data.startswith(b"%PDF")
+        assert list(storage.iterdir()) == []
+
+    def test_background_persist(self, storage):
+        data = pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, STRATEGY)
+        pdf_utils.flush_pending_writes(timeout=10)
+        path = pdf_utils.get_existing_pdf_path("u1", "c1")
+        assert Path(path).read_bytes() == data
+        assert pdf_utils._render_cache[("u1", "c1")] == pdf_utils.compute_brief_hash("c1", FACTS, STRATEGY)
+
+    def test_persisted_brief_is_reused_by_path_api(self, monkeypatch):
+        pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, STRATEGY)
+        pdf_utils.flush_pending_writes(timeout=10)
+        renders = []
+        monkeypatch.setattr(pdf_utils, "render_case_brief_bytes", lambda *a, **k: renders.append(1))
+        pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS, STRATEGY)
+        assert renders == []
+
+    def test_unchanged_brief_is_streamed_from_storage(self, monkeypatch):
+        first = pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, STRATEGY)
+        pdf_utils.flush_pending_writes(timeout=10)
+        pdf_utils._render_cache.clear()  # Falls back to the manifest hash
+        renders = _count_renders(monkeypatch)
+        assert pdf_utils.get_case_brief_bytes("u1", "c1", dict(FACTS), STRATEGY) == first
+        assert pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, STRATEGY, persist=False) == first
+        assert renders == []
+        assert pdf_utils.get_case_brief_bytes("u1", "c1", FACTS, "New strategy") != first
+        assert len(renders) == 1
+        pdf_utils.flush_pending_writes(timeout=10)
+
+
+# =============================================================================
+# TEST 4: TEXT CLEANING
+# =============================================================================
+
+def _legacy_clean(text: str) -> str:
+    """Reference implementation (sequential replaces + latin-1 round trip)."""
+    if not text:
+        return ""
+    for char, replacement in {
+        '‘': "'", '’': "'", '“': '"', '”': '"',
+        '–': '-', '—': '--', '…': '...', '•': '-'
+    }.items():
+        text = text.replace(char, replacement)
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+class TestCleanTextForPdf:
+    """Tests for the clean_text_for_pdf pipeline."""
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "Plain ASCII text.",
+        "“Smart” quotes ‘here’ – dash — long…",
+        "Café crème über",
+        "中文 हिन्दी mixed • bullet",
+    ])
+    def test_matches_legacy_output(self, text):
+        assert pdf_utils.clean_text_for_pdf(text) == _legacy_clean(text)
+
+    def test_ascii_fast_path_returns_same_object(self):
+        text = "No cleaning needed " * 100
+        assert pdf_utils.clean_text_for_pdf(text) is text
+
+    def test_unicode_font_passthrough(self):
+        text = "中文 “quoted”"
+        assert pdf_utils.clean_text_for_pdf(text, unicode_font=True) == text
+
+    def test_missing_font_falls_back(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(pdf_utils, "PDF_UNICODE_FONT_PATH", str(tmp_path / "missing.ttf"))
+        assert pdf_utils.get_unicode_font_path() is None
+        assert pdf_utils.CaseBriefPDF("c1").body_font == "Arial"
+
+
+# =============================================================================
+# TEST 5: MULTI-DOCUMENT PIPELINE
+# =============================================================================
+
+class TestDocumentPipeline:
+    """Tests for render_case_documents."""
+
+    ALL = ("case_brief", "demand_letter", "reasoning_memo", "html_preview")
+
+    def test_renders_requested_outputs(self):
+        docs = pdf_utils.render_case_documents("c1", FACTS, STRATEGY, RESEARCH, outputs=self.ALL)
+        assert list(docs) == list(self.ALL)
+        for name in ("case_brief", "demand_letter", "reasoning_memo"):
+            assert docs[name].startswith(b"%PDF")
+        assert "KEY FACTS" in docs["html_preview"]
+        assert "Jane Doe" in docs["html_preview"]
+
+    def test_normalizes_once(self, monkeypatch):
+        calls = []
+        original = pdf_utils.normalize_case_inputs
+        monkeypatch.setattr(pdf_utils, "normalize_case_inputs", lambda *a, **k: calls.append(1) or original(*a, **k))
+        pdf_utils.render_case_documents("c1", FACTS, STRATEGY, outputs=self.ALL)
+        assert len(calls) == 1
+
+    def test_html_is_escaped(self):
+        docs = pdf_utils.render_case_documents("c1", {"employer": "<script>x</script>"}, outputs=("html_preview",))
+        assert "<script>" not in docs["html_preview"]
+
+    def test_writer_text_used(self):
+        n = pdf_utils.normalize_case_inputs("c1", FACTS, demand_letter_text="Dear Sir, pay up.")
+        assert pdf_utils._layout_demand_letter(n) == [("Correspondence", "Dear Sir, pay up.")]
+
+    def test_unknown_output_rejected(self):
+        with pytest.raises(ValueError):
+            pdf_utils.render_case_documents("c1", FACTS, outputs=("fax",))
+
+    def test_parallel_pool(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            docs = pdf_utils.render_case_documents("c1", FACTS, STRATEGY, outputs=self.ALL[:3], pool=pool)
+        assert all(docs[name].startswith(b"%PDF") for name in self.ALL[:3])
+
+    def test_to_generated_docs(self):
+        import base64
+        docs = pdf_utils.render_case_documents("c1", FACTS, outputs=("demand_letter", "reasoning_memo"))
+        generated = pdf_utils.to_generated_docs(docs)
+        assert base64.b64decode(generated["demand_letter"]) == docs["demand_letter"]
+        assert set(generated) == {"demand_letter", "reasoning_memo"}
+
+
+# =============================================================================
+# TEST 6: READ PATHS DO NOT CREATE DIRECTORIES
+# =============================================================================
+
+class TestReadOnlyLookups:
+    """Existence checks and deletes must not create storage folders."""
+
+    def test_existing_path_lookup_creates_nothing(self, storage):
+        assert pdf_utils.get_existing_pdf_path("u1", "c1") is None
+        assert list(storage.iterdir()) == []
+
+    def test_delete_missing_creates_nothing(self, storage):
+        assert pdf_utils.delete_case_pdf("u1", "c1") is False
+        assert list(storage.iterdir()) == []
+
+    def test_write_recovers_from_removed_directory(self, storage):
+        import shutil
+        path = Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS))
+        shutil.rmtree(storage / "users")  # Deleted behind the cache's back
+        pdf_utils._render_cache.clear()
+        assert Path(pdf_utils.generate_case_brief_pdf("u1", "c1", FACTS)) == path
+        assert path.exists()
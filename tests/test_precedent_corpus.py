@@ -0,0 +1,105 @@
+"""
+Tests for memory-mapped precedent corpus files.
+
+Validates write/read round trips, lazy field access, zero-copy columns
+and switching the active matching corpus.
+
+Run with: pytest tests/test_precedent_corpus.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+np = pytest.importorskip("numpy")
+
+from shared_lib import precedents
+from shared_lib.precedent_corpus import CorpusFormatError, PrecedentCorpus, corpus_digest, write_corpus
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    return write_corpus(precedents.PRECEDENTS, tmp_path / "landmark.jlpc")
+
+
+@pytest.fixture
+def restore_default_corpus():
+    yield
+    precedents.load_corpus(None)
+
+
+# =============================================================================
+# TEST 1: FILE FORMAT
+# =============================================================================
+
+class TestCorpusFile:
+    """Tests for write_corpus / PrecedentCorpus."""
+
+    def test_round_trip(self, corpus_path):
+        with PrecedentCorpus(corpus_path) as corpus:
+            assert len(corpus) == len(precedents.PRECEDENTS)
+            assert list(corpus) == precedents.PRECEDENTS
+            assert corpus.digest == corpus_digest(precedents.PRECEDENTS)
+
+    def test_lazy_field_access(self, corpus_path):
+        with PrecedentCorpus(corpus_path) as corpus:
+            assert corpus.get(10, "name") == "Ledbetter v. Goodyear Tire & Rubber Co."
+            assert corpus.get(10, "keywords")[0] == "pay discrimination"
+            assert corpus.get(10, "missing") is None
+            assert corpus[-1]["name"] == "Bostock v. Clayton County"
+
+    def test_int_column_is_a_view(self, corpus_path):
+        with PrecedentCorpus(corpus_path) as corpus:
+            years = corpus.int_column("year")
+            assert years.tolist() == [p["year"] for p in precedents.PRECEDENTS]
+            assert not years.flags.writeable
+            assert corpus.int_column("name") is None
+
+    def test_missing_values_and_unicode(self, tmp_path):
+        records = [
+            {"name": "Señora v. Café", "year": 2001, "keywords": ["übung"]},
+            {"name": "No Year", "summary": "—"},
+        ]
+        with PrecedentCorpus(write_corpus(records, tmp_path / "c.jlpc")) as corpus:
+            assert list(corpus) == records
+
+    def test_empty_corpus(self, tmp_path):
+        with PrecedentCorpus(write_corpus([], tmp_path / "empty.jlpc")) as corpus:
+            assert len(corpus) == 0 and list(corpus) == []
+
+    def test_rejects_other_files(self, tmp_path):
+        bad = tmp_path / "bad.jlpc"
+        bad.write_bytes(b"not a corpus at all")
+        with pytest.raises(CorpusFormatError):
+            PrecedentCorpus(bad)
+
+    def test_out_of_range(self, corpus_path):
+        with PrecedentCorpus(corpus_path) as corpus:
+            with pytest.raises(IndexError):
+                corpus[len(corpus)]
+
+
+# =============================================================================
+# TEST 2: ACTIVE CORPUS
+# =============================================================================
+
+class TestLoadCorpus:
+    """Tests for switching find_relevant_precedents to a corpus file."""
+
+    def test_file_corpus_matches_builtin(self, corpus_path, restore_default_corpus):
+        facts = {"case_type": "retaliation", "summary": "fired after EEOC charge"}
+        expected = precedents.find_relevant_precedents(facts)
+        precedents.load_corpus(corpus_path)
+        assert isinstance(precedents.get_corpus(), PrecedentCorpus)
+        assert precedents.find_relevant_precedents(facts) == expected
+
+    def test_custom_corpus(self, tmp_path, restore_default_corpus):
+        records = [{"name": "Doe v. Widget Co.", "citation": "1 F.4th 1 (2021)", "year": 2021,
+                    "category": "whistleblower", "summary": "Whistleblower protection for safety reports.",
+                    "keywords": ["whistleblower", "osha"]}]
+        precedents.load_corpus(write_corpus(records, tmp_path / "custom.jlpc"))
+        assert precedents.find_relevant_precedents({"notes": "OSHA whistleblower"}) == records
+        assert precedents.find_relevant_precedents({"notes": "title vii"}) == []
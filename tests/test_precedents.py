@@ -0,0 +1,484 @@
+"""
+Tests for precedent matching.
+
+Validates the BM25 ranking engine against a straightforward reference
+implementation, checks top-k selection on the built-in corpus, compares
+facet bitsets against plain record filters, checks the citation graph
+(expansion, precomputed personalized PageRank, re-ranking) and the
+memoization of lookups.
+
+Run with: pytest tests/test_precedents.py -v
+"""
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+np = pytest.importorskip("numpy")
+
+from shared_lib import precedents
+from shared_lib.precedent_corpus import PrecedentCorpus, write_corpus
+from shared_lib.precedents import (
+    FacetIndex, PrecedentIndex, court_of, facet_filters, find_relevant_precedents, preferred_categories,
+    state_of, tokenize
+)
+
+
+def _reference_bm25(records, text, k1=precedents.BM25_K1, b=precedents.BM25_B):
+    """Textbook BM25, one document at a time."""
+    docs = [Counter(precedents._document_tokens(r)) for r in records]
+    lengths = [sum(d.values()) for d in docs]
+    avg = sum(lengths) / len(lengths)
+    query = set(tokenize(text))
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in query:
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            df = sum(1 for d in docs if term in d)
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg))
+        scores.append(score)
+    return scores
+
+
+def _synthetic_corpus(n, seed=7):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(200)]
+    return [
+        {
+            "name": f"Case {i}",
+            "summary": " ".join(rng.choices(words, k=rng.randint(5, 30))),
+            "keywords": [" ".join(rng.choices(words, k=2)) for _ in range(3)],
+        }
+        for i in range(n)
+    ]
+
+
+def _faceted_corpus(n, seed=11):
+    rng = random.Random(seed)
+    corpus = _synthetic_corpus(n, seed)
+    for record in corpus:
+        record["category"] = rng.choice(["retaliation", "harassment", "age_discrimination"])
+        if rng.random() < 0.9:
+            record["year"] = rng.randint(1970, 2024)
+        record["citation"] = rng.choice(["1 U.S. 1", "2 F.3d 2", "3 F. Supp. 2d 3", "4 Cal. App. 4th 4"])
+        if record["citation"].startswith("4 Cal."):
+            record["jurisdiction"] = rng.choice(["California", "Texas"])
+    return corpus
+
+
+# =============================================================================
+# TEST 1: TOKENIZER
+# =============================================================================
+
+class TestTokenize:
+    """Tests for query/document tokenization."""
+
+    def test_unigrams_and_bigrams(self):
+        assert tokenize("Title VII retaliation") == [
+            "title", "vii", "retaliation", "title vii", "vii retaliation"
+        ]
+
+    def test_drops_stopwords_and_punctuation(self):
+        assert tokenize("The Cat's paw, of the case!") == ["cat's", "paw", "case", "cat's paw", "paw case"]
+
+    def test_drops_common_function_words(self):
+        assert tokenize("paid me less than them after the same job") == ["paid", "less", "job", "paid less", "less job"]
+
+
+# =============================================================================
+# TEST 2: BM25 ENGINE
+# =============================================================================
+
+class TestPrecedentIndex:
+    """Tests for the vectorized BM25 index."""
+
+    @pytest.mark.parametrize("query", [
+        "hostile work environment supervisor harassment",
+        "age discrimination adea over 40 pension",
+        "retaliation after eeoc charge title vii",
+        "nothing relevant here",
+    ])
+    def test_matches_reference_on_builtin_corpus(self, query):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        expected = _reference_bm25(precedents.PRECEDENTS, query)
+        assert np.allclose(index.bm25(query), expected, atol=1e-4)
+
+    def test_matches_reference_on_synthetic_corpus(self):
+        corpus = _synthetic_corpus(300)
+        index = PrecedentIndex(corpus)
+        query = "term3 term17 term17 term42 term99 term3 term150"
+        assert np.allclose(index.bm25(query), _reference_bm25(corpus, query), atol=1e-4)
+
+    def test_top_k_equals_full_sort(self):
+        corpus = _synthetic_corpus(500)
+        index = PrecedentIndex(corpus)
+        query = "term1 term2 term3 term4 term5"
+        scores = index.score(query)
+        expected = sorted((i for i in range(len(corpus)) if scores[i] > 0), key=lambda i: (-scores[i], i))[:10]
+        assert [i for i, _ in index.top_k(query, 10)] == expected
+
+    def test_top_k_only_returns_matches(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        assert index.top_k("gerrymandering", 5) == []
+        assert len(index.top_k("userra", 5)) == 1
+
+    def test_corpus_file_is_indexed_from_columns(self, tmp_path, monkeypatch):
+        expected = PrecedentIndex(precedents.PRECEDENTS)
+        corpus = PrecedentCorpus(write_corpus(precedents.PRECEDENTS, tmp_path / "builtin.jlpc"))
+
+        def no_records(self, i):
+            raise AssertionError("index builders must not materialize records")
+
+        monkeypatch.setattr(PrecedentCorpus, "__getitem__", no_records)
+        index = PrecedentIndex(corpus)
+        query = "retaliation after eeoc charge title vii"
+        assert np.allclose(index.bm25(query), expected.bm25(query))
+        assert index.keyword_hits(query).tolist() == expected.keyword_hits(query).tolist()
+        assert {f: sorted(p) for f, p in index.facets.postings.items()} == \
+            {f: sorted(p) for f, p in expected.facets.postings.items()}
+        assert index.facets.years.tolist() == expected.facets.years.tolist()
+        assert index.graph.links_ids.tolist() == expected.graph.links_ids.tolist()
+        assert index.graph.overruled.tolist() == expected.graph.overruled.tolist()
+
+    def test_empty_corpus(self):
+        index = PrecedentIndex([])
+        assert index.top_k("retaliation", 3) == []
+
+
+# =============================================================================
+# TEST 3: FIND RELEVANT PRECEDENTS
+# =============================================================================
+
+class TestFindRelevantPrecedents:
+    """Tests for the public matching API on the built-in corpus."""
+
+    def test_empty_facts(self):
+        assert find_relevant_precedents({}) == []
+
+    def test_retaliation_case(self):
+        names = [p["name"] for p in find_relevant_precedents({
+            "case_type": "retaliation",
+            "incident_summary": "Fired after filing an EEOC charge",
+        })]
+        assert names[:2] == ["Thompson v. North American Stainless", "Burlington Northern v. White"]
+
+    def test_age_case(self):
+        results = find_relevant_precedents({"case_type": "age discrimination", "notes": "ADEA, over 40"})
+        assert {p["category"] for p in results} == {"age_discrimination"}
+
+    def test_max_results(self):
+        facts = {"summary": "title vii discrimination harassment retaliation"}
+        assert len(find_relevant_precedents(facts, max_results=5)) == 5
+
+
+# =============================================================================
+# TEST 4: FACETS
+# =============================================================================
+
+class TestFacetIndex:
+    """Facet bitsets agree with filtering the records directly."""
+
+    def test_court_inference(self):
+        assert court_of({"citation": "550 U.S. 618 (2007)"}) == "supreme_court"
+        assert court_of({"citation": "12 F.4th 88 (9th Cir. 2021)"}) == "court_of_appeals"
+        assert court_of({"citation": "300 F. Supp. 3d 1 (N.D. Cal. 2018)"}) == "district_court"
+        assert court_of({"citation": "4 Cal. App. 4th 4", "court": "Cal. Ct. App."}) == "cal_ct_app"
+        assert court_of({"citation": "4 Cal. App. 4th 4"}) == ""
+
+    def test_masks_match_record_filters(self):
+        corpus = _faceted_corpus(999)
+        facets = FacetIndex(corpus)
+        mask = facets.mask(category=["retaliation", "harassment"],
+                           jurisdiction=["federal", "california"], years=(1990, 2009))
+        expected = [
+            r["category"] in ("retaliation", "harassment")
+            and (r.get("jurisdiction") == "California" or not r["citation"].startswith("4 Cal."))
+            and 1990 <= r.get("year", 0) <= 2009
+            for r in corpus
+        ]
+        assert mask.tolist() == expected
+
+    def test_unconstrained_and_unknown_values(self):
+        facets = FacetIndex(_faceted_corpus(50))
+        assert facets.mask() is None
+        assert not facets.mask(category="bankruptcy").any()
+        assert not facets.mask(years=(2030, None)).any()
+
+    def test_top_k_with_mask_equals_filtered_sort(self):
+        corpus = _faceted_corpus(800)
+        index = PrecedentIndex(corpus)
+        query = "term1 term2 term3 term4 term5"
+        mask = index.facets.mask(category="harassment", years=(2000, None))
+        scores = index.score(query)
+        expected = sorted((i for i in range(len(corpus)) if mask[i] and scores[i] > 0),
+                          key=lambda i: (-scores[i], i))[:10]
+        assert [i for i, _ in index.top_k(query, 10, mask)] == expected
+
+
+class TestFacetFilters:
+    """Tests for mapping case facts to facet constraints."""
+
+    def test_facts_to_filters(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        filters = facet_filters({"jurisdiction": "California, USA", "case_type": "Age Discrimination",
+                                 "date_of_incident": "2010-03-01"}, index)
+        assert filters == {"jurisdiction": ["", "california", "federal"]}
+        assert facet_filters({"case_type": "wrongful termination"}, index) == {}
+
+    def test_jurisdiction_uses_the_state(self):
+        assert state_of("San Francisco, California") == "california"
+        assert state_of("Austin, TX, USA") == "texas"
+        assert state_of("New York") == "new_york"
+        assert state_of("Remote") is None
+        assert facet_filters({"jurisdiction": "Springfield"}, PrecedentIndex(precedents.PRECEDENTS)) == {}
+
+    def test_preferred_categories_are_hierarchical(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        assert preferred_categories({"case_type": "discrimination"}, index) == [
+            "age_discrimination", "discrimination", "wage_discrimination"
+        ]
+        assert preferred_categories({"case_type": "Age Discrimination"}, index) == [
+            "age_discrimination", "discrimination"
+        ]
+        assert preferred_categories({"case_type": "wrongful termination"}, index) == []
+
+    def test_state_precedents_stay_in_state(self, tmp_path):
+        corpus = _faceted_corpus(400)
+        path = write_corpus(corpus, tmp_path / "faceted.jlpc")
+        try:
+            precedents.load_corpus(path)
+            summary = " ".join(f"term{i}" for i in range(1, 11))
+            results = find_relevant_precedents({"jurisdiction": "Texas, USA", "summary": summary}, max_results=50)
+        finally:
+            precedents.load_corpus(None)
+        assert results
+        assert all(r.get("jurisdiction") in (None, "Texas") for r in results)
+
+    def test_category_breaks_close_calls_only(self):
+        facts = {"summary": "hostile work environment harassment after a complaint of retaliation"}
+        plain = [r["name"] for r in find_relevant_precedents(facts, max_results=4)]
+        harassment = [r["name"] for r in find_relevant_precedents({**facts, "case_type": "harassment"},
+                                                                  max_results=4)]
+        retaliation = find_relevant_precedents({**facts, "case_type": "retaliation"}, max_results=4)
+        assert set(plain) == set(harassment)
+        assert len(retaliation) == 4
+        assert any(r["category"] == "harassment" for r in retaliation)
+
+
+class TestRankingRegressions:
+    """Top-k for typical intake facts, pinned to the ranking before facets existed."""
+
+    def test_age_discrimination(self):
+        facts = {"case_type": "discrimination", "jurisdiction": "California, USA",
+                 "incident_summary": "Fired at age 58 and replaced by a 30 year old; manager said we need "
+                                     "younger energy. ADEA age discrimination claim."}
+        assert [r["name"] for r in find_relevant_precedents(facts)] == [
+            "O'Connor v. Consolidated Coin Caterers Corp.", "Hazen Paper Co. v. Biggins",
+            "Gross v. FBL Financial Services",
+        ]
+
+    def test_pay_discrimination(self):
+        facts = {"case_type": "discrimination", "jurisdiction": "Texas",
+                 "incident_summary": "Learned after years that male colleagues were paid more for the same job; "
+                                     "unequal pay and wage discrimination, paycheck disparity."}
+        # The keyword-matching set; Oncale ("same sex") no longer comes in through the word "same"
+        assert {r["name"] for r in find_relevant_precedents(facts)} == {
+            "Ledbetter v. Goodyear Tire & Rubber Co.", "McDonnell Douglas Corp. v. Green",
+            "Staub v. Proctor Hospital",
+        }
+
+    @pytest.mark.parametrize("summary", [
+        "I was abandoned by the company after I completed my project",
+        "My employer paid me less than I expected",
+    ])
+    def test_no_legal_content_returns_nothing(self, summary):
+        assert find_relevant_precedents({"incident_summary": summary}) == []
+
+    def test_harassment_under_discrimination_case_type(self):
+        facts = {"case_type": "discrimination", "jurisdiction": "New York",
+                 "incident_summary": "Supervisor made repeated sexual comments and unwanted advances creating a "
+                                     "hostile work environment; harassment reported to HR."}
+        assert [r["name"] for r in find_relevant_precedents(facts)] == [
+            "Faragher v. City of Boca Raton", "Meritor Savings Bank v. Vinson", "Burlington Industries v. Ellerth",
+        ]
+
+
+# =============================================================================
+# TEST 5: CITATION GRAPH
+# =============================================================================
+
+def _doc(name):
+    return next(i for i, p in enumerate(precedents.PRECEDENTS) if p["name"] == name)
+
+
+class TestCitationGraph:
+    """Tests for citation links, expansion and personalized PageRank."""
+
+    def test_builtin_links(self):
+        graph = PrecedentIndex(precedents.PRECEDENTS).graph
+        thompson = _doc("Thompson v. North American Stainless")
+        assert graph.expand([thompson]).tolist() == [_doc("Burlington Northern v. White")]
+        two_hops = set(graph.expand([thompson], hops=2).tolist())
+        assert {_doc("Burlington Industries v. Ellerth"), _doc("Faragher v. City of Boca Raton")} <= two_hops
+        assert graph.overruled.tolist() == [p.get("overruled_by") is not None for p in precedents.PRECEDENTS]
+
+    def test_related_precedents(self):
+        meritor = next(p for p in precedents.PRECEDENTS if p["name"] == "Meritor Savings Bank v. Vinson")
+        cited_by = {p["name"] for p in precedents.related_precedents(meritor)}
+        assert cited_by == {"Burlington Industries v. Ellerth", "Faragher v. City of Boca Raton",
+                            "Oncale v. Sundowner Offshore Services"}
+        assert precedents.related_precedents({"name": "Unknown v. Nobody"}) == []
+
+    def test_pagerank_matches_truncated_power_series(self):
+        rng = random.Random(4)
+        n = 40
+        records = [{"name": f"Case {i}", "citation": f"{i} F.3d {i}"} for i in range(n)]
+        for i, record in enumerate(records):
+            record["cites"] = [f"{j} F.3d {j}" for j in rng.sample(range(n), 2) if j != i]
+        graph = PrecedentIndex(records).graph
+
+        adjacency = np.zeros((n, n))
+        for i, record in enumerate(records):
+            for ref in record["cites"]:
+                j = int(ref.split()[0])
+                adjacency[i, j] = adjacency[j, i] = 1
+        walk = adjacency / np.maximum(adjacency.sum(axis=1, keepdims=True), 1)
+        r = precedents.PAGERANK_RESTART
+        series = sum(r * (1 - r) ** t * np.linalg.matrix_power(walk, t)
+                     for t in range(precedents.PAGERANK_HOPS + 1))
+
+        seeds, weights = [3, 17, 25], [1.0, 0.5, 0.25]
+        ids, scores = graph.personalized_pagerank(seeds, weights)
+        expected = np.asarray(weights) @ series[seeds]
+        dense = np.zeros(n)
+        dense[ids] = scores
+        assert np.allclose(dense, expected, atol=1e-6)
+
+    def test_graph_rerank_adds_neighbours_and_penalizes_overruled(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        thompson = _doc("Thompson v. North American Stainless")
+        reranked = [i for i, _ in index.graph_rerank([(thompson, 5.0)], 3, graph_weight=0.5)]
+        assert reranked[0] == thompson and _doc("Burlington Northern v. White") in reranked
+
+        ledbetter, griggs = _doc("Ledbetter v. Goodyear Tire & Rubber Co."), _doc("Griggs v. Duke Power Co.")
+        reranked = index.graph_rerank([(ledbetter, 1.0), (griggs, 0.6)], 2, graph_weight=0.0)
+        assert [i for i, _ in reranked] == [griggs, ledbetter]
+
+    def test_graph_rerank_respects_mask(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        thompson = _doc("Thompson v. North American Stainless")
+        mask = np.zeros(len(index), dtype=bool)
+        mask[thompson] = True
+        assert index.graph_rerank([(thompson, 1.0)], 3, mask, graph_weight=0.5) == [(thompson, 1.0)]
+
+    def test_graph_rerank_adds_only_relevant_neighbours(self):
+        index = PrecedentIndex(precedents.PRECEDENTS)
+        thompson = _doc("Thompson v. North American Stainless")
+        relevant = np.zeros(len(index), dtype=bool)
+        relevant[thompson] = True
+        assert index.graph_rerank([(thompson, 1.0)], 3, graph_weight=0.5, relevant=relevant) == [(thompson, 1.0)]
+
+    def test_weak_seed_produces_no_neighbours(self):
+        # Thompson shares only "after" with the first facts: no seed, so no citation neighbours either
+        assert find_relevant_precedents({"incident_summary": "Abandoned by the company after my project"}) == []
+        # Thompson matches "wrongful termination"; Burlington Northern and Faragher are only its neighbours
+        names = [p["name"] for p in find_relevant_precedents(
+            {"incident_summary": "Wrongful termination, they let me go without cause"})]
+        assert names == ["Thompson v. North American Stainless"]
+
+    def test_format_notes_overruled(self):
+        ledbetter = precedents.PRECEDENTS[_doc("Ledbetter v. Goodyear Tire & Rubber Co.")]
+        text = precedents.format_precedents_for_strategy([ledbetter])
+        assert "*Overruled by: Lilly Ledbetter Fair Pay Act of 2009*" in text
+
+
+# =============================================================================
+# TEST 6: MEMOIZATION
+# =============================================================================
+
+class TestPrecedentMemo:
+    """Memoized lookups keyed by normalized facts and corpus version."""
+
+    FACTS = {"case_type": "retaliation", "incident_summary": "Fired after filing an EEOC charge"}
+
+    @pytest.fixture(autouse=True)
+    def fresh_memo(self, monkeypatch):
+        monkeypatch.setattr(precedents, "_memo", precedents.PrecedentMemo(8))
+        yield
+        precedents.load_corpus(None)
+
+    def test_concurrent_first_requests_build_once(self, monkeypatch):
+        builds = []
+
+        class SlowIndex(PrecedentIndex):
+            def __init__(self, records):
+                builds.append(1)
+                time.sleep(0.05)
+                super().__init__(records)
+
+        monkeypatch.setattr(precedents, "PrecedentIndex", SlowIndex)
+        monkeypatch.setattr(precedents, "_index", None)
+        start = threading.Barrier(8)
+        indexes = []
+
+        def first_request():
+            start.wait()
+            indexes.append(precedents.get_index())
+
+        threads = [threading.Thread(target=first_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(builds) == 1
+        assert len(indexes) == 8 and all(index is indexes[0] for index in indexes)
+
+    def test_repeat_lookups_hit(self):
+        first = find_relevant_precedents(self.FACTS)
+        first.append("mutated by caller")
+        same_facts = {"incident_summary": "fired after filing an  EEOC charge", "case_type": "Retaliation"}
+        assert find_relevant_precedents(same_facts) == first[:-1]
+        assert precedents.precedent_memo_stats() == {
+            "hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1, "maxsize": 8
+        }
+
+    def test_markdown_rendered_once(self, monkeypatch):
+        calls = []
+        render = precedents.format_precedents_for_strategy
+        monkeypatch.setattr(precedents, "format_precedents_for_strategy",
+                            lambda p: calls.append(p) or render(p))
+        markdown = precedents.precedents_for_strategy(self.FACTS)
+        assert precedents.precedents_for_strategy(self.FACTS) == markdown
+        assert markdown == render(find_relevant_precedents(self.FACTS))
+        assert len(calls) == 1
+
+    def test_settings_and_max_results_are_part_of_the_key(self, monkeypatch):
+        find_relevant_precedents(self.FACTS)
+        find_relevant_precedents(self.FACTS, max_results=5)
+        monkeypatch.setattr(precedents.PrecedentConfig, "GRAPH_WEIGHT", 0.0)
+        find_relevant_precedents(self.FACTS)
+        assert precedents.precedent_memo_stats()["misses"] == 3
+
+    def test_corpus_reload_invalidates(self, tmp_path):
+        find_relevant_precedents(self.FACTS)
+        corpus = [dict(p, summary=p["summary"] + " Retaliation.") for p in precedents.PRECEDENTS[:3]]
+        precedents.load_corpus(write_corpus(corpus, tmp_path / "small.jlpc"))
+        assert precedents.precedent_memo_stats()["size"] == 0
+        assert {p["name"] for p in find_relevant_precedents(self.FACTS)} <= {p["name"] for p in corpus}
+
+    def test_bounded(self):
+        for i in range(20):
+            find_relevant_precedents({"summary": f"retaliation case {i}"})
+        assert precedents.precedent_memo_stats()["size"] == 8
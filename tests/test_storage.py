@@ -0,0 +1,176 @@
+"""
+Tests for sharded, content-addressed case file storage.
+
+Validates blob dedupe and hard-link refcounting, the per-case manifest,
+garbage collection and Ghost Protocol's traversal of the sharded layout.
+
+Run with: pytest tests/test_storage.py -v
+"""
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib import ghost_protocol, storage, utils
+from shared_lib.utils import invalidate_storage_cache
+
+
+DATA = b"%PDF-1.4 brief contents"
+
+
+@pytest.fixture(autouse=True)
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "STATIC_DIR", tmp_path)
+    invalidate_storage_cache()
+    ghost_protocol.reset_expiry_index()
+    yield tmp_path
+    invalidate_storage_cache()
+    ghost_protocol.reset_expiry_index()
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# =============================================================================
+# TEST 1: LAYOUT
+# =============================================================================
+
+class TestLayout:
+    """Tests for shard and blob fan-out paths."""
+
+    def test_case_file_lives_under_shard(self, static_dir):
+        path = storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        assert path.relative_to(static_dir / "users").parts[0] == utils.shard_for("u1")
+        assert path.read_bytes() == DATA
+
+    def test_blob_fan_out(self):
+        digest = _digest(DATA)
+        path = storage.blob_path(digest)
+        assert path.parts[-3:] == (digest[:2], digest[2:4], digest)
+
+    @pytest.mark.parametrize("name", ["", "../x", "a/b", "a\\b", ".hidden"])
+    def test_rejects_bad_names(self, name):
+        with pytest.raises(ValueError):
+            storage.put_case_file("u1", "c1", name, DATA)
+
+
+# =============================================================================
+# TEST 2: DEDUPE & REFCOUNTS
+# =============================================================================
+
+class TestDedupe:
+    """Identical bytes are stored once and reference-counted by hard links."""
+
+    def test_identical_content_shares_one_blob(self):
+        a = storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        b = storage.put_case_file("u2", "c9", "brief.pdf", DATA)
+        assert os.path.samefile(a, b)
+        assert storage.blob_refcount(_digest(DATA)) == 2
+        assert len(list(storage.get_blobs_dir().glob("*/*/*"))) == 1
+
+    def test_rewrite_same_content_is_noop(self):
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        assert storage.blob_refcount(_digest(DATA)) == 1
+
+    def test_overwrite_releases_old_blob_reference(self):
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        storage.put_case_file("u1", "c1", "brief.pdf", b"new")
+        assert storage.blob_refcount(_digest(DATA)) == 0
+        assert storage.collect_garbage()["deleted"] == 1
+
+    def test_delete_frees_unreferenced_blob(self):
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        storage.put_case_file("u2", "c1", "brief.pdf", DATA)
+        assert storage.delete_case_file("u1", "c1", "brief.pdf") is True
+        assert storage.blob_path(_digest(DATA)).exists()
+        assert storage.delete_case_file("u2", "c1", "brief.pdf") is True
+        assert not storage.blob_path(_digest(DATA)).exists()
+
+    def test_release_checks_only_given_blobs(self):
+        storage.put_case_file("u1", "c1", "a.pdf", b"a")
+        storage.put_case_file("u1", "c1", "a.pdf", b"b")  # Leaves blob "a" unreferenced
+        storage.put_case_file("u2", "c1", "c.pdf", b"c")
+        user_dir = storage.get_case_file_path("u2", "c1", "c.pdf").parent.parent.parent
+        assert storage.manifest_digests(user_dir) == {_digest(b"c")}
+        stats = storage.release_blobs({_digest(b"c"), _digest(b"missing")})
+        assert (stats["scanned"], stats["deleted"]) == (2, 0)
+        assert storage.release_blobs({_digest(b"a")})["deleted"] == 1
+        assert storage.blob_path(_digest(b"b")).exists()
+
+    def test_delete_missing_returns_false(self):
+        assert storage.delete_case_file("u1", "c1", "brief.pdf") is False
+
+
+# =============================================================================
+# TEST 3: MANIFEST
+# =============================================================================
+
+class TestManifest:
+    """Tests for the per-case manifest."""
+
+    def test_records_digest_size_and_meta(self):
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA, source_hash="abc")
+        entry = storage.read_manifest("u1", "c1")["brief.pdf"]
+        assert entry["sha256"] == _digest(DATA)
+        assert entry["size"] == len(DATA)
+        assert entry["source_hash"] == "abc"
+
+    def test_missing_manifest_is_empty_and_creates_nothing(self, static_dir):
+        assert storage.read_manifest("u1", "c1") == {}
+        assert list(static_dir.iterdir()) == []
+
+    def test_delete_removes_entry(self):
+        storage.put_case_file("u1", "c1", "a.pdf", DATA)
+        storage.put_case_file("u1", "c1", "b.pdf", b"other")
+        storage.delete_case_file("u1", "c1", "a.pdf")
+        assert list(storage.read_manifest("u1", "c1")) == ["b.pdf"]
+
+
+# =============================================================================
+# TEST 4: GHOST PROTOCOL ON THE SHARDED LAYOUT
+# =============================================================================
+
+class TestGhostProtocol:
+    """Expiry works per user folder and releases orphaned blobs."""
+
+    def test_expires_user_folders_and_collects_blobs(self, static_dir, monkeypatch):
+        users = static_dir / "users"
+        monkeypatch.setattr(ghost_protocol, "STORAGE_PATHS", [users])
+        storage.put_case_file("old", "c1", "brief.pdf", DATA)
+        storage.put_case_file("new", "c1", "brief.pdf", b"fresh")
+        ghost_protocol.reset_expiry_index()  # As after a restart: rebuilt from disk
+        stale = time.time() - ghost_protocol.RETENTION_SECONDS - 60
+        old_dir = users / utils.shard_for("old") / "old"
+        os.utime(old_dir, (stale, stale))
+
+        stats = ghost_protocol.enforce_privacy()
+
+        assert stats["deleted"] == 1
+        assert not old_dir.exists()
+        assert (users / utils.shard_for("new") / "new").exists()
+        assert not storage.blob_path(_digest(DATA)).exists()
+        assert storage.blob_path(_digest(b"fresh")).exists()
+
+    def test_blob_store_is_not_expired(self, static_dir, monkeypatch):
+        users = static_dir / "users"
+        monkeypatch.setattr(ghost_protocol, "STORAGE_PATHS", [users])
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        stale = time.time() - ghost_protocol.RETENTION_SECONDS - 60
+        os.utime(storage.get_blobs_dir(), (stale, stale))
+        ghost_protocol.reset_expiry_index()
+        assert ghost_protocol.enforce_privacy()["deleted"] == 0
+        assert storage.blob_path(_digest(DATA)).exists()
+
+    def test_write_after_incineration_recreates_folder(self, static_dir):
+        storage.put_case_file("u1", "c1", "brief.pdf", DATA)
+        shutil.rmtree(static_dir / "users")
+        assert storage.put_case_file("u1", "c1", "brief.pdf", DATA).read_bytes() == DATA
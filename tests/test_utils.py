@@ -0,0 +1,87 @@
+"""
+Tests for secure storage path resolution.
+
+Validates ID validation, the non-creating lookup mode and the
+created-directory cache.
+
+Run with: pytest tests/test_utils.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared_lib import utils
+from shared_lib.utils import get_secure_storage_path, invalidate_storage_cache
+
+
+@pytest.fixture(autouse=True)
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "STATIC_DIR", tmp_path)
+    invalidate_storage_cache()
+    yield tmp_path
+    invalidate_storage_cache()
+
+
+def _count_mkdirs(monkeypatch):
+    calls = []
+    original = Path.mkdir
+
+    def counting_mkdir(self, *args, **kwargs):
+        calls.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", counting_mkdir)
+    return calls
+
+
+class TestSecureStoragePath:
+    """Tests for get_secure_storage_path."""
+
+    @pytest.mark.parametrize("uid, cid", [
+        ("../user", "case1"), ("user", "../case"), ("/etc/passwd", "case"),
+        ("user", "C:\\Windows"), ("user name", "case"), ("user", "case.pdf"),
+        ("", "case"), (None, "case"),
+    ])
+    def test_rejects_invalid_ids(self, uid, cid):
+        with pytest.raises(ValueError):
+            get_secure_storage_path(uid, cid)
+
+    def test_accepts_hyphens_and_underscores(self, static_dir):
+        path = get_secure_storage_path("user-1", "case_2")
+        assert path == static_dir / "users" / utils.shard_for("user-1") / "user-1" / "cases" / "case_2"
+        assert path.is_dir()
+
+    def test_lookup_does_not_create(self, static_dir):
+        path = get_secure_storage_path("u1", "c1", create=False)
+        assert not path.exists()
+        assert list(static_dir.iterdir()) == []
+
+    def test_mkdir_cached_after_first_call(self, monkeypatch):
+        get_secure_storage_path("u1", "c1")
+        mkdirs = _count_mkdirs(monkeypatch)
+        for _ in range(5):
+            get_secure_storage_path("u1", "c1")
+        assert mkdirs == []
+
+    def test_invalidate_recreates(self, monkeypatch):
+        path = get_secure_storage_path("u1", "c1")
+        path.rmdir()
+        invalidate_storage_cache()
+        assert get_secure_storage_path("u1", "c1").is_dir()
+
+    def test_cache_keyed_by_static_dir(self, monkeypatch, tmp_path):
+        first = get_secure_storage_path("u1", "c1", create=False)
+        other = tmp_path / "elsewhere"
+        monkeypatch.setattr(utils, "STATIC_DIR", other)
+        expected = other / "users" / utils.shard_for("u1") / "u1" / "cases" / "c1"
+        assert get_secure_storage_path("u1", "c1", create=False) == expected
+        assert first != expected
+
+    def test_shard_is_stable_and_bounded(self):
+        assert utils.shard_for("u1") == utils.shard_for("u1")
+        assert utils.is_shard_name(utils.shard_for("u1"))
+        assert len({utils.shard_for(f"user{i}") for i in range(2000)}) <= 16 ** utils.SHARD_CHARS